@@ -1,6 +1,10 @@
 use onlinelearning;
 
 -- Clean up existing data
+DROP TABLE IF EXISTS LectureDailyStats;
+DROP TABLE IF EXISTS CourseDailyStats;
+DROP TABLE IF EXISTS CourseStats;
+DROP TABLE IF EXISTS LectureVideos;
 DROP TABLE IF EXISTS LectureResults;
 DROP TABLE IF EXISTS Notebooks;
 DROP TABLE IF EXISTS Lectures;
@@ -45,6 +49,8 @@ CREATE TABLE Courses (
   InstructorID    INT,
   CreatedAt       TIMESTAMP                       NOT NULL DEFAULT CURRENT_TIMESTAMP,
   UpdatedAt       TIMESTAMP                       NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  KEY IX_Courses_Difficulty (Difficulty),  -- catalog difficulty filter, newest first via the implicit CourseID
+  KEY IX_Courses_Instructor_Created (InstructorID, CreatedAt),  -- instructor course lists and dashboards
   FOREIGN KEY (InstructorID) REFERENCES Instructors(InstructorID)
 );
 
@@ -69,6 +75,10 @@ CREATE TABLE Enrollments (
   Percentage INT,
   Rating     INT,
   UNIQUE KEY UX_Enrollments_Learner_Course (LearnerID, CourseID),
+  KEY IX_Enrollments_Course_Rating (CourseID, Rating),  -- per-course counts and average ratings from the index alone
+  KEY IX_Enrollments_Course_Date (CourseID, EnrollmentDate),  -- enrollment lists newest first, keyset on (date, EnrollmentID)
+  KEY IX_Enrollments_Learner_Percentage (LearnerID, Percentage),  -- learner dashboard enrolled / completed counts
+  KEY IX_Enrollments_Course_Percentage (CourseID, Percentage),  -- completed counts and progress distribution per course
   FOREIGN KEY (LearnerID) REFERENCES Learners(LearnerID),
   FOREIGN KEY (CourseID)  REFERENCES Courses(CourseID)
 );
@@ -82,6 +92,10 @@ CREATE TABLE LectureResults (
   Date       DATE,
   State      VARCHAR(50)    NOT NULL,
   PRIMARY KEY (LearnerID, CourseID, LectureID),
+  KEY IX_LectureResults_Learner_State_Date (LearnerID, State, Date, Score),  -- learner dashboard passed lectures over time
+  KEY IX_LectureResults_Learner_Lecture_Date (LearnerID, LectureID, Date),  -- latest quiz result
+  KEY IX_LectureResults_Lecture_State (LectureID, State, Score, LearnerID),  -- lecture-level analytics
+  KEY IX_LectureResults_Course_Date (CourseID, Date),  -- course completion trends
   FOREIGN KEY (LearnerID)  REFERENCES Learners(LearnerID),
   FOREIGN KEY (CourseID)   REFERENCES Courses(CourseID),
   FOREIGN KEY (LectureID)  REFERENCES Lectures(LectureID)
@@ -101,6 +115,59 @@ CREATE TABLE Notebooks (
   FOREIGN KEY (LectureID)  REFERENCES Lectures(LectureID)
 );
 
+-- 8. LectureVideos (index of uploaded lecture videos, so reads never probe S3)
+CREATE TABLE LectureVideos (
+  LectureID   INT            PRIMARY KEY,
+  CourseID    INT            NOT NULL,
+  S3Key       VARCHAR(255)   NOT NULL,
+  SizeBytes   BIGINT,
+  ContentType VARCHAR(100),
+  ETag        VARCHAR(100),
+  UpdatedAt   TIMESTAMP      NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  FOREIGN KEY (LectureID) REFERENCES Lectures(LectureID) ON DELETE CASCADE,
+  FOREIGN KEY (CourseID)  REFERENCES Courses(CourseID)
+);
+
+-- 9. CourseStats (per-course enrollment and rating totals, kept by the Enrollments triggers)
+CREATE TABLE CourseStats (
+  CourseID      INT       PRIMARY KEY,
+  EnrolledCount INT       NOT NULL DEFAULT 0,
+  RatingSum     BIGINT    NOT NULL DEFAULT 0,
+  RatingCount   INT       NOT NULL DEFAULT 0,
+  AvgRating     DECIMAL(7,4) AS (IF(RatingCount > 0, RatingSum / RatingCount, 0)) STORED,
+  UpdatedAt     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  KEY IX_CourseStats_Rating (AvgRating, CourseID),  -- catalog keyset pagination, sort=rating
+  KEY IX_CourseStats_Enrolled (EnrolledCount, CourseID),  -- catalog keyset pagination, sort=enrolled
+  FOREIGN KEY (CourseID) REFERENCES Courses(CourseID) ON DELETE CASCADE
+);
+
+-- 10. CourseDailyStats (instructor dashboard rollup per course and enrollment day, kept by the Enrollments triggers)
+CREATE TABLE CourseDailyStats (
+  CourseID    INT       NOT NULL,
+  Day         DATE      NOT NULL,  -- EnrollmentDate of the enrollments counted
+  Enrollments INT       NOT NULL DEFAULT 0,
+  RatingSum   BIGINT    NOT NULL DEFAULT 0,
+  RatingCount INT       NOT NULL DEFAULT 0,
+  Completions INT       NOT NULL DEFAULT 0,  -- enrollments at Percentage = 100
+  ProgressSum BIGINT    NOT NULL DEFAULT 0,  -- sum of Percentage, for average progress
+  PRIMARY KEY (CourseID, Day),
+  FOREIGN KEY (CourseID) REFERENCES Courses(CourseID) ON DELETE CASCADE
+);
+
+-- 11. LectureDailyStats (lecture analytics rollup per day of the latest submission, kept by the LectureResults triggers)
+CREATE TABLE LectureDailyStats (
+  LectureID INT       NOT NULL,
+  Day       DATE      NOT NULL,  -- LectureResults.Date
+  CourseID  INT       NOT NULL,
+  Attempts  INT       NOT NULL DEFAULT 0,  -- learners whose latest submission was on Day
+  Passes    INT       NOT NULL DEFAULT 0,
+  ScoreSum  BIGINT    NOT NULL DEFAULT 0,
+  PRIMARY KEY (LectureID, Day),
+  KEY IX_LectureDailyStats_Course (CourseID, Day),
+  FOREIGN KEY (LectureID) REFERENCES Lectures(LectureID) ON DELETE CASCADE,
+  FOREIGN KEY (CourseID)  REFERENCES Courses(CourseID) ON DELETE CASCADE
+);
+
 CREATE TABLE Quizzes (
     QuizID INT AUTO_INCREMENT PRIMARY KEY,
     LectureID INT,
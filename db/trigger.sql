@@ -1,6 +1,11 @@
 -- 1. Thiết lập delimiter để định nghĩa trigger
 drop trigger if exists trg_after_insert_enrollment;
 drop trigger if exists trg_after_update_enrollment;
+drop trigger if exists trg_after_delete_enrollment;
+drop trigger if exists trg_after_insert_course;
+drop trigger if exists trg_after_insert_lecture_result;
+drop trigger if exists trg_after_update_lecture_result;
+drop trigger if exists trg_after_delete_lecture_result;
 
 select * from Enrollments;
 
@@ -15,6 +20,66 @@ BEGIN
   SELECT NEW.LearnerID, NEW.CourseID, LectureID, 0, NULL, 'Unpassed'
   FROM Lectures
   WHERE CourseID = NEW.CourseID;
+
+  -- Cập nhật CourseStats (O(1), không quét lại Enrollments)
+  INSERT INTO CourseStats (CourseID, EnrolledCount, RatingSum, RatingCount)
+  VALUES (NEW.CourseID, 1, COALESCE(NEW.Rating, 0), NEW.Rating IS NOT NULL)
+  ON DUPLICATE KEY UPDATE
+    EnrolledCount = EnrolledCount + 1,
+    RatingSum     = RatingSum + COALESCE(NEW.Rating, 0),
+    RatingCount   = RatingCount + (NEW.Rating IS NOT NULL);
+
+  -- Rollup theo ngày cho dashboard giảng viên
+  INSERT INTO CourseDailyStats (CourseID, Day, Enrollments, RatingSum, RatingCount, Completions, ProgressSum)
+  VALUES (NEW.CourseID, NEW.EnrollmentDate, 1, COALESCE(NEW.Rating, 0), NEW.Rating IS NOT NULL,
+          COALESCE(NEW.Percentage, 0) = 100, COALESCE(NEW.Percentage, 0))
+  ON DUPLICATE KEY UPDATE
+    Enrollments = Enrollments + 1,
+    RatingSum   = RatingSum + COALESCE(NEW.Rating, 0),
+    RatingCount = RatingCount + (NEW.Rating IS NOT NULL),
+    Completions = Completions + (COALESCE(NEW.Percentage, 0) = 100),
+    ProgressSum = ProgressSum + COALESCE(NEW.Percentage, 0);
+
+  IF NEW.Rating IS NOT NULL THEN
+    UPDATE Courses c
+    JOIN CourseStats s ON s.CourseID = c.CourseID
+    SET c.AverageRating = ROUND(s.RatingSum / s.RatingCount, 2)
+    WHERE c.CourseID = NEW.CourseID;
+  END IF;
+END$$
+
+-- Mỗi khoá học luôn có một dòng CourseStats (catalog sắp xếp theo rating/enrolled dùng INNER JOIN)
+CREATE TRIGGER trg_after_insert_course
+AFTER INSERT ON Courses
+FOR EACH ROW
+BEGIN
+  INSERT IGNORE INTO CourseStats (CourseID) VALUES (NEW.CourseID);
+END$$
+
+CREATE TRIGGER trg_after_delete_enrollment
+AFTER DELETE ON Enrollments
+FOR EACH ROW
+BEGIN
+  UPDATE CourseStats
+  SET EnrolledCount = EnrolledCount - 1,
+      RatingSum     = RatingSum - COALESCE(OLD.Rating, 0),
+      RatingCount   = RatingCount - (OLD.Rating IS NOT NULL)
+  WHERE CourseID = OLD.CourseID;
+
+  UPDATE CourseDailyStats
+  SET Enrollments = Enrollments - 1,
+      RatingSum   = RatingSum - COALESCE(OLD.Rating, 0),
+      RatingCount = RatingCount - (OLD.Rating IS NOT NULL),
+      Completions = Completions - (COALESCE(OLD.Percentage, 0) = 100),
+      ProgressSum = ProgressSum - COALESCE(OLD.Percentage, 0)
+  WHERE CourseID = OLD.CourseID AND Day = OLD.EnrollmentDate;
+
+  IF OLD.Rating IS NOT NULL THEN
+    UPDATE Courses c
+    JOIN CourseStats s ON s.CourseID = c.CourseID
+    SET c.AverageRating = IF(s.RatingCount > 0, ROUND(s.RatingSum / s.RatingCount, 2), 0)
+    WHERE c.CourseID = OLD.CourseID;
+  END IF;
 END$$
 
 DELIMITER ;
@@ -24,6 +89,17 @@ select * from enrollments;
 select * from courses;
 select * from lectures where CourseID = 16;
 
+-- Khởi tạo CourseStats một lần từ Enrollments hiện có (job repair của API giữ cho nó chính xác về sau)
+INSERT INTO CourseStats (CourseID, EnrolledCount, RatingSum, RatingCount)
+SELECT c.CourseID, COUNT(e.EnrollmentID), COALESCE(SUM(e.Rating), 0), COUNT(e.Rating)
+FROM Courses c
+LEFT JOIN Enrollments e ON e.CourseID = c.CourseID
+GROUP BY c.CourseID
+ON DUPLICATE KEY UPDATE
+  EnrolledCount = VALUES(EnrolledCount),
+  RatingSum     = VALUES(RatingSum),
+  RatingCount   = VALUES(RatingCount);
+
 drop trigger if exists trg_courses_after_update_rating;
 DELIMITER $$
 CREATE TRIGGER trg_courses_after_update_rating
@@ -31,15 +107,17 @@ AFTER UPDATE ON Enrollments
 FOR EACH ROW
 BEGIN
   -- Chạy khi Rating thực sự thay đổi (kể cả NULL ↔ giá trị)
+  -- Điều chỉnh tổng/số lượng rating trong CourseStats thay vì tính lại AVG trên toàn bộ Enrollments
   IF NOT (OLD.Rating <=> NEW.Rating) THEN
-    UPDATE Courses
-    SET AverageRating = (
-      SELECT ROUND(AVG(Rating), 2)
-      FROM Enrollments
-      WHERE CourseID = NEW.CourseID
-        AND Rating IS NOT NULL
-    )
+    UPDATE CourseStats
+    SET RatingSum   = RatingSum - COALESCE(OLD.Rating, 0) + COALESCE(NEW.Rating, 0),
+        RatingCount = RatingCount - (OLD.Rating IS NOT NULL) + (NEW.Rating IS NOT NULL)
     WHERE CourseID = NEW.CourseID;
+
+    UPDATE Courses c
+    JOIN CourseStats s ON s.CourseID = c.CourseID
+    SET c.AverageRating = IF(s.RatingCount > 0, ROUND(s.RatingSum / s.RatingCount, 2), 0)
+    WHERE c.CourseID = NEW.CourseID;
   END IF;
 END$$
 DELIMITER ;
@@ -80,4 +158,110 @@ BEGIN
     WHERE LearnerID = NEW.LearnerID
     AND CourseID = NEW.CourseID;
 END$$
-DELIMITER ;
\ No newline at end of file
+DELIMITER ;
+
+-- Rollup theo ngày (CourseDailyStats, LectureDailyStats) cho dashboard giảng viên.
+-- Enroll, rating và nộp quiz đều đi qua các trigger này; job rebuild của API sửa lệch về sau.
+DROP TRIGGER IF EXISTS trg_after_update_enrollment;
+DELIMITER $$
+CREATE TRIGGER trg_after_update_enrollment
+AFTER UPDATE ON Enrollments
+FOR EACH ROW
+BEGIN
+  -- Chuyển phần đóng góp của dòng cũ sang dòng mới (rating, tiến độ, hoặc ngày/khoá học)
+  IF NOT (OLD.Rating <=> NEW.Rating) OR NOT (OLD.Percentage <=> NEW.Percentage)
+     OR OLD.CourseID <> NEW.CourseID OR OLD.EnrollmentDate <> NEW.EnrollmentDate THEN
+    UPDATE CourseDailyStats
+    SET Enrollments = Enrollments - 1,
+        RatingSum   = RatingSum - COALESCE(OLD.Rating, 0),
+        RatingCount = RatingCount - (OLD.Rating IS NOT NULL),
+        Completions = Completions - (COALESCE(OLD.Percentage, 0) = 100),
+        ProgressSum = ProgressSum - COALESCE(OLD.Percentage, 0)
+    WHERE CourseID = OLD.CourseID AND Day = OLD.EnrollmentDate;
+
+    INSERT INTO CourseDailyStats (CourseID, Day, Enrollments, RatingSum, RatingCount, Completions, ProgressSum)
+    VALUES (NEW.CourseID, NEW.EnrollmentDate, 1, COALESCE(NEW.Rating, 0), NEW.Rating IS NOT NULL,
+            COALESCE(NEW.Percentage, 0) = 100, COALESCE(NEW.Percentage, 0))
+    ON DUPLICATE KEY UPDATE
+      Enrollments = Enrollments + 1,
+      RatingSum   = RatingSum + COALESCE(NEW.Rating, 0),
+      RatingCount = RatingCount + (NEW.Rating IS NOT NULL),
+      Completions = Completions + (COALESCE(NEW.Percentage, 0) = 100),
+      ProgressSum = ProgressSum + COALESCE(NEW.Percentage, 0);
+  END IF;
+END$$
+
+-- Chỉ tính kết quả đã nộp (Date khác NULL); dòng tạo lúc enroll chưa có Date
+CREATE TRIGGER trg_after_insert_lecture_result
+AFTER INSERT ON LectureResults
+FOR EACH ROW
+BEGIN
+  IF NEW.Date IS NOT NULL THEN
+    INSERT INTO LectureDailyStats (LectureID, Day, CourseID, Attempts, Passes, ScoreSum)
+    VALUES (NEW.LectureID, NEW.Date, NEW.CourseID, 1, NEW.State = 'passed', COALESCE(NEW.Score, 0))
+    ON DUPLICATE KEY UPDATE
+      Attempts = Attempts + 1,
+      Passes   = Passes + (NEW.State = 'passed'),
+      ScoreSum = ScoreSum + COALESCE(NEW.Score, 0);
+  END IF;
+END$$
+
+-- Nộp lại quiz: bỏ kết quả cũ khỏi ngày cũ rồi cộng kết quả mới vào ngày mới
+CREATE TRIGGER trg_after_update_lecture_result
+AFTER UPDATE ON LectureResults
+FOR EACH ROW
+BEGIN
+  IF OLD.Date IS NOT NULL THEN
+    UPDATE LectureDailyStats
+    SET Attempts = Attempts - 1,
+        Passes   = Passes - (OLD.State = 'passed'),
+        ScoreSum = ScoreSum - COALESCE(OLD.Score, 0)
+    WHERE LectureID = OLD.LectureID AND Day = OLD.Date;
+  END IF;
+
+  IF NEW.Date IS NOT NULL THEN
+    INSERT INTO LectureDailyStats (LectureID, Day, CourseID, Attempts, Passes, ScoreSum)
+    VALUES (NEW.LectureID, NEW.Date, NEW.CourseID, 1, NEW.State = 'passed', COALESCE(NEW.Score, 0))
+    ON DUPLICATE KEY UPDATE
+      Attempts = Attempts + 1,
+      Passes   = Passes + (NEW.State = 'passed'),
+      ScoreSum = ScoreSum + COALESCE(NEW.Score, 0);
+  END IF;
+END$$
+
+CREATE TRIGGER trg_after_delete_lecture_result
+AFTER DELETE ON LectureResults
+FOR EACH ROW
+BEGIN
+  IF OLD.Date IS NOT NULL THEN
+    UPDATE LectureDailyStats
+    SET Attempts = Attempts - 1,
+        Passes   = Passes - (OLD.State = 'passed'),
+        ScoreSum = ScoreSum - COALESCE(OLD.Score, 0)
+    WHERE LectureID = OLD.LectureID AND Day = OLD.Date;
+  END IF;
+END$$
+DELIMITER ;
+
+-- Khởi tạo rollup một lần từ dữ liệu hiện có
+INSERT INTO CourseDailyStats (CourseID, Day, Enrollments, RatingSum, RatingCount, Completions, ProgressSum)
+SELECT CourseID, EnrollmentDate, COUNT(*), COALESCE(SUM(Rating), 0), COUNT(Rating),
+       SUM(COALESCE(Percentage, 0) = 100), COALESCE(SUM(Percentage), 0)
+FROM Enrollments
+GROUP BY CourseID, EnrollmentDate
+ON DUPLICATE KEY UPDATE
+  Enrollments = VALUES(Enrollments),
+  RatingSum   = VALUES(RatingSum),
+  RatingCount = VALUES(RatingCount),
+  Completions = VALUES(Completions),
+  ProgressSum = VALUES(ProgressSum);
+
+INSERT INTO LectureDailyStats (LectureID, Day, CourseID, Attempts, Passes, ScoreSum)
+SELECT LectureID, Date, CourseID, COUNT(*), SUM(State = 'passed'), COALESCE(SUM(Score), 0)
+FROM LectureResults
+WHERE Date IS NOT NULL
+GROUP BY LectureID, Date, CourseID
+ON DUPLICATE KEY UPDATE
+  Attempts = VALUES(Attempts),
+  Passes   = VALUES(Passes),
+  ScoreSum = VALUES(ScoreSum);
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Cookie, UploadFile, File, Form
-from typing import List, Optional, Dict, Any, Callable
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Cookie, UploadFile, File, Form, Query
+from typing import List, Optional, Dict, Any, Callable, Literal, NamedTuple, Tuple
 from pydantic import BaseModel, Field
 from services.api.db.token_utils import decode_token
 from dotenv import load_dotenv
@@ -8,14 +8,32 @@ import pymysql
 import pandas as pd
 import boto3
 import json
-import threading
+import base64
+import hashlib
 import asyncio
+from decimal import Decimal
 from botocore.exceptions import ClientError
 from datetime import datetime
+from functools import partial
 from fastapi.middleware.cors import CORSMiddleware
 from services.utils.cache_utils import cache_data, cache_with_fallback, clear_cache
 from services.config.valkey_config import get_redis_client
-from services.utils.api_cache import get_cached_data, invalidate_cache, invalidate_cache_pattern
+from services.config.mysql_config import (
+    get_db_connection, PoolTimeoutError, async_db_connection, fetch_all, fetch_one, gather_queries
+)
+from services.utils.api_cache import get_cached_data, get_cached_entry, invalidate_tags, get_generations, bump_generations
+from services.utils.cache_warmer import register_warmer, schedule_warm, record_course_view
+from services.utils.learner_cache import (
+    get_passed_lectures, record_lecture_result, apply_passed_overlay,
+    get_learner_enrollments, record_enrollment
+)
+from services.utils.http_cache import (
+    load_conditional, compose_etag, request_etags, etag_matches, set_cache_headers, not_modified
+)
+from services.utils.response_cache import get_cached_page, split_page, body_response
+from services.utils.executor import run_blocking
+from services.utils.streaming import export_response
+from services.utils.dashboard_rollups import DASHBOARD_TAG
 
 # Get Valkey client
 redis_client = get_redis_client()
@@ -43,6 +61,13 @@ s3 = boto3.client('s3',
     region_name=REGION
 )
 
+# Shared public catalog key prefix (one key per page, see catalog_cache_key)
+CATALOG_CACHE_KEY = "courses:public:v4"
+CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", 50))
+CATALOG_MAX_PAGE_SIZE = 100
+# Dashboards are dropped on writes to the instructor's courses; the TTL only bounds drift
+INSTRUCTOR_DASHBOARD_TTL = int(os.getenv("INSTRUCTOR_DASHBOARD_TTL", 600))
+
 router = APIRouter(
     tags=["courses"],
     responses={404: {"description": "Not found"}},
@@ -53,23 +78,630 @@ router = APIRouter(
 async def test_post():
     return {"message": "POST test endpoint works"}
 
+# Blocking pymysql access. Read paths use the aiomysql pool (async_db_connection / fetch_all);
+# handlers still on connect_db() are plain `def` so FastAPI runs them in its threadpool, and
+# async handlers wrap their connect_db() sections in run_blocking().
 def connect_db():
+    """Lease a connection from the shared MySQL pool; close() returns it to the pool"""
     try:
-        print(f"Connecting to database {MYSQL_DB} on {MYSQL_HOST}:{MYSQL_PORT}")
-        connection = pymysql.connect(
-            host=MYSQL_HOST,
-            user=MYSQL_USER,
-            password=MYSQL_PASSWORD,
-            database=MYSQL_DB,
-            port=MYSQL_PORT,
-            ssl=False
-        )
-        print("Database connection successful")
-        return connection
+        return get_db_connection()
+    except PoolTimeoutError as e:
+        print(f"Database pool exhausted: {str(e)}")
+        raise HTTPException(status_code=503, detail="Database is busy, please retry")
     except Exception as e:
         print(f"Database connection error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Database connection error: {str(e)}")
 
+# Hot queries, module-level so `python -m services.api.db.query_plans` EXPLAINs
+# exactly the SQL the endpoints run
+PASSED_LECTURES_QUERY = """
+    SELECT LectureID
+    FROM LectureResults
+    WHERE LearnerID = %s AND CourseID = %s AND State = 'passed'
+"""
+
+ENROLLED_COURSES_QUERY = """
+    SELECT 
+        c.CourseID as id, 
+        c.CourseName as name, 
+        CONCAT(i.InstructorName, ' (', i.AccountName, ')') as instructor,
+        c.Descriptions as description,
+        COALESCE(s.EnrolledCount, 0) as enrolled,
+        s.RatingSum / NULLIF(s.RatingCount, 0) as rating
+    FROM Enrollments e
+    JOIN Courses c ON c.CourseID = e.CourseID
+    JOIN Instructors i ON c.InstructorID = i.InstructorID
+    LEFT JOIN CourseStats s ON s.CourseID = c.CourseID
+    WHERE e.LearnerID = %s
+"""
+
+COURSE_AGGREGATE_QUERY = """
+    SELECT 
+        c.CourseID as id,
+        c.CourseName as name,
+        c.Descriptions as description,
+        c.EstimatedDuration as duration,
+        c.Skills as skills,
+        c.Difficulty as difficulty,
+        CONCAT(i.InstructorName, ' (', i.AccountName, ')') as instructor,
+        i.InstructorID as instructor_id,
+        COALESCE(s.EnrolledCount, 0) as enrolled,
+        s.RatingSum / NULLIF(s.RatingCount, 0) as rating
+    FROM Courses c
+    JOIN Instructors i ON c.InstructorID = i.InstructorID
+    LEFT JOIN CourseStats s ON s.CourseID = c.CourseID
+    WHERE c.CourseID = %s
+"""
+
+COURSE_AGGREGATE_LECTURES_QUERY = """
+    SELECT 
+        LectureID as id,
+        Title as title,
+        Description as description
+    FROM Lectures
+    WHERE CourseID = %s
+    ORDER BY LectureID ASC
+"""
+
+COURSE_LECTURES_QUERY = """
+    SELECT 
+        l.LectureID as id, 
+        l.CourseID as courseId,
+        l.Title as title, 
+        l.Description as description
+    FROM Lectures l
+    WHERE l.CourseID = %s
+    ORDER BY l.LectureID
+"""
+
+INSTRUCTOR_COURSES_QUERY = """
+    SELECT 
+        c.CourseID as id, 
+        c.CourseName as name, 
+        CONCAT(i.InstructorName, ' (', i.AccountName, ')') as instructor,
+        c.Descriptions as description,
+        COALESCE(s.EnrolledCount, 0) as enrolled,
+        COALESCE(s.RatingSum / NULLIF(s.RatingCount, 0), 0) as rating
+    FROM Courses c
+    JOIN Instructors i ON c.InstructorID = i.InstructorID
+    LEFT JOIN CourseStats s ON s.CourseID = c.CourseID
+    WHERE c.InstructorID = %s
+    ORDER BY c.CourseID DESC
+"""
+
+LEARNER_ENROLLED_COUNT_QUERY = "SELECT COUNT(*) as count FROM Enrollments WHERE LearnerID = %s"
+LEARNER_COMPLETED_COUNT_QUERY = "SELECT COUNT(*) as count FROM Enrollments WHERE LearnerID = %s AND Percentage = 100"
+LEARNER_PASSED_COUNT_QUERY = "SELECT COUNT(*) as count FROM LectureResults WHERE LearnerID = %s AND State = 'passed'"
+
+LEARNER_PASSED_HISTORY_QUERY = """
+    SELECT Date, Score, 
+            DATE_FORMAT(Date, '%%Y-%%m-%%d') as formatted_date
+    FROM LectureResults
+    WHERE LearnerID = %s AND State = 'passed'
+    ORDER BY Date
+"""
+
+LEARNER_DASHBOARD_COURSES_QUERY = """
+    SELECT
+        c.CourseID as id, 
+        c.CourseName as name, 
+        CONCAT(i.InstructorName, ' (', i.AccountName, ')') as instructor,
+        c.Descriptions as description,
+        e.Percentage as percentage
+    FROM Courses c
+    JOIN Instructors i ON c.InstructorID = i.InstructorID
+    JOIN Enrollments e ON c.CourseID = e.CourseID
+    WHERE e.LearnerID = %s
+"""
+
+# Instructor dashboard: course list summary (all-time rollup totals per course)
+INSTRUCTOR_DASHBOARD_COURSES_QUERY = """
+    SELECT
+        c.CourseID   AS id,
+        c.CourseName AS name,
+        c.Descriptions     AS description,
+        COALESCE(SUM(d.Enrollments), 0) AS enrollments,
+        COALESCE(SUM(d.RatingSum), 0)   AS rating_sum,
+        COALESCE(SUM(d.RatingCount), 0) AS rating_count,
+        COALESCE(SUM(d.Completions), 0) AS completions,
+        COALESCE(SUM(d.ProgressSum), 0) AS progress_sum
+    FROM Courses c
+    LEFT JOIN CourseDailyStats d ON d.CourseID = c.CourseID
+    WHERE c.InstructorID = %s
+    GROUP BY c.CourseID
+    ORDER BY c.CreatedAt DESC
+"""
+
+# Distinct learners cannot be summed from rollups
+INSTRUCTOR_STUDENTS_QUERY = """
+    SELECT COUNT(DISTINCT e.LearnerID) AS total_students
+    FROM Courses c
+    JOIN Enrollments e ON c.CourseID = e.CourseID
+    WHERE c.InstructorID = %s
+"""
+
+# Student growth (last 2 months)
+INSTRUCTOR_STUDENT_GROWTH_QUERY = """
+    SELECT
+        DATE_FORMAT(EnrollmentDate, '%%Y-%%m') AS month,
+        COUNT(DISTINCT LearnerID) AS students
+    FROM Courses c
+    JOIN Enrollments e ON c.CourseID = e.CourseID
+    WHERE c.InstructorID = %s
+      AND EnrollmentDate >= DATE_SUB(CURRENT_DATE, INTERVAL 2 MONTH)
+    GROUP BY month
+    ORDER BY month DESC
+    LIMIT 2
+"""
+
+# Enrollment and rating trends (last 30 days)
+INSTRUCTOR_TRENDS_QUERY = """
+    SELECT
+        DATE_FORMAT(d.Day, '%%Y-%%m-%%d') AS date,
+        SUM(d.Enrollments)               AS enrollments,
+        SUM(d.RatingSum)                 AS rating_sum,
+        SUM(d.RatingCount)               AS rating_count
+    FROM Courses c
+    JOIN CourseDailyStats d ON d.CourseID = c.CourseID
+    WHERE c.InstructorID = %s
+      AND d.Day >= DATE_SUB(CURRENT_DATE, INTERVAL 30 DAY)
+    GROUP BY d.Day
+    ORDER BY d.Day
+"""
+
+# Course enroll/ratings trends (60 days)
+COURSE_TRENDS_QUERY = """
+    SELECT
+        DATE_FORMAT(Day, '%%Y-%%m-%%d') AS date,
+        Enrollments                   AS enrollments,
+        RatingSum                     AS rating_sum,
+        RatingCount                   AS rating_count
+    FROM CourseDailyStats
+    WHERE CourseID = %s
+      AND Day >= DATE_SUB(CURRENT_DATE, INTERVAL 60 DAY)
+    ORDER BY Day
+"""
+
+# Completion via LectureResults (30 days); distinct learners per day are not in the rollups
+COURSE_COMPLETION_TRENDS_QUERY = """
+    SELECT
+        DATE_FORMAT(lr.Date, '%%Y-%%m-%%d') AS date,
+        COUNT(DISTINCT CASE WHEN e.Percentage = 100 THEN e.LearnerID END) AS completed,
+        COUNT(DISTINCT lr.LearnerID)                           AS total
+    FROM LectureResults lr
+    JOIN Enrollments e
+      ON lr.LearnerID = e.LearnerID AND lr.CourseID = e.CourseID
+    WHERE lr.CourseID = %s
+      AND lr.Date >= DATE_SUB(CURRENT_DATE, INTERVAL 30 DAY)
+    GROUP BY date
+    ORDER BY date
+"""
+
+# Lecture-level analytics (submitted results only)
+LECTURE_ANALYTICS_QUERY = """
+    SELECT
+        l.LectureID                           AS lectureId,
+        l.Title                               AS lecture_title,
+        COALESCE(SUM(ld.Attempts), 0)         AS total_attempts,
+        COALESCE(SUM(ld.Passes), 0)           AS passed_count,
+        COALESCE(SUM(ld.ScoreSum), 0)         AS score_sum
+    FROM Lectures l
+    LEFT JOIN LectureDailyStats ld
+      ON ld.LectureID = l.LectureID
+    WHERE l.CourseID = %s
+    GROUP BY l.LectureID, l.Title
+    ORDER BY l.LectureID
+"""
+
+# Student progress distribution
+COURSE_PROGRESS_QUERY = """
+    SELECT
+        CASE
+          WHEN Percentage = 0 THEN 'Not Started'
+          WHEN Percentage < 25 THEN '0-25%%'
+          WHEN Percentage < 50 THEN '25-50%%'
+          WHEN Percentage < 75 THEN '50-75%%'
+          WHEN Percentage < 100 THEN '75-99%%'
+          ELSE 'Completed'
+        END AS progress_range,
+        COUNT(*) AS student_count
+    FROM Enrollments
+    WHERE CourseID = %s
+    GROUP BY progress_range
+    ORDER BY
+      FIELD(progress_range,
+            'Not Started','0-25%%','25-50%%',
+            '50-75%%','75-99%%','Completed')
+"""
+
+LATEST_QUIZ_RESULT_QUERY = """
+    SELECT Score, State, Date
+    FROM LectureResults
+    WHERE LearnerID = %s AND LectureID = %s
+    ORDER BY Date DESC
+    LIMIT 1
+"""
+
+def passed_lectures_loader(learner_id, course_id):
+    """Database fetch of a learner's passed lectures in a course, for get_passed_lectures"""
+    async def fetch_passed_lectures_from_db():
+        rows = await fetch_all(PASSED_LECTURES_QUERY, (learner_id, course_id))
+        return [row['LectureID'] for row in rows]
+    return fetch_passed_lectures_from_db
+
+def learner_enrollments_loader(learner_id):
+    """Database fetch of a learner's (CourseID, Rating) enrollments, for get_learner_enrollments"""
+    async def fetch_learner_enrollments_from_db():
+        rows = await fetch_all("""
+            SELECT CourseID, Rating
+            FROM Enrollments
+            WHERE LearnerID = %s
+        """, (learner_id,))
+        return [(row['CourseID'], row['Rating']) for row in rows]
+    return fetch_learner_enrollments_from_db
+
+class CatalogPage(NamedTuple):
+    """One page of the public catalog: sort order, page size, position and filters"""
+    sort: str = "newest"
+    limit: int = CATALOG_PAGE_SIZE
+    cursor: Optional[str] = None
+    difficulty: Optional[str] = None
+    skills: Tuple[str, ...] = ()
+    min_duration: Optional[int] = None
+    max_duration: Optional[int] = None
+
+# Keyset sort orders, all descending: {sort: (table driving the scan, key columns)}.
+# Key columns come from one table so the scan follows an index (see db/Database.sql).
+CATALOG_SORTS = {
+    "newest": ("c", ("c.CourseID",)),
+    "rating": ("s", ("s.AvgRating", "s.CourseID")),
+    "enrolled": ("s", ("s.EnrolledCount", "s.CourseID")),
+}
+
+def encode_catalog_cursor(sort, key):
+    """Opaque token for the page after a row with the given sort key values"""
+    payload = json.dumps({"s": sort, "k": [str(value) for value in key]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_catalog_cursor(sort, cursor):
+    """Sort key values from a next_cursor token; 400 if it is malformed or for another sort"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if payload["s"] != sort or len(payload["k"]) != len(CATALOG_SORTS[sort][1]):
+            raise ValueError("cursor does not match sort")
+        # Rating keys are DECIMAL, the rest are integers
+        return [Decimal(value) if column == "s.AvgRating" else int(value)
+                for column, value in zip(CATALOG_SORTS[sort][1], payload["k"])]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def escape_like(value):
+    """Escape LIKE wildcards in a user-supplied value"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def build_catalog_query(page):
+    """SQL and parameters for one catalog page, fetching one extra row to detect a next page"""
+    driver, key_columns = CATALOG_SORTS[page.sort]
+    where, params = [], []
+
+    if page.cursor:
+        key = decode_catalog_cursor(page.sort, page.cursor)
+        if len(key_columns) == 1:
+            where.append(f"{key_columns[0]} < %s")
+            params.append(key[0])
+        else:
+            # Expanded (a < x OR (a = x AND b < y)) so MySQL uses it as an index range
+            first, second = key_columns
+            where.append(f"({first} < %s OR ({first} = %s AND {second} < %s))")
+            params.extend([key[0], key[0], key[1]])
+    if page.difficulty:
+        where.append("c.Difficulty = %s")
+        params.append(page.difficulty)
+    if page.min_duration is not None:
+        where.append("c.EstimatedDuration >= %s")
+        params.append(page.min_duration)
+    if page.max_duration is not None:
+        where.append("c.EstimatedDuration <= %s")
+        params.append(page.max_duration)
+    for skill in page.skills:
+        # Skills is a JSON array of strings; a quoted substring match also tolerates legacy text
+        where.append("c.Skills LIKE %s")
+        params.append(f'%"{escape_like(skill)}"%')
+
+    if driver == "c":
+        source = "Courses c LEFT JOIN CourseStats s ON s.CourseID = c.CourseID"
+    else:
+        # Every course has a CourseStats row (trg_after_insert_course), so an inner join is safe
+        source = "CourseStats s JOIN Courses c ON c.CourseID = s.CourseID"
+
+    query = f"""
+    SELECT 
+        c.CourseID as id, 
+        c.CourseName as name, 
+        CONCAT(i.InstructorName, ' (', i.AccountName, ')') as instructor,
+        c.Descriptions as description,
+        COALESCE(s.EnrolledCount, 0) as enrolled,
+        s.RatingSum / NULLIF(s.RatingCount, 0) as rating,
+        COALESCE(s.AvgRating, 0) as sort_rating
+    FROM {source}
+    JOIN Instructors i ON c.InstructorID = i.InstructorID
+    {"WHERE " + " AND ".join(where) if where else ""}
+    ORDER BY {", ".join(f"{column} DESC" for column in key_columns)}
+    LIMIT %s
+    """
+    params.append(page.limit + 1)
+    return query, params
+
+def catalog_sort_key(page, course):
+    """Values of the page's key columns for a fetched row"""
+    return {
+        "newest": (course['id'],),
+        "rating": (course['sort_rating'], course['id']),
+        "enrolled": (course['enrolled'], course['id']),
+    }[page.sort]
+
+async def fetch_catalog_from_db(page=CatalogPage()):
+    """One page of the public catalog with enrollment and rating stats, plus the next page's cursor"""
+    query, params = build_catalog_query(page)
+    # Enrollment and rating stats come from CourseStats, kept up to date by triggers
+    courses = await fetch_all(query, params)
+
+    next_cursor = None
+    if len(courses) > page.limit:
+        courses = courses[:page.limit]
+        next_cursor = encode_catalog_cursor(page.sort, catalog_sort_key(page, courses[-1]))
+
+    # Format the data efficiently
+    formatted_courses = []
+    for course in courses:
+        formatted_courses.append({
+            'id': course['id'],
+            'name': course['name'],
+            'instructor': course['instructor'],
+            'description': course['description'],
+            'enrolled': course['enrolled'],
+            'rating': float(course['rating']) if course['rating'] else None
+        })
+
+    return formatted_courses, next_cursor
+
+def catalog_cache_key(page):
+    """Cache key for one catalog page; every page is tagged "catalog" so writes drop them all"""
+    digest = hashlib.blake2b(repr(tuple(page)).encode("utf-8"), digest_size=8).hexdigest()
+    return f"{CATALOG_CACHE_KEY}:{digest}"
+
+async def get_catalog(if_none_match=None, page=CatalogPage()):
+    """Cached catalog page, as a CachedValue holding a render_page value (next cursor and gzip body)"""
+    return await get_cached_page(
+        catalog_cache_key(page),
+        partial(fetch_catalog_from_db, page),
+        List[Course],
+        ttl=3600,  # Hard limit; writes invalidate the key explicitly
+        soft_ttl=900,  # After 15 minutes serve stale and refresh in the background
+        l1_ttl=60,  # Every learner reads the catalog, keep it decoded in-process
+        tags=["catalog"],
+        if_none_match=if_none_match
+    )
+
+async def fetch_enrolled_courses_from_db(learner_id):
+    """A learner's enrolled courses with enrollment and rating stats, in one query"""
+    courses = await fetch_all(ENROLLED_COURSES_QUERY, (learner_id,))
+
+    return [
+        {
+            'id': course['id'],
+            'name': course['name'],
+            'instructor': course['instructor'],
+            'description': course['description'],
+            'enrolled': course['enrolled'],
+            'rating': float(course['rating']) if course['rating'] else None
+        }
+        for course in courses
+    ]
+
+async def fetch_course_aggregate_from_db(course_id):
+    """Course fields, enrollment count, average rating and lecture list, shared by all users"""
+    async with async_db_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(COURSE_AGGREGATE_QUERY, (course_id,))
+            course = await cursor.fetchone()
+            
+            if not course:
+                raise HTTPException(status_code=404, detail="Course not found")
+            
+            # Get lectures for this course
+            await cursor.execute(COURSE_AGGREGATE_LECTURES_QUERY, (course_id,))
+            lectures = await cursor.fetchall()
+            
+            # Format skills if it's JSON
+            skills = []
+            if course['skills']:
+                try:
+                    skills = json.loads(course['skills'])
+                except:
+                    skills = []
+            
+            return {
+                'id': course['id'],
+                'name': course['name'],
+                'description': course['description'],
+                'duration': course['duration'],
+                'skills': skills,
+                'difficulty': course['difficulty'],
+                'instructor': course['instructor'],
+                'instructor_id': course['instructor_id'],
+                'enrolled': course['enrolled'],
+                'rating': float(course['rating']) if course['rating'] else None,
+                'lectures': [
+                    {
+                        'id': lecture['id'],
+                        'title': lecture['title'],
+                        'description': lecture['description']
+                    }
+                    for lecture in lectures
+                ]
+            }
+
+async def get_course_aggregate(course_id, if_none_match=None):
+    """Cached shared course document as a CachedValue, versioned by the course's generation counter"""
+    generations = await get_generations(f"course:{course_id}")
+    cache_key = f"course:aggregate:{course_id}:g{generations[f'course:{course_id}']}"
+    return await get_cached_entry(
+        cache_key,
+        partial(fetch_course_aggregate_from_db, course_id),
+        ttl=3600,
+        soft_ttl=1800,  # Serve stale after 30 minutes while refreshing
+        use_compression=True,
+        l1_ttl=30,
+        negative_ttl=60,  # Remember unknown course IDs briefly; creating the course bumps its generation
+        if_none_match=if_none_match
+    )
+
+def lecture_video_url(s3_key):
+    """Public URL of an indexed lecture video"""
+    return f"https://tlhmaterials.s3-{REGION}.amazonaws.com/{s3_key}"
+
+async def fetch_lecture_document_from_db(lecture_id):
+    """Lecture content, quiz and course lecture list, shared by all learners"""
+    async with async_db_connection() as conn:
+        async with conn.cursor() as cursor:
+            # Get lecture details with course data
+            query = """
+            SELECT 
+                l.LectureID as id,
+                l.CourseID as courseId,
+                l.Title as title,
+                l.Description as description,
+                l.Content as content,
+                c.CourseName as courseName,
+                c.CourseID,
+                c.Descriptions as courseDescription,
+                v.S3Key as videoKey
+            FROM Lectures l
+            JOIN Courses c ON l.CourseID = c.CourseID
+            LEFT JOIN LectureVideos v ON v.LectureID = l.LectureID
+            WHERE l.LectureID = %s
+            """
+            await cursor.execute(query, (lecture_id,))
+            lecture = await cursor.fetchone()
+
+            if not lecture:
+                raise HTTPException(status_code=404, detail="Lecture not found")
+
+            # Get course lectures (pass status is added per learner)
+            await cursor.execute("""
+            SELECT 
+                l.LectureID as id,
+                l.CourseID as courseId,
+                l.Title as title,
+                l.Description as description
+            FROM Lectures l
+            WHERE l.CourseID = %s
+            ORDER BY l.LectureID
+            """, (lecture['courseId'],))
+
+            course_lectures = await cursor.fetchall() or []
+
+            response_data = {
+                "id": lecture['id'],
+                "courseId": lecture['courseId'],
+                "title": lecture['title'],
+                "description": lecture['description'],
+                "content": lecture['content'],
+                "courseName": lecture['courseName'],
+                "courseDescription": lecture['courseDescription'],
+                "courseLectures": course_lectures,
+                # The video index is written on upload and reconciled with S3 in the background
+                "videoUrl": lecture_video_url(lecture['videoKey']) if lecture['videoKey'] else None,
+                "quiz": None  # Initialize quiz as None
+            }
+
+            # Get quiz if exists - fixing this part
+            await cursor.execute("""
+            SELECT q.QuizID, q.Title, q.Description
+            FROM Quizzes q
+            WHERE q.LectureID = %s
+            """, (lecture_id,))
+
+            quiz_data = await cursor.fetchone()
+            if quiz_data:
+                quiz = {
+                    "id": quiz_data['QuizID'],
+                    "title": quiz_data['Title'],
+                    "description": quiz_data['Description'],
+                    "questions": {}
+                }
+
+                # Get quiz questions
+                await cursor.execute("""
+                SELECT 
+                    q.QuestionID, 
+                    q.QuestionText,
+                    o.OptionID,
+                    o.OptionText,
+                    o.IsCorrect
+                FROM Questions q
+                JOIN Options o ON q.QuestionID = o.QuestionID
+                WHERE q.QuizID = %s
+                ORDER BY q.QuestionID, o.OptionID
+                """, (quiz_data['QuizID'],))
+
+                questions_data = await cursor.fetchall()
+                current_question_id = None
+                current_options = []
+                correct_option_index = 0
+
+                for row in questions_data:
+                    if current_question_id != row['QuestionID']:
+                        # Save previous question data
+                        if current_question_id is not None:
+                            quiz['questions'][str(current_question_id)] = {
+                                'question': question_text,
+                                'options': current_options,
+                                'correctAnswer': correct_option_index
+                            }
+
+                        # Start new question
+                        current_question_id = row['QuestionID']
+                        question_text = row['QuestionText']
+                        current_options = []
+                        correct_option_index = 0
+
+                    current_options.append(row['OptionText'])
+                    if row['IsCorrect']:
+                        correct_option_index = len(current_options) - 1
+
+                # Save the last question
+                if current_question_id is not None:
+                    quiz['questions'][str(current_question_id)] = {
+                        'question': question_text,
+                        'options': current_options,
+                        'correctAnswer': correct_option_index
+                    }
+
+                response_data['quiz'] = quiz
+
+            return response_data
+
+async def get_lecture_document(lecture_id):
+    """Cached shared lecture document as a CachedValue, versioned by the lecture's generation counter"""
+    generations = await get_generations(f"lecture:{lecture_id}")
+    cache_key = f"lectures:id:{lecture_id}:g{generations[f'lecture:{lecture_id}']}"
+    return await get_cached_entry(
+        cache_key,
+        partial(fetch_lecture_document_from_db, lecture_id),
+        ttl=3600,  # Cache for 1 hour
+        refresh_policy="xfetch",  # Refresh probabilistically shortly before expiry
+        use_compression=True,  # Enable compression for large response
+        l1_ttl=30,
+        negative_ttl=60  # Remember unknown lecture IDs briefly; creating the lecture bumps its generation
+    )
+
+# Entries the cache warmer can rebuild on startup, after invalidations and as prefetches
+register_warmer("catalog", get_catalog)
+register_warmer("course", get_course_aggregate)
+register_warmer("lecture", get_lecture_document)
+
 # Models
 class Course(BaseModel):
     id: int
@@ -130,7 +762,21 @@ class CourseDetails(BaseModel):
 
 # Optimized /courses endpoint
 @router.get("/courses", response_model=List[Course])
-async def get_courses(request: Request, auth_token: str = Cookie(None)):
+async def get_courses(
+    request: Request,
+    auth_token: str = Cookie(None),
+    limit: int = Query(CATALOG_PAGE_SIZE, ge=1, le=CATALOG_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: Literal["newest", "rating", "enrolled"] = "newest",
+    difficulty: Optional[Literal["Beginner", "Intermediate", "Advanced", "Expert"]] = None,
+    skills: Optional[List[str]] = Query(None),
+    min_duration: Optional[int] = Query(None, ge=0),
+    max_duration: Optional[int] = Query(None, ge=0)
+):
+    """
+    One page of the catalog. The cursor for the next page is sent in the X-Next-Cursor
+    header (absent on the last page); pass it back as ?cursor= with the same sort.
+    """
     try:
         # Authentication (keep existing code)
         if not auth_token:
@@ -147,78 +793,38 @@ async def get_courses(request: Request, auth_token: str = Cookie(None)):
             print(f"Token decode error: {str(e)}")
             raise HTTPException(status_code=401, detail="Invalid authentication token")
         
-        # Better cache key with shorter TTL for faster updates
-        cache_key = "courses:public:v2"
-        
-        # Optimized database fetch function
-        async def fetch_courses_from_db():
-            conn = connect_db()
-            try:
-                with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                    # Single optimized query with JOINs instead of N+1 queries
-                    query = """
-                    SELECT 
-                        c.CourseID as id, 
-                        c.CourseName as name, 
-                        CONCAT(i.InstructorName, ' (', i.AccountName, ')') as instructor,
-                        c.Descriptions as description,
-                        COALESCE(enrollment_stats.enrolled, 0) as enrolled,
-                        COALESCE(rating_stats.avg_rating, NULL) as rating
-                    FROM Courses c
-                    JOIN Instructors i ON c.InstructorID = i.InstructorID
-                    LEFT JOIN (
-                        SELECT 
-                            CourseID, 
-                            COUNT(*) as enrolled
-                        FROM Enrollments 
-                        GROUP BY CourseID
-                    ) enrollment_stats ON c.CourseID = enrollment_stats.CourseID
-                    LEFT JOIN (
-                        SELECT 
-                            CourseID, 
-                            AVG(Rating) as avg_rating
-                        FROM Enrollments 
-                        WHERE Rating IS NOT NULL 
-                        GROUP BY CourseID
-                    ) rating_stats ON c.CourseID = rating_stats.CourseID
-                    ORDER BY c.CourseID DESC
-                    LIMIT 50
-                    """
-                    
-                    cursor.execute(query)
-                    courses = cursor.fetchall()
-                    
-                    # Format the data efficiently
-                    formatted_courses = []
-                    for course in courses:
-                        formatted_courses.append({
-                            'id': course['id'],
-                            'name': course['name'],
-                            'instructor': course['instructor'],
-                            'description': course['description'],
-                            'enrolled': course['enrolled'],
-                            'rating': float(course['rating']) if course['rating'] else None
-                        })
-                    
-                    return formatted_courses
-            finally:
-                conn.close()
-        
-        # Use optimized caching with compression and shorter TTL
-        return await get_cached_data(
-            cache_key, 
-            fetch_courses_from_db, 
-            ttl=900,  # 15 minutes instead of 1 hour for faster updates
-            use_compression=True  # Enable compression for faster transfer
+        if cursor:
+            decode_catalog_cursor(sort, cursor)  # Reject bad cursors before they reach the cache
+        page = CatalogPage(
+            sort=sort,
+            limit=limit,
+            cursor=cursor,
+            difficulty=difficulty,
+            # Normalized so equivalent filters share a cache key
+            skills=tuple(sorted({skill.strip() for skill in skills or [] if skill.strip()})),
+            min_duration=min_duration,
+            max_duration=max_duration
         )
+
+        # Catalog pages are the same for everyone, so the cached response body is sent as is
+        value, etag = await load_conditional(request, lambda etags: get_catalog(etags, page))
+        if value is None:
+            return not_modified(etag, weak=True)
+        next_cursor, body = split_page(value)
+        response = body_response(request, body, etag)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Get course details
 # Optimize the course details endpoint with caching
 @router.get("/courses/{course_id}", response_model=CourseDetails)
-async def get_course_details(course_id: int, request: Request, auth_token: str = Cookie(None)):
+async def get_course_details(course_id: int, request: Request, response: Response, auth_token: str = Cookie(None)):
     try:
         # Authentication
         if not auth_token:
@@ -236,87 +842,19 @@ async def get_course_details(course_id: int, request: Request, auth_token: str =
             print(f"Token decode error: {str(e)}")
             raise HTTPException(status_code=401, detail="Invalid authentication token")
         
-        # Cache key for course details
-        cache_key = f"course:details:{course_id}:user:{user_id}"
-        
-        # Optimized database fetch function
-        async def fetch_course_details_from_db():
-            conn = connect_db()
-            try:
-                with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                    # Single query with all course info, enrollment status, and user's enrollment
-                    query = """
-                    SELECT 
-                        c.CourseID as id,
-                        c.CourseName as name,
-                        c.Descriptions as description,
-                        c.EstimatedDuration as duration,
-                        c.Skills as skills,
-                        c.Difficulty as difficulty,
-                        CONCAT(i.InstructorName, ' (', i.AccountName, ')') as instructor,
-                        i.InstructorID as instructor_id,
-                        COALESCE(enrollment_stats.enrolled, 0) as enrolled,
-                        COALESCE(rating_stats.avg_rating, NULL) as rating,
-                        CASE WHEN user_enrollment.LearnerID IS NOT NULL THEN TRUE ELSE FALSE END as is_enrolled
-                    FROM Courses c
-                    JOIN Instructors i ON c.InstructorID = i.InstructorID
-                    LEFT JOIN (
-                        SELECT CourseID, COUNT(*) as enrolled
-                        FROM Enrollments 
-                        GROUP BY CourseID
-                    ) enrollment_stats ON c.CourseID = enrollment_stats.CourseID
-                    LEFT JOIN (
-                        SELECT CourseID, AVG(Rating) as avg_rating
-                        FROM Enrollments 
-                        WHERE Rating IS NOT NULL 
-                        GROUP BY CourseID
-                    ) rating_stats ON c.CourseID = rating_stats.CourseID
-                    LEFT JOIN (
-                        SELECT CourseID, LearnerID
-                        FROM Enrollments e2
-                        JOIN Learners l ON e2.LearnerID = l.LearnerID
-                        WHERE l.LearnerID = %s
-                    ) user_enrollment ON c.CourseID = user_enrollment.CourseID
-                    WHERE c.CourseID = %s
-                    """
-                    
-                    cursor.execute(query, (user_id, course_id))
-                    course = cursor.fetchone()
-                    
-                    if not course:
-                        raise HTTPException(status_code=404, detail="Course not found")
-                    
-                    # Format skills if it's JSON
-                    skills = []
-                    if course['skills']:
-                        try:
-                            skills = json.loads(course['skills'])
-                        except:
-                            skills = []
-                    
-                    return {
-                        'id': course['id'],
-                        'name': course['name'],
-                        'description': course['description'],
-                        'duration': course['duration'],
-                        'skills': skills,
-                        'difficulty': course['difficulty'],
-                        'instructor': course['instructor'],
-                        'instructor_id': course['instructor_id'],
-                        'enrolled': course['enrolled'],
-                        'rating': float(course['rating']) if course['rating'] else None,
-                        'is_enrolled': course['is_enrolled']
-                    }
-            finally:
-                conn.close()
-        
-        # Use caching with 30 minutes TTL
-        return await get_cached_data(
-            cache_key,
-            fetch_course_details_from_db,
-            ttl=1800,  # 30 minutes
-            use_compression=True
+        # Shared course document plus this learner's enrollment
+        enrollments = await get_learner_enrollments(user_id, learner_enrollments_loader(user_id))
+        is_enrolled = course_id in enrollments
+        course, etag = await load_conditional(
+            request, lambda etags: get_course_aggregate(course_id, etags), is_enrolled
         )
+        if course is None:
+            return not_modified(etag)
+        
+        details = {field: value for field, value in course.items() if field != 'lectures'}
+        details['is_enrolled'] = is_enrolled
+        set_cache_headers(response, etag)
+        return details
         
     except HTTPException:
         raise
@@ -326,7 +864,7 @@ async def get_course_details(course_id: int, request: Request, auth_token: str =
 
 # Get lectures for a course
 @router.get("/courses/{course_id}/lectures", response_model=List[LectureListItem])
-async def get_course_lectures(request: Request, course_id: int, auth_token: str = Cookie(None)):
+async def get_course_lectures(request: Request, response: Response, course_id: int, auth_token: str = Cookie(None)):
     try:
         # Try to get token from Authorization header if cookie is not present
         if not auth_token:
@@ -343,56 +881,36 @@ async def get_course_lectures(request: Request, course_id: int, auth_token: str
             print(f"Token decode error: {str(e)}")
             raise HTTPException(status_code=401, detail="Invalid authentication token")
         
-        # Create cache key using course ID and user ID
-        cache_key = f"courses:id:{course_id}:lectures:user:{user_data.get('user_id', 'anonymous')}"
+        # The lecture list is shared by all learners; pass status is overlaid per learner
+        generations = await get_generations(f"course:{course_id}")
+        cache_key = f"courses:id:{course_id}:g{generations[f'course:{course_id}']}:lectures"
         
         # Define database fetch function
         async def fetch_lectures_from_db():
-            conn = connect_db()
-            lectures = []
-            
-            try:
-                with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+            async with async_db_connection() as conn:
+                async with conn.cursor() as cursor:
                     # First verify the course exists
-                    cursor.execute("SELECT CourseID FROM Courses WHERE CourseID = %s", (course_id,))
-                    if not cursor.fetchone():
+                    await cursor.execute("SELECT CourseID FROM Courses WHERE CourseID = %s", (course_id,))
+                    if not await cursor.fetchone():
                         raise HTTPException(status_code=404, detail="Course not found")
 
-                    # Get lectures with pass status for the current user
-                    query = """
-                    SELECT 
-                        l.LectureID as id, 
-                        l.CourseID as courseId,
-                        l.Title as title, 
-                        l.Description as description,
-                        CASE 
-                            WHEN lr.State = 'passed' THEN 1
-                            ELSE 0
-                        END as passed
-                    FROM Lectures l
-                    LEFT JOIN LectureResults lr ON l.LectureID = lr.LectureID 
-                        AND lr.LearnerID = %s 
-                        AND lr.CourseID = %s
-                    WHERE l.CourseID = %s
-                    ORDER BY l.LectureID
-                    """
-                    cursor.execute(query, (user_data.get('user_id'), course_id, course_id))
-                    lectures = cursor.fetchall()
-                    
-                    # Ensure all fields match the LectureListItem model
-                    for lecture in lectures:
-                        # Ensure the fields exist and have appropriate null values if missing
-                        if lecture.get('description') is None:
-                            lecture['description'] = None
-                        # Convert passed from 1/0 to True/False
-                        lecture['passed'] = bool(lecture.get('passed', 0))
-            finally:
-                conn.close()
-                
-            return lectures
+                    # Get the course's lectures (pass status is added per learner)
+                    await cursor.execute(COURSE_LECTURES_QUERY, (course_id,))
+                    return await cursor.fetchall()
             
+        learner_id = user_data.get('user_id')
+        passed = await get_passed_lectures(learner_id, course_id, passed_lectures_loader(learner_id, course_id))
+        
         # Use cached data helper
-        return await get_cached_data(cache_key, fetch_lectures_from_db, ttl=3600)
+        lectures, etag = await load_conditional(
+            request,
+            lambda etags: get_cached_entry(cache_key, fetch_lectures_from_db, ttl=3600, if_none_match=etags),
+            sorted(passed)
+        )
+        if lectures is None:
+            return not_modified(etag)
+        set_cache_headers(response, etag)
+        return apply_passed_overlay(lectures, passed)
     except HTTPException:
         raise
     except Exception as e:
@@ -401,7 +919,7 @@ async def get_course_lectures(request: Request, course_id: int, auth_token: str
 
 # Get lecture details
 @router.get("/lectures/{lecture_id}", response_model=LectureDetails)
-async def get_lecture_details(request: Request, lecture_id: int, auth_token: str = Cookie(None)):
+async def get_lecture_details(request: Request, response: Response, lecture_id: int, auth_token: str = Cookie(None)):
     try:
         # Try to get token from Authorization header if cookie is not present
         if not auth_token:
@@ -419,165 +937,25 @@ async def get_lecture_details(request: Request, lecture_id: int, auth_token: str
             print(f"Token decode error: {str(e)}")
             raise HTTPException(status_code=401, detail="Invalid authentication token")
         
-        # Create cache key using lecture ID and user ID
-        cache_key = f"lectures:id:{lecture_id}:user:{user_data.get('user_id', 'anonymous')}"
-        
-        # Define database fetch function
-        async def fetch_lecture_from_db():
-            conn = connect_db()
-            cursor = None
-            try:
-                cursor = conn.cursor(pymysql.cursors.DictCursor)
-                # Get lecture details with course data
-                query = """
-                SELECT 
-                    l.LectureID as id,
-                    l.CourseID as courseId,
-                    l.Title as title,
-                    l.Description as description,
-                    l.Content as content,
-                    c.CourseName as courseName,
-                    c.CourseID,
-                    c.Descriptions as courseDescription
-                FROM Lectures l
-                JOIN Courses c ON l.CourseID = c.CourseID
-                WHERE l.LectureID = %s
-                """
-                cursor.execute(query, (lecture_id,))
-                lecture = cursor.fetchone()
-                
-                if not lecture:
-                    raise HTTPException(status_code=404, detail="Lecture not found")
-            
-                # Get course lectures with pass status
-                cursor.execute("""
-                SELECT 
-                    l.LectureID as id,
-                    l.CourseID as courseId,
-                    l.Title as title,
-                    l.Description as description,
-                    CASE 
-                        WHEN lr.State = 'passed' THEN 1
-                        ELSE 0
-                    END as passed
-                FROM Lectures l
-                LEFT JOIN LectureResults lr ON l.LectureID = lr.LectureID 
-                    AND lr.LearnerID = %s 
-                    AND lr.CourseID = %s
-                WHERE l.CourseID = %s
-                ORDER BY l.LectureID
-                """, (user_data.get('user_id'), lecture['courseId'], lecture['courseId']))
-                
-                course_lectures = cursor.fetchall()
-                if not course_lectures:
-                    course_lectures = []
-                else:
-                    # Convert passed from 1/0 to True/False for each lecture
-                    for course_lecture in course_lectures:
-                        if course_lecture.get('description') is None:
-                            course_lecture['description'] = None
-                        course_lecture['passed'] = bool(course_lecture.get('passed', 0))
-
-                response_data = {
-                    "id": lecture['id'],
-                    "courseId": lecture['courseId'],
-                    "title": lecture['title'],
-                    "description": lecture['description'],
-                    "content": lecture['content'],
-                    "courseName": lecture['courseName'],
-                    "courseDescription": lecture['courseDescription'],
-                    "courseLectures": course_lectures,
-                    "videoUrl": None,
-                    "quiz": None  # Initialize quiz as None
-                }
+        entry = await get_lecture_document(lecture_id)
+        lecture = entry.data
 
-                # Get video URL if exists
-                video_path = f"videos/cid{lecture['courseId']}/lid{lecture['id']}/vid_lecture.mp4"
-                try:
-                    s3.head_object(Bucket="tlhmaterials", Key=video_path)
-                    response_data['videoUrl'] = f"https://tlhmaterials.s3-{REGION}.amazonaws.com/{video_path}"
-                except:
-                    pass  # Keep videoUrl as None if no video exists
+        # Learners usually continue to the next lecture, so start loading it now
+        lecture_ids = [course_lecture['id'] for course_lecture in lecture['courseLectures']]
+        if lecture_id in lecture_ids and lecture_ids.index(lecture_id) + 1 < len(lecture_ids):
+            schedule_warm("lecture", lecture_ids[lecture_ids.index(lecture_id) + 1], prefetch=True)
 
-                # Get quiz if exists - fixing this part
-                cursor.execute("""
-                SELECT q.QuizID, q.Title, q.Description
-                FROM Quizzes q
-                WHERE q.LectureID = %s
-                """, (lecture_id,))
-                
-                quiz_data = cursor.fetchone()
-                if quiz_data:
-                    quiz = {
-                        "id": quiz_data['QuizID'],
-                        "title": quiz_data['Title'],
-                        "description": quiz_data['Description'],
-                        "questions": {}
-                    }
-                    
-                    # Get quiz questions
-                    cursor.execute("""
-                    SELECT 
-                        q.QuestionID, 
-                        q.QuestionText,
-                        o.OptionID,
-                        o.OptionText,
-                        o.IsCorrect
-                    FROM Questions q
-                    JOIN Options o ON q.QuestionID = o.QuestionID
-                    WHERE q.QuizID = %s
-                    ORDER BY q.QuestionID, o.OptionID
-                    """, (quiz_data['QuizID'],))
-                    
-                    questions_data = cursor.fetchall()
-                    current_question_id = None
-                    current_options = []
-                    correct_option_index = 0
-                    
-                    for row in questions_data:
-                        if current_question_id != row['QuestionID']:
-                            # Save previous question data
-                            if current_question_id is not None:
-                                quiz['questions'][str(current_question_id)] = {
-                                    'question': question_text,
-                                    'options': current_options,
-                                    'correctAnswer': correct_option_index
-                                }
-                            
-                            # Start new question
-                            current_question_id = row['QuestionID']
-                            question_text = row['QuestionText']
-                            current_options = []
-                            correct_option_index = 0
-                        
-                        current_options.append(row['OptionText'])
-                        if row['IsCorrect']:
-                            correct_option_index = len(current_options) - 1
-                    
-                    # Save the last question
-                    if current_question_id is not None:
-                        quiz['questions'][str(current_question_id)] = {
-                            'question': question_text,
-                            'options': current_options,
-                            'correctAnswer': correct_option_index
-                        }
-                    
-                    response_data['quiz'] = quiz
-                
-                return response_data
-            finally:
-                if cursor:
-                    cursor.close()
-                if conn:
-                    conn.close()
+        # Overlay this learner's progress on a copy; the cached document is shared
+        learner_id = user_data.get('user_id')
+        passed = await get_passed_lectures(learner_id, lecture['courseId'], passed_lectures_loader(learner_id, lecture['courseId']))
         
-        # Use the caching mechanism to get the data
-        return await get_cached_data(
-            cache_key,
-            fetch_lecture_from_db,
-            ttl=3600,  # Cache for 1 hour
-            use_compression=True  # Enable compression for large response
-        )
+        # The pass status lookup needs the document's courseId, so the document is always
+        # loaded; a 304 still skips validating and serializing the content and quiz
+        etag = compose_etag(entry.etag, sorted(passed))
+        if etag_matches(etag, request_etags(request)):
+            return not_modified(etag)
+        set_cache_headers(response, etag)
+        return {**lecture, "courseLectures": apply_passed_overlay(lecture['courseLectures'], passed)}
             
     except HTTPException:
         raise
@@ -615,47 +993,27 @@ async def get_instructor_courses(
         
         # Define database fetch function
         async def fetch_instructor_courses_from_db():
-            conn = connect_db()
-            try:
-                with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+            async with async_db_connection() as conn:
+                async with conn.cursor() as cursor:
                     # Get instructor ID from token or fallback to database lookup
                     current_instructor_id = instructor_id
                     if not current_instructor_id:
                         # Fallback for old tokens without user_id
-                        cursor.execute("""
+                        await cursor.execute("""
                             SELECT InstructorID 
                             FROM Instructors 
                             WHERE AccountName = %s
                         """, (username,))
                         
-                        instructor = cursor.fetchone()
+                        instructor = await cursor.fetchone()
                         if not instructor:
                             raise HTTPException(status_code=404, detail="Instructor not found")
                         
                         current_instructor_id = instructor['InstructorID']
                     
                     # Get courses by this instructor
-                    query = """
-                        SELECT 
-                            c.CourseID as id, 
-                            c.CourseName as name, 
-                            CONCAT(i.InstructorName, ' (', i.AccountName, ')') as instructor,
-                            c.Descriptions as description,
-                            (SELECT COUNT(*) FROM Enrollments WHERE CourseID = c.CourseID) as enrolled,
-                            COALESCE(
-                                (SELECT AVG(Rating) 
-                                 FROM Enrollments 
-                                 WHERE CourseID = c.CourseID AND Rating IS NOT NULL),
-                                0
-                            ) as rating
-                        FROM Courses c
-                        JOIN Instructors i ON c.InstructorID = i.InstructorID
-                        WHERE c.InstructorID = %s
-                        ORDER BY c.CourseID DESC
-                    """
-                    
-                    cursor.execute(query, (current_instructor_id,))
-                    courses = cursor.fetchall()
+                    await cursor.execute(INSTRUCTOR_COURSES_QUERY, (current_instructor_id,))
+                    courses = await cursor.fetchall()
                     
                     # Format the courses data
                     formatted_courses = []
@@ -671,15 +1029,14 @@ async def get_instructor_courses(
                         formatted_courses.append(formatted_course)
                     
                     return formatted_courses
-            finally:
-                conn.close()
         
         # Use the caching mechanism to get the data
         return await get_cached_data(
             cache_key,
             fetch_instructor_courses_from_db,
             ttl=1800,  # Cache for 30 minutes
-            use_compression=True  # Enable compression for large response
+            use_compression=True,  # Enable compression for large response
+            tags=[f"instructor:{instructor_id or username}"]
         )
             
     except HTTPException as he:
@@ -726,75 +1083,79 @@ async def create_course(
             if role != "Instructor":
                 raise HTTPException(status_code=403, detail="Only instructors can create courses")
             
-            # Connect to database
-            conn = connect_db()
-            
-            with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                # Get instructor ID from token or fallback to database lookup
-                if not instructor_id:
-                    # Fallback for old tokens without user_id
-                    cursor.execute("""
-                        SELECT InstructorID 
-                        FROM Instructors 
-                        WHERE AccountName = %s
-                    """, (username,))
+            def insert_course():
+                conn = connect_db()
+                try:
+                    with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                        # Get instructor ID from token or fallback to database lookup
+                        current_instructor_id = instructor_id
+                        if not current_instructor_id:
+                            # Fallback for old tokens without user_id
+                            cursor.execute("""
+                                SELECT InstructorID 
+                                FROM Instructors 
+                                WHERE AccountName = %s
+                            """, (username,))
                     
-                    instructor = cursor.fetchone()
-                    if not instructor:
-                        raise HTTPException(status_code=404, detail="Instructor not found")
+                            instructor = cursor.fetchone()
+                            if not instructor:
+                                raise HTTPException(status_code=404, detail="Instructor not found")
                     
-                    instructor_id = instructor['InstructorID']
+                            current_instructor_id = instructor['InstructorID']
                 
-                # Insert new course
-                cursor.execute("""
-                    INSERT INTO Courses 
-                    (CourseName, Descriptions, Skills, Difficulty, EstimatedDuration, InstructorID) 
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """, (
-                    course_data.name, 
-                    course_data.description, 
-                    json.dumps(course_data.skills), 
-                    course_data.difficulty, 
-                    course_data.duration or "Self-paced", 
-                    instructor_id
-                ))
-                
-                # Get the created course ID
-                course_id = cursor.lastrowid
-                conn.commit()
-                
-                # Return the created course
-                cursor.execute("""
-                    SELECT 
-                        c.CourseID as id, 
-                        c.CourseName as name, 
-                        CONCAT(i.InstructorName, ' (', i.AccountName, ')') as instructor,
-                        c.Descriptions as description,
-                        0 as enrolled,
-                        NULL as rating
-                    FROM Courses c
-                    JOIN Instructors i ON c.InstructorID = i.InstructorID
-                    WHERE c.CourseID = %s
-                """, (course_id,))
+                        # Insert new course
+                        cursor.execute("""
+                            INSERT INTO Courses 
+                            (CourseName, Descriptions, Skills, Difficulty, EstimatedDuration, InstructorID) 
+                            VALUES (%s, %s, %s, %s, %s, %s)
+                        """, (
+                            course_data.name, 
+                            course_data.description, 
+                            json.dumps(course_data.skills), 
+                            course_data.difficulty, 
+                            course_data.duration or "Self-paced", 
+                            current_instructor_id
+                        ))
                 
-                new_course = cursor.fetchone()
-                if not new_course:
-                    raise HTTPException(status_code=500, detail="Course was created but couldn't be retrieved")
+                        # Get the created course ID
+                        course_id = cursor.lastrowid
+                        conn.commit()
                 
-                # Invalidate Valkey cache for all courses and instructor-specific cache
-                pattern_all = "courses:all"
-                pattern_instructor = f"instructor:courses:{instructor_id or username}"
-                pattern_course_details = f"courses:id"  # Invalidate specific course details too
-                print(f"Invalidating cache patterns: {pattern_all}, {pattern_instructor}, and {pattern_course_details}")
-                invalidate_cache_pattern(pattern_all)
-                invalidate_cache_pattern(pattern_course_details)
-                invalidate_cache([pattern_instructor])
+                        # Return the created course
+                        cursor.execute("""
+                            SELECT 
+                                c.CourseID as id, 
+                                c.CourseName as name, 
+                                CONCAT(i.InstructorName, ' (', i.AccountName, ')') as instructor,
+                                c.Descriptions as description,
+                                0 as enrolled,
+                                NULL as rating
+                            FROM Courses c
+                            JOIN Instructors i ON c.InstructorID = i.InstructorID
+                            WHERE c.CourseID = %s
+                        """, (course_id,))
                 
-                return new_course
+                        new_course = cursor.fetchone()
+                        if not new_course:
+                            raise HTTPException(status_code=500, detail="Course was created but couldn't be retrieved")
+                        return new_course, current_instructor_id
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    conn.close()
+
+            new_course, instructor_id = await run_blocking(insert_course)
+
+            # Invalidate the course catalog and the instructor's course list
+            await invalidate_tags(["catalog", f"instructor:{instructor_id or username}"])
+            # Clear any cached 404 for the new course ID
+            await bump_generations([f"course:{new_course['id']}"])
+            schedule_warm("catalog")
+            
+            return new_course
                 
         except Exception as e:
-            if 'conn' in locals():
-                conn.rollback()
             print(f"Database error: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
             
@@ -803,9 +1164,6 @@ async def create_course(
     except Exception as e:
         print(f"Error creating course: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 # Enroll in a course
 @router.post("/courses/{course_id}/enroll")
@@ -827,92 +1185,90 @@ async def enroll_in_course(
         try:
             user_data = decode_token(auth_token)
             learner_id = user_data.get('user_id')
-            
-            if not learner_id:
-                # Fallback for old tokens without user_id - do database lookup
-                conn = connect_db()
-                with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                    cursor.execute("""
-                        SELECT LearnerID 
-                        FROM Learners 
-                        WHERE AccountName = %s
-                    """, (user_data['username'],))
-                    learner = cursor.fetchone()
-                    if not learner:
-                        raise HTTPException(status_code=404, detail="Learner not found")
-                    learner_id = learner['LearnerID']
-            else:
-                # Use user_id from token
-                conn = connect_db()
         except Exception as e:
             print(f"Token/user verification error: {str(e)}")
             raise HTTPException(status_code=401, detail="Invalid authentication token or user not found")
 
-        # Check if the course exists
-        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-            cursor.execute("""
-                SELECT CourseID 
-                FROM Courses 
-                WHERE CourseID = %s
-            """, (course_id,))
-            course = cursor.fetchone()
-            if not course:
-                raise HTTPException(status_code=404, detail="Course not found")
+        def enroll():
+            """Returns the learner ID, whether a new enrollment was made and the course's instructor ID"""
+            conn = connect_db()
+            try:
+                with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                    current_learner_id = learner_id
+                    if not current_learner_id:
+                        # Fallback for old tokens without user_id - do database lookup
+                        cursor.execute("""
+                            SELECT LearnerID 
+                            FROM Learners 
+                            WHERE AccountName = %s
+                        """, (user_data['username'],))
+                        learner = cursor.fetchone()
+                        if not learner:
+                            raise HTTPException(status_code=401, detail="Invalid authentication token or user not found")
+                        current_learner_id = learner['LearnerID']
+
+                    # Check if the course exists
+                    cursor.execute("""
+                        SELECT CourseID, InstructorID
+                        FROM Courses 
+                        WHERE CourseID = %s
+                    """, (course_id,))
+                    course = cursor.fetchone()
+                    if not course:
+                        raise HTTPException(status_code=404, detail="Course not found")
             
-            # Check if already enrolled
-            cursor.execute("""
-                SELECT EnrollmentID 
-                FROM Enrollments 
-                WHERE LearnerID = %s AND CourseID = %s
-            """, (learner_id, course_id))
-            existing_enrollment = cursor.fetchone()
-            if existing_enrollment:
-                return {"message": "Already enrolled in this course"}
+                    # Check if already enrolled
+                    cursor.execute("""
+                        SELECT EnrollmentID 
+                        FROM Enrollments 
+                        WHERE LearnerID = %s AND CourseID = %s
+                    """, (current_learner_id, course_id))
+                    existing_enrollment = cursor.fetchone()
+                    if existing_enrollment:
+                        return current_learner_id, False, course['InstructorID']
             
-            # Get the actual column names from the Enrollments table
-            cursor.execute("DESCRIBE Enrollments")
-            columns = cursor.fetchall()
-            column_names = [col['Field'] for col in columns]
-            print(f"Available columns in Enrollments table: {column_names}")
+                    # Get the actual column names from the Enrollments table
+                    cursor.execute("DESCRIBE Enrollments")
+                    columns = cursor.fetchall()
+                    column_names = [col['Field'] for col in columns]
+                    print(f"Available columns in Enrollments table: {column_names}")
             
-            # Enroll the learner in the course with the correct date column
-            try:
-                # Try different common column names for the enrollment date
-                enroll_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                cursor.execute(
-                    "CALL sp_EnrollLearner(%s, %s, %s)",
-                    (learner_id, course_id, enroll_date)
-                )
-                
-                conn.commit()
-                
-                # Invalidate Valkey cache for this course and user-specific data
-                redis_client = get_redis_client()
-                # Clear specific course cache for all users
-                pattern_course = f"courses:id:{course_id}:*"
-                # Clear course preview cache for all users (this is the missing piece!)
-                pattern_preview = f"course:preview:{course_id}:*"
-                # Clear user-specific enrolled courses cache
-                pattern_user_courses = f"learner:courses:{learner_id}"
-                print(f"Invalidating cache patterns: {pattern_course}, {pattern_preview}, and {pattern_user_courses}")
-                invalidate_cache_pattern(pattern_course)
-                invalidate_cache_pattern(pattern_preview)
-                invalidate_cache([pattern_user_courses])
+                    # Enroll the learner in the course with the correct date column
+                    try:
+                        # Try different common column names for the enrollment date
+                        enroll_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                        cursor.execute(
+                            "CALL sp_EnrollLearner(%s, %s, %s)",
+                            (current_learner_id, course_id, enroll_date)
+                        )
                 
-                return {"message": "Successfully enrolled in the course"}
-            except Exception as e:
-                conn.rollback()
-                print(f"Error enrolling in course: {str(e)}")
-                raise HTTPException(status_code=500, detail=f"Failed to enroll in course: {str(e)}")
+                        conn.commit()
+                        return current_learner_id, True, course['InstructorID']
+                    except Exception as e:
+                        conn.rollback()
+                        print(f"Error enrolling in course: {str(e)}")
+                        raise HTTPException(status_code=500, detail=f"Failed to enroll in course: {str(e)}")
+            finally:
+                conn.close()
+
+        learner_id, enrolled, instructor_id = await run_blocking(enroll)
+        if not enrolled:
+            return {"message": "Already enrolled in this course"}
+
+        # Record the enrollment for this learner, move the shared course views
+        # (enrolled count) to a new generation and drop the learner's and instructor's own data
+        await record_enrollment(learner_id, course_id)
+        await bump_generations([f"course:{course_id}"])
+        await invalidate_tags([f"learner:{learner_id}", f"instructor:{instructor_id}"])
+        schedule_warm("course", course_id)
+
+        return {"message": "Successfully enrolled in the course"}
         
     except HTTPException as he:
         raise he
     except Exception as e:
         print(f"Error enrolling in course: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error enrolling in course: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 # Get enrolled courses for the current learner
 @router.get("/learner/courses", response_model=List[Course])
@@ -936,78 +1292,32 @@ async def get_enrolled_courses(
             
             if not learner_id:
                 # Fallback for old tokens without user_id - do database lookup
-                conn = connect_db()
-                with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                    cursor.execute("""
-                        SELECT LearnerID 
-                        FROM Learners 
-                        WHERE AccountName = %s
-                    """, (user_data['username'],))
-                    learner = cursor.fetchone()
-                    if not learner:
-                        raise HTTPException(status_code=404, detail="Learner not found")
-                    learner_id = learner['LearnerID']
-            else:
-                # Use user_id from token
-                conn = connect_db()
+                learner = await fetch_one("""
+                    SELECT LearnerID 
+                    FROM Learners 
+                    WHERE AccountName = %s
+                """, (user_data['username'],))
+                if not learner:
+                    raise HTTPException(status_code=404, detail="Learner not found")
+                learner_id = learner['LearnerID']
         except Exception as e:
             print(f"Token/user verification error: {str(e)}")
             raise HTTPException(status_code=401, detail="Invalid authentication token or user not found")
 
-        # Get enrolled courses
-        courses = []
-        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-            query = """
-                SELECT 
-                    c.CourseID as id, 
-                    c.CourseName as name, 
-                    CONCAT(i.InstructorName, ' (', i.AccountName, ')') as instructor,
-                    c.Descriptions as description
-                FROM Courses c
-                JOIN Instructors i ON c.InstructorID = i.InstructorID
-                JOIN Enrollments e ON c.CourseID = e.CourseID
-                WHERE e.LearnerID = %s
-            """
-            cursor.execute(query, (learner_id,))
-            courses = cursor.fetchall()
-            
-            # Get ratings and enrollment count for each course
-            for course in courses:
-                cursor.execute("""
-                    SELECT AVG(Rating) as avg_rating, COUNT(*) as count
-                    FROM Enrollments
-                    WHERE CourseID = %s AND Rating IS NOT NULL
-                """, (course['id'],))
-                
-                rating_data = cursor.fetchone()
-                if rating_data and rating_data['avg_rating']:
-                    course['rating'] = float(rating_data['avg_rating'])
-                else:
-                    course['rating'] = None
-                    
-                # Get enrollment count
-                cursor.execute("""
-                    SELECT COUNT(*) as enrolled
-                    FROM Enrollments
-                    WHERE CourseID = %s
-                """, (course['id'],))
-                
-                enrolled_data = cursor.fetchone()
-                if enrolled_data:
-                    course['enrolled'] = enrolled_data['enrolled']
-                else:
-                    course['enrolled'] = 0
-        
-        return courses
+        # The learner's own enrollments and ratings drop the entry through the learner tag;
+        # counts and ratings from other learners are allowed to lag by the TTL
+        return await get_cached_data(
+            f"learner:courses:{learner_id}",
+            partial(fetch_enrolled_courses_from_db, learner_id),
+            ttl=300,  # Cache for 5 minutes
+            tags=[f"learner:{learner_id}"]
+        )
         
     except HTTPException as he:
         raise he
     except Exception as e:
         print(f"Error fetching enrolled courses: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching enrolled courses: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 # Get user profile
 @router.get("/user/profile")
@@ -1035,13 +1345,11 @@ async def get_user_profile(
             
             # Define the database fetch function
             async def fetch_profile_from_db():
-                # Connect to database
-                conn = connect_db()
-                try:
+                async with async_db_connection() as conn:
                     # Get user information based on role
-                    with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                    async with conn.cursor() as cursor:
                         if role == "Learner":
-                            cursor.execute("""
+                            await cursor.execute("""
                                 SELECT 
                                     LearnerName as name,
                                     Email as email,
@@ -1049,13 +1357,13 @@ async def get_user_profile(
                                 FROM Learners
                                 WHERE AccountName = %s
                             """, (username,))
-                            user_info = cursor.fetchone()
+                            user_info = await cursor.fetchone()
                             
                             if not user_info:
                                 raise HTTPException(status_code=404, detail="Learner not found")
                                 
                         elif role == "Instructor":
-                            cursor.execute("""
+                            await cursor.execute("""
                                 SELECT 
                                     InstructorName as name,
                                     Email as email,
@@ -1063,7 +1371,7 @@ async def get_user_profile(
                                 FROM Instructors
                                 WHERE AccountName = %s
                             """, (username,))
-                            user_info = cursor.fetchone()
+                            user_info = await cursor.fetchone()
                             
                             if not user_info:
                                 raise HTTPException(status_code=404, detail="Instructor not found")
@@ -1075,9 +1383,6 @@ async def get_user_profile(
                         user_info['username'] = username
                         
                         return user_info
-                finally:
-                    if 'conn' in locals():
-                        conn.close()
                 
             # Use the cached data helper to implement the Valkey caching pattern
             return await get_cached_data(cache_key, fetch_profile_from_db, ttl=1800)  # 30 minutes TTL
@@ -1117,78 +1422,82 @@ async def update_user_profile(
             # Get request body
             profile_data = await request.json()
             
-            # Connect to database
-            conn = connect_db()
-            
-            # Update user information based on role
-            with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                if role == "Learner":
-                    # Prepare update fields
-                    update_fields = []
-                    params = []
+            def update_profile():
+                conn = connect_db()
+                try:
+                    # Update user information based on role
+                    with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                        if role == "Learner":
+                            # Prepare update fields
+                            update_fields = []
+                            params = []
                     
-                    if 'name' in profile_data:
-                        update_fields.append("LearnerName = %s")
-                        params.append(profile_data['name'])
+                            if 'name' in profile_data:
+                                update_fields.append("LearnerName = %s")
+                                params.append(profile_data['name'])
                     
-                    if 'email' in profile_data:
-                        update_fields.append("Email = %s")
-                        params.append(profile_data['email'])
+                            if 'email' in profile_data:
+                                update_fields.append("Email = %s")
+                                params.append(profile_data['email'])
                     
-                    if 'phoneNumber' in profile_data:
-                        update_fields.append("PhoneNumber = %s")
-                        params.append(profile_data['phoneNumber'])
+                            if 'phoneNumber' in profile_data:
+                                update_fields.append("PhoneNumber = %s")
+                                params.append(profile_data['phoneNumber'])
                     
-                    if not update_fields:
-                        return {"message": "No fields to update"}
+                            if not update_fields:
+                                return {"message": "No fields to update"}
                     
-                    # Add username to params
-                    params.append(username)
+                            # Add username to params
+                            params.append(username)
                     
-                    # Construct and execute SQL
-                    sql = f"""
-                        UPDATE Learners
-                        SET {', '.join(update_fields)}
-                        WHERE AccountName = %s
-                    """
-                    cursor.execute(sql, params)
+                            # Construct and execute SQL
+                            sql = f"""
+                                UPDATE Learners
+                                SET {', '.join(update_fields)}
+                                WHERE AccountName = %s
+                            """
+                            cursor.execute(sql, params)
                     
-                elif role == "Instructor":
-                    # Prepare update fields
-                    update_fields = []
-                    params = []
+                        elif role == "Instructor":
+                            # Prepare update fields
+                            update_fields = []
+                            params = []
                     
-                    if 'name' in profile_data:
-                        update_fields.append("InstructorName = %s")
-                        params.append(profile_data['name'])
+                            if 'name' in profile_data:
+                                update_fields.append("InstructorName = %s")
+                                params.append(profile_data['name'])
                     
-                    if 'email' in profile_data:
-                        update_fields.append("Email = %s")
-                        params.append(profile_data['email'])
+                            if 'email' in profile_data:
+                                update_fields.append("Email = %s")
+                                params.append(profile_data['email'])
                     
-                    if 'expertise' in profile_data:
-                        update_fields.append("Expertise = %s")
-                        params.append(profile_data['expertise'])
+                            if 'expertise' in profile_data:
+                                update_fields.append("Expertise = %s")
+                                params.append(profile_data['expertise'])
                     
-                    if not update_fields:
-                        return {"message": "No fields to update"}
+                            if not update_fields:
+                                return {"message": "No fields to update"}
                     
-                    # Add username to params
-                    params.append(username)
+                            # Add username to params
+                            params.append(username)
                     
-                    # Construct and execute SQL
-                    sql = f"""
-                        UPDATE Instructors
-                        SET {', '.join(update_fields)}
-                        WHERE AccountName = %s
-                    """
-                    cursor.execute(sql, params)
+                            # Construct and execute SQL
+                            sql = f"""
+                                UPDATE Instructors
+                                SET {', '.join(update_fields)}
+                                WHERE AccountName = %s
+                            """
+                            cursor.execute(sql, params)
                     
-                else:
-                    raise HTTPException(status_code=403, detail="Invalid user role")
+                        else:
+                            raise HTTPException(status_code=403, detail="Invalid user role")
                 
-                conn.commit()
-                return {"message": "Profile updated successfully"}
+                        conn.commit()
+                        return {"message": "Profile updated successfully"}
+                finally:
+                    conn.close()
+
+            return await run_blocking(update_profile)
                 
         except Exception as e:
             print(f"Token/user verification error: {str(e)}")
@@ -1198,9 +1507,6 @@ async def update_user_profile(
     except Exception as e:
         print(f"Error updating user profile: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error updating user profile: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 # Get dashboard data for the current user
 @router.get("/learner/dashboard")
@@ -1222,18 +1528,15 @@ async def get_learner_dashboard(
             user_data = decode_token(auth_token)
             
             # Get LearnerID from Learners table using the username
-            conn = connect_db()
-            with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                cursor.execute("""
-                    SELECT LearnerID, LearnerName 
-                    FROM Learners 
-                    WHERE AccountName = %s
-                """, (user_data['username'],))
-                learner = cursor.fetchone()
-                if not learner:
-                    raise HTTPException(status_code=404, detail="Learner not found")
-                learner_id = learner['LearnerID']
-                learner_name = learner['LearnerName']
+            learner = await fetch_one("""
+                SELECT LearnerID, LearnerName 
+                FROM Learners 
+                WHERE AccountName = %s
+            """, (user_data['username'],))
+            if not learner:
+                raise HTTPException(status_code=404, detail="Learner not found")
+            learner_id = learner['LearnerID']
+            learner_name = learner['LearnerName']
         except Exception as e:
             print(f"Token/user verification error: {str(e)}")
             raise HTTPException(status_code=401, detail="Invalid authentication token or user not found")
@@ -1251,89 +1554,61 @@ async def get_learner_dashboard(
             },
             "enrolledCourses": []
         }
-        
-        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+
+        # The counts, statistics and course list are independent, so they run
+        # concurrently on separate pooled connections (MYSQL_REQUEST_CONCURRENCY at a time)
+        enrolled_data, completed_data, passed_data, stats_data, courses = await gather_queries(
             # Get enrollment count
-            cursor.execute("SELECT COUNT(*) as count FROM Enrollments WHERE LearnerID = %s", (learner_id,))
-            enrolled_data = cursor.fetchone()
-            dashboard_data["enrolled"] = enrolled_data['count'] if enrolled_data else 0
-            
+            fetch_one(LEARNER_ENROLLED_COUNT_QUERY, (learner_id,)),
             # Get completed courses count
-            cursor.execute(
-                "SELECT COUNT(*) as count FROM Enrollments WHERE LearnerID = %s AND Percentage = 100",
-                (learner_id,)
-            )
-            completed_data = cursor.fetchone()
-            completed = completed_data['count'] if completed_data else 0
-            dashboard_data["completed"] = completed
-            
-            # Calculate completion rate
-            if dashboard_data["enrolled"] > 0:
-                rate = (completed / dashboard_data["enrolled"]) * 100
-                dashboard_data["completionRate"] = f"{rate:.1f}%"
-            
+            fetch_one(LEARNER_COMPLETED_COUNT_QUERY, (learner_id,)),
             # Get passed lectures count
-            cursor.execute(
-                "SELECT COUNT(*) as count FROM LectureResults WHERE LearnerID = %s AND State = 'passed'",
-                (learner_id,)
-            )
-            passed_data = cursor.fetchone()
-            dashboard_data["lecturesPassed"] = passed_data['count'] if passed_data else 0
-            
+            fetch_one(LEARNER_PASSED_COUNT_QUERY, (learner_id,)),
             # Get statistics data - passed lectures over time
-            # Fix the learner dashboard query around line 1270
-            cursor.execute("""
-                SELECT Date, Score, 
-                        DATE_FORMAT(Date, '%%Y-%%m-%%d') as formatted_date
-                FROM LectureResults
-                WHERE LearnerID = %s AND State = 'passed'
-                ORDER BY Date
-            """, (learner_id,))
-            
-            stats_data = cursor.fetchall()
-            date_groups = {}
-            score_groups = {}
-            
-            for row in stats_data:
-                date_str = row['formatted_date']
-                if date_str not in date_groups:
-                    date_groups[date_str] = 0
-                date_groups[date_str] += 1
-                
-                if date_str not in score_groups:
-                    score_groups[date_str] = {"total": 0, "count": 0}
-                score_groups[date_str]["total"] += row['Score']
-                score_groups[date_str]["count"] += 1
-            
-            # Format the statistics data
-            for date_str in date_groups:
-                dashboard_data["statistics"]["lecturesPassed"].append({
-                    "date": date_str,
-                    "count": date_groups[date_str]
-                })
-                
-                avg_score = score_groups[date_str]["total"] / score_groups[date_str]["count"]
-                dashboard_data["statistics"]["averageScores"].append({
-                    "date": date_str,
-                    "score": round(avg_score, 2)
-                })
-            
+            fetch_all(LEARNER_PASSED_HISTORY_QUERY, (learner_id,)),
             # Get enrolled courses with percentage
-            cursor.execute("""
-                SELECT
-                    c.CourseID as id, 
-                    c.CourseName as name, 
-                    CONCAT(i.InstructorName, ' (', i.AccountName, ')') as instructor,
-                    c.Descriptions as description,
-                    e.Percentage as percentage
-                FROM Courses c
-                JOIN Instructors i ON c.InstructorID = i.InstructorID
-                JOIN Enrollments e ON c.CourseID = e.CourseID
-                WHERE e.LearnerID = %s
-            """, (learner_id,))
+            fetch_all(LEARNER_DASHBOARD_COURSES_QUERY, (learner_id,))
+        )
+
+        dashboard_data["enrolled"] = enrolled_data['count'] if enrolled_data else 0
+        completed = completed_data['count'] if completed_data else 0
+        dashboard_data["completed"] = completed
+        
+        # Calculate completion rate
+        if dashboard_data["enrolled"] > 0:
+            rate = (completed / dashboard_data["enrolled"]) * 100
+            dashboard_data["completionRate"] = f"{rate:.1f}%"
+        
+        dashboard_data["lecturesPassed"] = passed_data['count'] if passed_data else 0
+        
+        date_groups = {}
+        score_groups = {}
+        
+        for row in stats_data:
+            date_str = row['formatted_date']
+            if date_str not in date_groups:
+                date_groups[date_str] = 0
+            date_groups[date_str] += 1
             
-            courses = cursor.fetchall()
-            dashboard_data["enrolledCourses"] = courses
+            if date_str not in score_groups:
+                score_groups[date_str] = {"total": 0, "count": 0}
+            score_groups[date_str]["total"] += row['Score']
+            score_groups[date_str]["count"] += 1
+        
+        # Format the statistics data
+        for date_str in date_groups:
+            dashboard_data["statistics"]["lecturesPassed"].append({
+                "date": date_str,
+                "count": date_groups[date_str]
+            })
+            
+            avg_score = score_groups[date_str]["total"] / score_groups[date_str]["count"]
+            dashboard_data["statistics"]["averageScores"].append({
+                "date": date_str,
+                "score": round(avg_score, 2)
+            })
+        
+        dashboard_data["enrolledCourses"] = courses
             
         return dashboard_data
         
@@ -1342,9 +1617,164 @@ async def get_learner_dashboard(
     except Exception as e:
         print(f"Error fetching dashboard data: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching dashboard data: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
+
+async def build_instructor_dashboard(instructor_id, course_id=None):
+    """
+    Instructor dashboard payload. Enrollment, rating, completion and lecture figures
+    come from the CourseDailyStats / LectureDailyStats rollups, so the cost follows the
+    number of courses and days rather than lifetime enrollments. The queries do not
+    depend on each other, so they run concurrently on separate pooled connections,
+    MYSQL_REQUEST_CONCURRENCY at a time so one request leaves the pool to the others.
+    """
+    if course_id:
+        # Course analytics are only run for the course's own instructor
+        owned = await fetch_one(
+            "SELECT CourseID FROM Courses WHERE CourseID = %s AND InstructorID = %s",
+            (course_id, instructor_id)
+        )
+        if not owned:
+            raise HTTPException(status_code=404, detail="Course not found or not owned")
+
+    queries = [
+        # --- Course list summary (all-time rollup totals per course) ---
+        fetch_all(INSTRUCTOR_DASHBOARD_COURSES_QUERY, (instructor_id,)),
+        # Distinct learners cannot be summed from rollups
+        fetch_one(INSTRUCTOR_STUDENTS_QUERY, (instructor_id,)),
+        # --- Student growth (last 2 months) ---
+        fetch_all(INSTRUCTOR_STUDENT_GROWTH_QUERY, (instructor_id,)),
+        # --- Enrollment and rating trends (last 30 days) ---
+        fetch_all(INSTRUCTOR_TRENDS_QUERY, (instructor_id,)),
+    ]
+    if course_id:
+        queries += [
+            # Enroll/Ratings trends (60 days)
+            fetch_all(COURSE_TRENDS_QUERY, (course_id,)),
+            # Completion via LectureResults (30 days); distinct learners per day are not in the rollups
+            fetch_all(COURSE_COMPLETION_TRENDS_QUERY, (course_id,)),
+            # Lecture-level analytics (submitted results only)
+            fetch_all(LECTURE_ANALYTICS_QUERY, (course_id,)),
+            # Student progress distribution
+            fetch_all(COURSE_PROGRESS_QUERY, (course_id,)),
+        ]
+    results = await gather_queries(*queries)
+    raw_courses, students, growth, trends = results[:4]
+
+    formatted_courses = [
+        {
+            "id": c["id"],
+            "name": c["name"],
+            "description": c["description"] or "",
+            "enrollments": int(c["enrollments"]),
+            "rating": round(float(c["rating_sum"]) / int(c["rating_count"]), 1) if c["rating_count"] else 0.0,
+            "completionRate": round(float(c["progress_sum"]) / int(c["enrollments"]), 1) if c["enrollments"] else 0.0
+        }
+        for c in raw_courses
+    ]
+
+    # --- General metrics, summed from the course totals ---
+    total_courses = len(raw_courses)
+    total_enrollments = sum(int(c["enrollments"]) for c in raw_courses)
+    completed_enrollments = sum(int(c["completions"]) for c in raw_courses)
+    rating_count = sum(int(c["rating_count"]) for c in raw_courses)
+    average_rating = sum(float(c["rating_sum"]) for c in raw_courses) / rating_count if rating_count else 0.0
+    completion_rate = (
+        round(completed_enrollments / total_enrollments * 100, 1)
+        if total_enrollments else 0.0
+    )
+    total_students = students["total_students"] if students else 0
+
+    current = growth[0]["students"] if len(growth) > 0 else 0
+    previous = growth[1]["students"] if len(growth) > 1 else 0
+    student_growth = (
+        round((current - previous) / previous * 100, 1)
+        if previous else 0.0
+    )
+
+    # --- Build base payload ---
+    dashboard_data = {
+        "metrics": {
+            "totalCourses": total_courses,
+            "totalStudents": total_students,
+            "averageRating": round(average_rating, 1),
+            "completionRate": completion_rate,
+            "studentGrowth": student_growth
+        },
+        "courses": formatted_courses,
+        "enrollmentTrends": [
+            {"date": r["date"], "value": int(r["enrollments"])}
+            for r in trends if r["enrollments"]
+        ],
+        "ratingTrends": [
+            {"date": r["date"], "value": round(float(r["rating_sum"]) / int(r["rating_count"]), 1)}
+            for r in trends if r["rating_count"]
+        ],
+        "courseEnrollments": [
+            {"courseName": c["name"], "enrollments": c["enrollments"]}
+            for c in formatted_courses
+        ],
+        "courseAnalytics": {}
+    }
+
+    # --- Detailed courseAnalytics if course_id given ---
+    if course_id:
+        course = next((c for c in raw_courses if c["id"] == course_id), None)
+        # Deleted since the ownership check
+        if not course:
+            raise HTTPException(status_code=404, detail="Course not found or not owned")
+        course_trends, comp_rows, lects, pd = results[4:]
+
+        total_enr = int(course["enrollments"])
+        comp_rate = (
+            round(int(course["completions"]) / total_enr * 100, 1)
+            if total_enr else 0.0
+        )
+        course_rating = float(course["rating_sum"]) / int(course["rating_count"]) if course["rating_count"] else 0.0
+
+        completion_trends = [
+            {
+                "date": r["date"],
+                "value": round(r["completed"] / r["total"] * 100, 1) if r["total"] else 0.0
+            }
+            for r in comp_rows
+        ]
+        lecture_analytics = [
+            {
+                "lectureId": l["lectureId"],
+                "title": l["lecture_title"],
+                "totalAttempts": int(l["total_attempts"]),
+                "passedCount": int(l["passed_count"]),
+                "passRate": round(int(l["passed_count"]) / int(l["total_attempts"]) * 100, 1)
+                    if l["total_attempts"] else 0.0,
+                "averageScore": round(float(l["score_sum"]) / int(l["total_attempts"]), 1)
+                    if l["total_attempts"] else 0.0
+            }
+            for l in lects
+        ]
+        progress = [
+            {"range": p["progress_range"], "count": p["student_count"]}
+            for p in pd
+        ]
+
+        dashboard_data["courseAnalytics"] = {
+            "courseId": course_id,
+            "courseName": course["name"],
+            "totalEnrollments": total_enr,
+            "averageRating": round(course_rating, 1),
+            "completionRate": comp_rate,
+            "enrollmentTrends": [
+                {"date": r["date"], "value": int(r["enrollments"])}
+                for r in course_trends if r["enrollments"]
+            ],
+            "ratingTrends": [
+                {"date": r["date"], "value": round(float(r["rating_sum"]) / int(r["rating_count"]), 1)}
+                for r in course_trends if r["rating_count"]
+            ],
+            "completionTrends": completion_trends,
+            "lectureAnalytics": lecture_analytics,
+            "studentProgress": progress
+        }
+
+    return dashboard_data
 
 # Get dashboard data for instructor
 @router.get("/instructor/dashboard")
@@ -1353,7 +1783,6 @@ async def get_instructor_dashboard(
     course_id: Optional[int] = None,
     auth_token: str = Cookie(None)
 ):
-    conn = None
     try:
         # 1) Auth token via cookie or header
         if not auth_token:
@@ -1373,318 +1802,30 @@ async def get_instructor_dashboard(
         if not username:
             raise HTTPException(status_code=401, detail="Invalid token payload")
 
-        # 3) DB connection
-        conn = connect_db()
-        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-
-            # Fallback for old tokens without user_id
-            if not instructor_id:
-                cursor.execute(
-                    "SELECT InstructorID FROM Instructors WHERE AccountName = %s",
-                    (username,)
-                )
-                row = cursor.fetchone()
-                if not row:
-                    raise HTTPException(status_code=404, detail="Instructor not found")
-                instructor_id = row["InstructorID"]
-
-            # --- General metrics ---
-            cursor.execute("""
-                SELECT COUNT(*) AS total_courses
-                FROM Courses
-                WHERE InstructorID = %s
-            """, (instructor_id,))
-            total_courses = cursor.fetchone()["total_courses"]
-
-            cursor.execute("""
-                SELECT
-                    COUNT(DISTINCT e.LearnerID) AS total_students,
-                    COALESCE(AVG(e.Rating), 0) AS average_rating,
-                    COUNT(*) AS total_enrollments,
-                    SUM(CASE WHEN e.Percentage = 100 THEN 1 ELSE 0 END) AS completed_enrollments
-                FROM Courses c
-                LEFT JOIN Enrollments e ON c.CourseID = e.CourseID
-                WHERE c.InstructorID = %s
-            """, (instructor_id,))
-            stats = cursor.fetchone() or {}
-
-            completion_rate = (
-                round(
-                    stats.get("completed_enrollments", 0)
-                    / stats.get("total_enrollments", 1)
-                    * 100,
-                    1
-                )
-                if stats.get("total_enrollments") else 0.0
+        # Fallback for old tokens without user_id
+        if not instructor_id:
+            row = await fetch_one(
+                "SELECT InstructorID FROM Instructors WHERE AccountName = %s",
+                (username,)
             )
+            if not row:
+                raise HTTPException(status_code=404, detail="Instructor not found")
+            instructor_id = row["InstructorID"]
 
-            # --- Student growth (last 2 months) ---
-            cursor.execute("""
-                SELECT
-                    DATE_FORMAT(EnrollmentDate, '%%Y-%%m') AS month,
-                    COUNT(DISTINCT LearnerID) AS students
-                FROM Courses c
-                JOIN Enrollments e ON c.CourseID = e.CourseID
-                WHERE c.InstructorID = %s
-                  AND EnrollmentDate >= DATE_SUB(CURRENT_DATE, INTERVAL 2 MONTH)
-                GROUP BY month
-                ORDER BY month DESC
-                LIMIT 2
-            """, (instructor_id,))
-            growth = cursor.fetchall()
-            current = growth[0]["students"] if len(growth) > 0 else 0
-            previous = growth[1]["students"] if len(growth) > 1 else 0
-            student_growth = (
-                round((current - previous) / previous * 100, 1)
-                if previous else 0.0
-            )
-
-            # --- Course list summary ---
-            cursor.execute("""
-                SELECT
-                    c.CourseID   AS id,
-                    c.CourseName AS name,
-                    c.Descriptions     AS description,
-                    c.AverageRating    AS rating,
-                    COUNT(DISTINCT e.LearnerID) AS enrollments,
-                    AVG(e.Percentage)  AS completionRate
-                FROM Courses c
-                LEFT JOIN Enrollments e ON c.CourseID = e.CourseID
-                WHERE c.InstructorID = %s
-                GROUP BY c.CourseID
-                ORDER BY c.CreatedAt DESC
-            """, (instructor_id,))
-            raw_courses = cursor.fetchall()
-            formatted_courses = [
-                {
-                    "id": c["id"],
-                    "name": c["name"],
-                    "description": c["description"] or "",
-                    "enrollments": c["enrollments"] or 0,
-                    "rating": round(float(c["rating"]), 1) if c["rating"] else 0.0,
-                    "completionRate": round(float(c["completionRate"]), 1) if c["completionRate"] else 0.0
-                }
-                for c in raw_courses
-            ]
-
-            # --- Enrollment trends (last 30 days) ---
-            cursor.execute("""
-                SELECT
-                    DATE_FORMAT(e.EnrollmentDate, '%%Y-%%m-%%d') AS date,
-                    COUNT(*)                              AS value
-                FROM Courses c
-                JOIN Enrollments e ON c.CourseID = e.CourseID
-                WHERE c.InstructorID = %s
-                  AND e.EnrollmentDate >= DATE_SUB(CURRENT_DATE, INTERVAL 30 DAY)
-                GROUP BY date
-                ORDER BY date
-            """, (instructor_id,))
-            enroll_trends = cursor.fetchall()
-
-            # --- Rating trends (last 30 days) ---
-            cursor.execute("""
-                SELECT
-                    DATE_FORMAT(e.EnrollmentDate, '%%Y-%%m-%%d') AS date,
-                    AVG(e.Rating)                         AS value
-                FROM Courses c
-                JOIN Enrollments e ON c.CourseID = e.CourseID
-                WHERE c.InstructorID = %s
-                  AND e.Rating IS NOT NULL
-                  AND e.EnrollmentDate >= DATE_SUB(CURRENT_DATE, INTERVAL 30 DAY)
-                GROUP BY date
-                ORDER BY date
-            """, (instructor_id,))
-            rating_trends = cursor.fetchall()
-
-            # --- Build base payload ---
-            dashboard_data = {
-                "metrics": {
-                    "totalCourses": total_courses,
-                    "totalStudents": stats.get("total_students", 0),
-                    "averageRating": round(stats.get("average_rating", 0), 1),
-                    "completionRate": completion_rate,
-                    "studentGrowth": student_growth
-                },
-                "courses": formatted_courses,
-                "enrollmentTrends": [
-                    {"date": r["date"], "value": r["value"]} for r in enroll_trends
-                ],
-                "ratingTrends": [
-                    {"date": r["date"], "value": round(r["value"], 1)}
-                    for r in rating_trends if r["value"] is not None
-                ],
-                "courseEnrollments": [
-                    {"courseName": c["name"], "enrollments": c["enrollments"]}
-                    for c in formatted_courses
-                ],
-                "courseAnalytics": {}
-            }
-
-            # --- Detailed courseAnalytics if course_id given ---
-            if course_id:
-                # Ownership check
-                cursor.execute("""
-                    SELECT CourseID, CourseName
-                    FROM Courses
-                    WHERE CourseID = %s AND InstructorID = %s
-                """, (course_id, instructor_id))
-                course_row = cursor.fetchone()
-                if not course_row:
-                    raise HTTPException(status_code=404, detail="Course not found or not owned")
-                course_name = course_row["CourseName"]
-
-                # Basic course metrics
-                cursor.execute("""
-                    SELECT
-                        COUNT(DISTINCT e.LearnerID) AS total_enrollments,
-                        COALESCE(AVG(e.Rating), 0)   AS average_rating,
-                        SUM(CASE WHEN e.Percentage = 100 THEN 1 ELSE 0 END) AS completed_enrollments,
-                        COUNT(*) AS all_with_progress
-                    FROM Enrollments e
-                    WHERE e.CourseID = %s
-                """, (course_id,))
-                cm = cursor.fetchone() or {}
-                total_enr = cm.get("total_enrollments", 0)
-                total_with = cm.get("all_with_progress", 0)
-                comp_rate = (
-                    round(cm.get("completed_enrollments", 0) / total_with * 100, 1)
-                    if total_with else 0.0
-                )
-
-                # Enroll/Ratings trends (60 days)
-                cursor.execute("""
-                    SELECT
-                        DATE_FORMAT(EnrollmentDate, '%%Y-%%m-%%d') AS date,
-                        COUNT(*)                               AS value
-                    FROM Enrollments
-                    WHERE CourseID = %s
-                      AND EnrollmentDate >= DATE_SUB(CURRENT_DATE, INTERVAL 60 DAY)
-                    GROUP BY date
-                    ORDER BY date
-                """, (course_id,))
-                ce_trends = cursor.fetchall()
-
-                cursor.execute("""
-                    SELECT
-                        DATE_FORMAT(EnrollmentDate, '%%Y-%%m-%%d') AS date,
-                        AVG(Rating)                          AS value
-                    FROM Enrollments
-                    WHERE CourseID = %s
-                      AND Rating IS NOT NULL
-                      AND EnrollmentDate >= DATE_SUB(CURRENT_DATE, INTERVAL 60 DAY)
-                    GROUP BY date
-                    ORDER BY date
-                """, (course_id,))
-                cr_trends = cursor.fetchall()
-
-                # Completion via LectureResults (30 days)
-                cursor.execute("""
-                    SELECT
-                        DATE_FORMAT(lr.Date, '%%Y-%%m-%%d') AS date,
-                        COUNT(DISTINCT CASE WHEN e.Percentage = 100 THEN e.LearnerID END) AS completed,
-                        COUNT(DISTINCT lr.LearnerID)                           AS total
-                    FROM LectureResults lr
-                    JOIN Enrollments e
-                      ON lr.LearnerID = e.LearnerID AND lr.CourseID = e.CourseID
-                    WHERE lr.CourseID = %s
-                      AND lr.Date >= DATE_SUB(CURRENT_DATE, INTERVAL 30 DAY)
-                    GROUP BY date
-                    ORDER BY date
-                """, (course_id,))
-                comp_rows = cursor.fetchall()
-                completion_trends = [
-                    {
-                        "date": r["date"],
-                        "value": round(r["completed"] / r["total"] * 100, 1) if r["total"] else 0.0
-                    }
-                    for r in comp_rows
-                ]
-
-                # Lecture-level analytics
-                cursor.execute("""
-                    SELECT
-                        l.LectureID                           AS lectureId,
-                        l.Title                               AS lecture_title,
-                        COUNT(DISTINCT lr.LearnerID)         AS total_attempts,
-                        SUM(lr.State = 'passed')             AS passed_count,
-                        COALESCE(AVG(lr.Score), 0)           AS average_score
-                    FROM Lectures l
-                    LEFT JOIN LectureResults lr
-                      ON l.LectureID = lr.LectureID
-                    WHERE l.CourseID = %s
-                    GROUP BY l.LectureID, l.Title
-                    ORDER BY l.LectureID
-                """, (course_id,))
-                lects = cursor.fetchall()
-                lecture_analytics = [
-                    {
-                        "lectureId": l["lectureId"],
-                        "title": l["lecture_title"],
-                        "totalAttempts": l["total_attempts"],
-                        "passedCount": l["passed_count"],
-                        "passRate": round(l["passed_count"] / l["total_attempts"] * 100, 1)
-                            if l["total_attempts"] else 0.0,
-                        "averageScore": round(float(l["average_score"]), 1)
-                    }
-                    for l in lects
-                ]
-
-                # Student progress distribution
-                cursor.execute("""
-                    SELECT
-                        CASE
-                          WHEN Percentage = 0 THEN 'Not Started'
-                          WHEN Percentage < 25 THEN '0-25%%'
-                          WHEN Percentage < 50 THEN '25-50%%'
-                          WHEN Percentage < 75 THEN '50-75%%'
-                          WHEN Percentage < 100 THEN '75-99%%'
-                          ELSE 'Completed'
-                        END AS progress_range,
-                        COUNT(*) AS student_count
-                    FROM Enrollments
-                    WHERE CourseID = %s
-                    GROUP BY progress_range
-                    ORDER BY
-                      FIELD(progress_range,
-                            'Not Started','0-25%%','25-50%%',
-                            '50-75%%','75-99%%','Completed')
-                """, (course_id,))
-                pd = cursor.fetchall()
-                progress = [
-                    {"range": p["progress_range"], "count": p["student_count"]}
-                    for p in pd
-                ]
-
-                dashboard_data["courseAnalytics"] = {
-                    "courseId": course_id,
-                    "courseName": course_name,
-                    "totalEnrollments": total_enr,
-                    "averageRating": round(float(cm.get("average_rating", 0)), 1),
-                    "completionRate": comp_rate,
-                    "enrollmentTrends": [
-                        {"date": r["date"], "value": int(r["value"])}
-                        for r in ce_trends
-                    ],
-                    "ratingTrends": [
-                        {"date": r["date"], "value": round(float(r["value"]), 1)}
-                        for r in cr_trends if r["value"] is not None
-                    ],
-                    "completionTrends": completion_trends,
-                    "lectureAnalytics": lecture_analytics,
-                    "studentProgress": progress
-                }
-
-            # 4) Return final payload
-            return dashboard_data
+        # 3) Served from the rollups; enrollments, ratings and quiz results for the
+        # instructor's courses drop the instructor tag, as does a rollup repair of one of them
+        return await get_cached_data(
+            f"instructor:dashboard:{instructor_id}:{course_id or 'all'}",
+            partial(build_instructor_dashboard, instructor_id, course_id),
+            ttl=INSTRUCTOR_DASHBOARD_TTL,
+            tags=[f"instructor:{instructor_id}", DASHBOARD_TAG]
+        )
 
     except HTTPException:
         raise
     except Exception as e:
         print(f"[ERROR] get_instructor_dashboard: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
-    finally:
-        if conn:
-            conn.close()
 
 
 # Quiz submission model
@@ -1702,147 +1843,166 @@ async def submit_quiz_answers(
         # Get token from header if not in cookie
         if not auth_token:
             auth_header = request.headers.get('Authorization')
-            if auth_header and auth_header.startswith('Bearer '):
-                auth_token = auth_header.split(' ')[1]
-            else:
-                raise HTTPException(status_code=401, detail="No authentication token provided")
-
-        # Verify token and get user data
-        try:
-            user_data = decode_token(auth_token)
-            # Get LearnerID from Learners table using the username
-            conn = connect_db()
-            with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                cursor.execute("""
-                    SELECT LearnerID 
-                    FROM Learners 
-                    WHERE AccountName = %s
-                """, (user_data['username'],))
-                learner = cursor.fetchone()
-                if not learner:
-                    raise HTTPException(status_code=404, detail="Learner not found")
-                learner_id = learner['LearnerID']
+            if auth_header and auth_header.startswith('Bearer '):
+                auth_token = auth_header.split(' ')[1]
+            else:
+                raise HTTPException(status_code=401, detail="No authentication token provided")
+
+        # Verify token and get user data
+        try:
+            user_data = decode_token(auth_token)
         except Exception as e:
             print(f"Token/user verification error: {str(e)}")
             raise HTTPException(status_code=401, detail="Invalid authentication token or user not found")
 
-        try:
-            with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                # First verify the quiz exists for this lecture
-                cursor.execute("""
-                    SELECT QuizID 
-                    FROM Quizzes 
-                    WHERE LectureID = %s
-                """, (lecture_id,))
-                quiz = cursor.fetchone()
-                if not quiz:
-                    raise HTTPException(status_code=404, detail="Quiz not found for this lecture")
+        def grade_and_save():
+            """Scores the submission and stores the result; returns (learner_id, course_id, instructor_id, passed, result)"""
+            conn = connect_db()
+            try:
+                with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                    # Get LearnerID from Learners table using the username
+                    cursor.execute("""
+                        SELECT LearnerID 
+                        FROM Learners 
+                        WHERE AccountName = %s
+                    """, (user_data['username'],))
+                    learner = cursor.fetchone()
+                    if not learner:
+                        raise HTTPException(status_code=401, detail="Invalid authentication token or user not found")
+                    learner_id = learner['LearnerID']
 
-                quiz_id = quiz['QuizID']
+                    # First verify the quiz exists for this lecture
+                    cursor.execute("""
+                        SELECT QuizID 
+                        FROM Quizzes 
+                        WHERE LectureID = %s
+                    """, (lecture_id,))
+                    quiz = cursor.fetchone()
+                    if not quiz:
+                        raise HTTPException(status_code=404, detail="Quiz not found for this lecture")
 
-                # Get correct answers for validation
-                cursor.execute("""
-                    SELECT q.QuestionID, o.OptionText
-                    FROM Questions q
-                    JOIN Options o ON q.QuestionID = o.QuestionID
-                    WHERE q.QuizID = %s AND o.IsCorrect = 1
-                """, (quiz_id,))
+                    quiz_id = quiz['QuizID']
+
+                    # Get correct answers for validation
+                    cursor.execute("""
+                        SELECT q.QuestionID, o.OptionText
+                        FROM Questions q
+                        JOIN Options o ON q.QuestionID = o.QuestionID
+                        WHERE q.QuizID = %s AND o.IsCorrect = 1
+                    """, (quiz_id,))
                 
-                correct_answers = {row['QuestionID']: row['OptionText'] for row in cursor.fetchall()}
+                    correct_answers = {row['QuestionID']: row['OptionText'] for row in cursor.fetchall()}
                 
-                # Calculate score
-                total_questions = len(correct_answers)
-                if total_questions == 0:
-                    raise HTTPException(status_code=500, detail="No questions found for this quiz")
-
-                correct_count = sum(
-                    1 for q_id, answer in submission.answers.items()
-                    if str(q_id) in map(str, correct_answers.keys()) and answer == correct_answers[int(q_id)]
-                )
+                    # Calculate score
+                    total_questions = len(correct_answers)
+                    if total_questions == 0:
+                        raise HTTPException(status_code=500, detail="No questions found for this quiz")
+
+                    correct_count = sum(
+                        1 for q_id, answer in submission.answers.items()
+                        if str(q_id) in map(str, correct_answers.keys()) and answer == correct_answers[int(q_id)]
+                    )
                 
-                score = (correct_count / total_questions) * 100
+                    score = (correct_count / total_questions) * 100
 
-                # Get the CourseID for this lecture
-                cursor.execute("""
-                    SELECT CourseID
-                    FROM Lectures
-                    WHERE LectureID = %s
-                """, (lecture_id,))
-                lecture_data = cursor.fetchone()
-                if not lecture_data:
-                    raise HTTPException(status_code=404, detail="Lecture not found")
+                    # Get the CourseID (and its instructor) for this lecture
+                    cursor.execute("""
+                        SELECT l.CourseID, c.InstructorID
+                        FROM Lectures l
+                        JOIN Courses c ON c.CourseID = l.CourseID
+                        WHERE l.LectureID = %s
+                    """, (lecture_id,))
+                    lecture_data = cursor.fetchone()
+                    if not lecture_data:
+                        raise HTTPException(status_code=404, detail="Lecture not found")
                 
-                course_id = lecture_data['CourseID']
+                    course_id = lecture_data['CourseID']
+                    instructor_id = lecture_data['InstructorID']
 
-                # Save or update the score using direct SQL instead of stored procedure
-                try:
-                    # Use stored procedure to update or insert the lecture result
-                    cursor.execute(
-                        "CALL sp_update_lecture_result(%s, %s, %s, %s)",
-                        (learner_id, course_id, lecture_id, score)
-                    )
-                    
-                    # Update course completion percentage
+                    # Save or update the score using direct SQL instead of stored procedure
                     try:
-                        # Get total lectures in the course
+                        # Use stored procedure to update or insert the lecture result
+                        cursor.execute(
+                            "CALL sp_update_lecture_result(%s, %s, %s, %s)",
+                            (learner_id, course_id, lecture_id, score)
+                        )
+
+                        # The procedure rounds the score to INT before deciding pass/fail,
+                        # so read back the state it stored rather than re-deciding here
                         cursor.execute("""
-                            SELECT COUNT(*) as total_lectures 
-                            FROM Lectures 
-                            WHERE CourseID = %s
-                        """, (course_id,))
-                        total_lectures = cursor.fetchone()['total_lectures']
+                            SELECT State
+                            FROM LectureResults
+                            WHERE LearnerID = %s AND CourseID = %s AND LectureID = %s
+                        """, (learner_id, course_id, lecture_id))
+                        stored = cursor.fetchone()
+                        passed = bool(stored) and stored['State'] == 'passed'
+                    
+                        # Update course completion percentage
+                        try:
+                            # Get total lectures in the course
+                            cursor.execute("""
+                                SELECT COUNT(*) as total_lectures 
+                                FROM Lectures 
+                                WHERE CourseID = %s
+                            """, (course_id,))
+                            total_lectures = cursor.fetchone()['total_lectures']
                         
-                        # Get passed lectures
-                        cursor.execute("""
-                            SELECT COUNT(*) as passed_lectures 
-                            FROM LectureResults 
-                            WHERE LearnerID = %s AND CourseID = %s AND State = 'passed'
-                        """, (learner_id, course_id))
-                        passed_lectures = cursor.fetchone()['passed_lectures']
+                            # Get passed lectures
+                            cursor.execute("""
+                                SELECT COUNT(*) as passed_lectures 
+                                FROM LectureResults 
+                                WHERE LearnerID = %s AND CourseID = %s AND State = 'passed'
+                            """, (learner_id, course_id))
+                            passed_lectures = cursor.fetchone()['passed_lectures']
                         
-                        # Calculate percentage
-                        if total_lectures > 0:
-                            percentage_raw = (passed_lectures * 100.0) / total_lectures
+                            # Calculate percentage
+                            if total_lectures > 0:
+                                percentage_raw = (passed_lectures * 100.0) / total_lectures
                             
-                            # Convert to percentage scale
-                            if percentage_raw < 10:
-                                percentage = 0
-                            elif percentage_raw < 30:
-                                percentage = 20
-                            elif percentage_raw < 50:
-                                percentage = 40
-                            elif percentage_raw < 70:
-                                percentage = 60
-                            elif percentage_raw < 90:
-                                percentage = 80
-                            else:
-                                percentage = 100
+                                # Convert to percentage scale
+                                if percentage_raw < 10:
+                                    percentage = 0
+                                elif percentage_raw < 30:
+                                    percentage = 20
+                                elif percentage_raw < 50:
+                                    percentage = 40
+                                elif percentage_raw < 70:
+                                    percentage = 60
+                                elif percentage_raw < 90:
+                                    percentage = 80
+                                else:
+                                    percentage = 100
                                 
-                            # Update enrollment record
-                            cursor.execute("""
-                                UPDATE Enrollments
-                                SET Percentage = %s
-                                WHERE LearnerID = %s AND CourseID = %s
-                            """, (percentage, learner_id, course_id))
-                    except Exception as e:
-                        print(f"Error updating course percentage: {str(e)}")
-                        # Continue even if percentage update fails
+                                # Update enrollment record
+                                cursor.execute("""
+                                    UPDATE Enrollments
+                                    SET Percentage = %s
+                                    WHERE LearnerID = %s AND CourseID = %s
+                                """, (percentage, learner_id, course_id))
+                        except Exception as e:
+                            print(f"Error updating course percentage: {str(e)}")
+                            # Continue even if percentage update fails
                     
-                    conn.commit()
-                    print(f"Score updated successfully for learner {learner_id}, lecture {lecture_id}")
-                except Exception as e:
-                    print(f"Error saving quiz score: {str(e)}")
-                    conn.rollback()
-                    raise HTTPException(status_code=500, detail=f"Failed to save quiz score: {str(e)}")
-
-                return {
-                    "score": score,
-                    "total_questions": total_questions,
-                    "correct_answers": correct_count
-                }
+                        conn.commit()
+                        print(f"Score updated successfully for learner {learner_id}, lecture {lecture_id}")
+                    except Exception as e:
+                        print(f"Error saving quiz score: {str(e)}")
+                        conn.rollback()
+                        raise HTTPException(status_code=500, detail=f"Failed to save quiz score: {str(e)}")
+
+                    return learner_id, course_id, instructor_id, passed, {
+                        "score": score,
+                        "total_questions": total_questions,
+                        "correct_answers": correct_count
+                    }
+            finally:
+                conn.close()
 
-        finally:
-            conn.close()
+        learner_id, course_id, instructor_id, passed, result = await run_blocking(grade_and_save)
+        await record_lecture_result(learner_id, course_id, lecture_id, passed)
+        # Lecture analytics and completion figures on the instructor's dashboard changed
+        await invalidate_tags([f"instructor:{instructor_id}"])
+        return result
 
     except HTTPException as he:
         raise he
@@ -1875,18 +2035,11 @@ async def get_quiz_results(
             
             # Define the database fetch function
             async def fetch_quiz_results_from_db():
-                conn = connect_db()
-                try:
-                    with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                        cursor.execute("""
-                            SELECT Score, State, Date
-                            FROM LectureResults
-                            WHERE LearnerID = %s AND LectureID = %s
-                            ORDER BY Date DESC
-                            LIMIT 1
-                        """, (user_id, lecture_id))
+                async with async_db_connection() as conn:
+                    async with conn.cursor() as cursor:
+                        await cursor.execute(LATEST_QUIZ_RESULT_QUERY, (user_id, lecture_id))
                         
-                        result = cursor.fetchone()
+                        result = await cursor.fetchone()
                         if not result:
                             return None
                             
@@ -1895,8 +2048,6 @@ async def get_quiz_results(
                             "status": result["State"],
                             "date": result["Date"].isoformat()
                         }
-                finally:
-                    conn.close()
             
             # Use the caching mechanism to get the data
             # Short TTL since quiz results may change frequently
@@ -1919,7 +2070,7 @@ async def get_quiz_results(
 
 # Get instructor course details
 @router.get("/instructor/courses/{course_id}", response_model=Course)
-async def get_instructor_course_details(
+def get_instructor_course_details(
     request: Request,
     course_id: int,
     auth_token: str = Cookie(None)
@@ -1970,18 +2121,14 @@ async def get_instructor_course_details(
                         c.CourseName as name, 
                         CONCAT(i.InstructorName, ' (', i.AccountName, ')') as instructor,
                         c.Descriptions as description,
-                        (SELECT COUNT(*) FROM Enrollments WHERE CourseID = c.CourseID) as enrolled,
-                        COALESCE(
-                            (SELECT AVG(Rating) 
-                             FROM Enrollments 
-                             WHERE CourseID = c.CourseID AND Rating IS NOT NULL),
-                            0
-                        ) as rating,
+                        COALESCE(s.EnrolledCount, 0) as enrolled,
+                        COALESCE(s.RatingSum / NULLIF(s.RatingCount, 0), 0) as rating,
                         c.Skills as skills,
                         c.Difficulty as difficulty,
                         c.EstimatedDuration as duration
                     FROM Courses c
                     JOIN Instructors i ON c.InstructorID = i.InstructorID
+                    LEFT JOIN CourseStats s ON s.CourseID = c.CourseID
                     WHERE c.CourseID = %s AND c.InstructorID = %s
                 """
                 
@@ -2056,121 +2203,117 @@ async def create_lecture(
             if role != "Instructor":
                 raise HTTPException(status_code=403, detail="Only instructors can access this endpoint")
             
-            # Connect to database
-            conn = connect_db()
-            cursor = conn.cursor(pymysql.cursors.DictCursor)
-            
-            try:
-                # Get instructor ID from token or fallback to database lookup
-                instructor_id = user_data.get('user_id')
-                if not instructor_id:
-                    # Fallback for old tokens without user_id
-                    cursor.execute("""
-                        SELECT InstructorID 
-                        FROM Instructors 
-                        WHERE AccountName = %s
-                    """, (username,))
+            def insert_lecture():
+                conn = connect_db()
+                try:
+                    cursor = conn.cursor(pymysql.cursors.DictCursor)
+                    # Get instructor ID from token or fallback to database lookup
+                    instructor_id = user_data.get('user_id')
+                    if not instructor_id:
+                        # Fallback for old tokens without user_id
+                        cursor.execute("""
+                            SELECT InstructorID 
+                            FROM Instructors 
+                            WHERE AccountName = %s
+                        """, (username,))
                     
-                    instructor = cursor.fetchone()
-                    if not instructor:
-                        raise HTTPException(status_code=404, detail="Instructor not found")
+                        instructor = cursor.fetchone()
+                        if not instructor:
+                            raise HTTPException(status_code=404, detail="Instructor not found")
                     
-                    instructor_id = instructor['InstructorID']
+                        instructor_id = instructor['InstructorID']
                 
-                # Verify this instructor owns this course
-                cursor.execute("""
-                    SELECT CourseID 
-                    FROM Courses 
-                    WHERE CourseID = %s AND InstructorID = %s
-                """, (course_id, instructor_id))
+                    # Verify this instructor owns this course
+                    cursor.execute("""
+                        SELECT CourseID 
+                        FROM Courses 
+                        WHERE CourseID = %s AND InstructorID = %s
+                    """, (course_id, instructor_id))
                 
 
                 
-                if not cursor.fetchone():
-                    raise HTTPException(status_code=403, detail="Not authorized to modify this course")
+                    if not cursor.fetchone():
+                        raise HTTPException(status_code=403, detail="Not authorized to modify this course")
                 
-                # Create the lecture
-                cursor.execute("""
-                    INSERT INTO Lectures (CourseID, Title, Description, Content) 
-                    VALUES (%s, %s, %s, %s)
-                """, (course_id, title, description, content))
+                    # Create the lecture
+                    cursor.execute("""
+                        INSERT INTO Lectures (CourseID, Title, Description, Content) 
+                        VALUES (%s, %s, %s, %s)
+                    """, (course_id, title, description, content))
                 
-                # Get the newly created lecture ID
-                lecture_id = cursor.lastrowid
+                    # Get the newly created lecture ID
+                    lecture_id = cursor.lastrowid
                 
-                # Process quiz data first (faster database operations)
-                quiz_id = None
-                if quiz:
-                    quiz_data = json.loads(quiz)
-                    if quiz_data and quiz_data.get('questions'):
-                        # Insert quiz
-                        cursor.execute("""
-                            INSERT INTO Quizzes (LectureID, Title, Description) 
-                            VALUES (%s, %s, %s)
-                        """, (lecture_id, f"Quiz for {title}", description))
+                    # Process quiz data first (faster database operations)
+                    quiz_id = None
+                    if quiz:
+                        quiz_data = json.loads(quiz)
+                        if quiz_data and quiz_data.get('questions'):
+                            # Insert quiz
+                            cursor.execute("""
+                                INSERT INTO Quizzes (LectureID, Title, Description) 
+                                VALUES (%s, %s, %s)
+                            """, (lecture_id, f"Quiz for {title}", description))
                         
-                        quiz_id = cursor.lastrowid
+                            quiz_id = cursor.lastrowid
                         
-                        # Batch insert questions and options for better performance
-                        questions_to_insert = []
-                        options_to_insert = []
+                            # Batch insert questions and options for better performance
+                            questions_to_insert = []
+                            options_to_insert = []
                         
-                        for question in quiz_data['questions']:
-                            # Insert question first to get the ID
-                            cursor.execute("""
-                                INSERT INTO Questions (QuizID, QuestionText) 
-                                VALUES (%s, %s)
-                            """, (quiz_id, question['question']))
+                            for question in quiz_data['questions']:
+                                # Insert question first to get the ID
+                                cursor.execute("""
+                                    INSERT INTO Questions (QuizID, QuestionText) 
+                                    VALUES (%s, %s)
+                                """, (quiz_id, question['question']))
                             
-                            question_id = cursor.lastrowid
+                                question_id = cursor.lastrowid
                             
-                            # Prepare batch options for this question
-                            for i, option in enumerate(question['options']):
-                                options_to_insert.append((
-                                    question_id, 
-                                    option, 
-                                    i == question['correctAnswer']
-                                ))
+                                # Prepare batch options for this question
+                                for i, option in enumerate(question['options']):
+                                    options_to_insert.append((
+                                        question_id, 
+                                        option, 
+                                        i == question['correctAnswer']
+                                    ))
                         
-                        # Batch insert all options at once
-                        if options_to_insert:
-                            cursor.executemany("""
-                                INSERT INTO Options (QuestionID, OptionText, IsCorrect)
-                                VALUES (%s, %s, %s)
-                            """, options_to_insert)
-                
-                # Commit all database changes at once
-                conn.commit()
+                            # Batch insert all options at once
+                            if options_to_insert:
+                                cursor.executemany("""
+                                    INSERT INTO Options (QuestionID, OptionText, IsCorrect)
+                                    VALUES (%s, %s, %s)
+                                """, options_to_insert)
                 
-                # Prepare response
-                response = {
-                    "id": lecture_id,
-                    "title": title,
-                    "message": "Lecture created successfully"
-                }
+                    # Commit all database changes at once
+                    conn.commit()
                 
-                # Note: Video upload is now handled separately through upload_endpoints.py
-                # This separates concerns and allows for better error handling and chunked uploads
-                if video:
-                    response["note"] = "Lecture created successfully. Please use the dedicated upload endpoints for video upload."
+                    # Prepare response
+                    response = {
+                        "id": lecture_id,
+                        "title": title,
+                        "message": "Lecture created successfully"
+                    }
                 
+                    # Note: Video upload is now handled separately through upload_endpoints.py
+                    # This separates concerns and allows for better error handling and chunked uploads
+                    if video:
+                        response["note"] = "Lecture created successfully. Please use the dedicated upload endpoints for video upload."
                 
-                # Invalidate cache patterns in background (non-blocking)
-                def background_cache_invalidation():
-                    try:
-                        # Clear course-specific caches
-                        invalidate_cache_pattern(f"courses:id:{course_id}:*")
-                        invalidate_cache_pattern(f"instructor:courses:*")
-                        # Clear lecture cache if it exists
-                        invalidate_cache_pattern(f"lectures:id:*")
-                        print(f"Cache invalidation completed for course {course_id}")
-                    except Exception as cache_error:
-                        print(f"Background cache invalidation failed: {str(cache_error)}")
                 
-                # Start background cache invalidation
-                cache_thread = threading.Thread(target=background_cache_invalidation)
-                cache_thread.daemon = True
-                cache_thread.start()
+                    # Every lecture page embeds the course's lecture list, so bump each lecture's
+                    # generation along with the course's, and drop this instructor's course list
+                    cursor.execute("SELECT LectureID FROM Lectures WHERE CourseID = %s", (course_id,))
+                    course_lecture_ids = [row['LectureID'] for row in cursor.fetchall()]
+                    return response, course_lecture_ids
+                finally:
+                    conn.close()
+
+            try:
+                response, course_lecture_ids = await run_blocking(insert_lecture)
+                await bump_generations([f"course:{course_id}"] + [f"lecture:{lid}" for lid in course_lecture_ids])
+                await invalidate_tags([f"instructor:{user_data.get('user_id') or username}"])
+                schedule_warm("course", course_id)
                 
                 return response
                 
@@ -2189,13 +2332,10 @@ async def create_lecture(
     except Exception as e:
         print(f"Error in create_lecture: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 # Optimized preview endpoint for CoursePreview.js - combines course + lectures
 @router.get("/courses/{course_id}/preview")
-async def get_course_preview_data(course_id: int, request: Request, auth_token: str = Cookie(None)):
+async def get_course_preview_data(course_id: int, request: Request, response: Response, auth_token: str = Cookie(None)):
     try:
         # Authentication
         if not auth_token:
@@ -2213,111 +2353,25 @@ async def get_course_preview_data(course_id: int, request: Request, auth_token:
             print(f"Token decode error: {str(e)}")
             raise HTTPException(status_code=401, detail="Invalid authentication token")
         
-        # Cache key for combined preview data
-        cache_key = f"course:preview:{course_id}:user:{user_id}"
-        
-        # Fetch all data in one optimized query
-        async def fetch_preview_data_from_db():
-            conn = connect_db()
-            try:
-                with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                    # Get course details with enrollment status
-                    course_query = """
-                    SELECT 
-                        c.CourseID as id,
-                        c.CourseName as name,
-                        c.Descriptions as description,
-                        c.EstimatedDuration as duration,
-                        c.Skills as skills,
-                        c.Difficulty as difficulty,
-                        CONCAT(i.InstructorName, ' (', i.AccountName, ')') as instructor,
-                        i.InstructorID as instructor_id,
-                        COALESCE(enrollment_stats.enrolled, 0) as enrolled,
-                        COALESCE(rating_stats.avg_rating, NULL) as rating,
-                        CASE WHEN user_enrollment.LearnerID IS NOT NULL THEN TRUE ELSE FALSE END as is_enrolled,
-                        user_enrollment.Rating as user_rating
-                    FROM Courses c
-                    JOIN Instructors i ON c.InstructorID = i.InstructorID
-                    LEFT JOIN (
-                        SELECT CourseID, COUNT(*) as enrolled
-                        FROM Enrollments GROUP BY CourseID
-                    ) enrollment_stats ON c.CourseID = enrollment_stats.CourseID
-                    LEFT JOIN (
-                        SELECT CourseID, AVG(Rating) as avg_rating
-                        FROM Enrollments WHERE Rating IS NOT NULL GROUP BY CourseID
-                    ) rating_stats ON c.CourseID = rating_stats.CourseID
-                    LEFT JOIN (
-                        SELECT e2.CourseID, e2.LearnerID, e2.Rating
-                        FROM Enrollments e2
-                        JOIN Learners l ON e2.LearnerID = l.LearnerID
-                        WHERE l.LearnerID = %s
-                    ) user_enrollment ON c.CourseID = user_enrollment.CourseID
-                    WHERE c.CourseID = %s
-                    """
-                    
-                    cursor.execute(course_query, (user_id, course_id))
-                    course = cursor.fetchone()
-                    
-                    if not course:
-                        raise HTTPException(status_code=404, detail="Course not found")
-                    
-                    # Get lectures for this course
-                    lectures_query = """
-                    SELECT 
-                        LectureID as id,
-                        Title as title,
-                        Description as description
-                    FROM Lectures
-                    WHERE CourseID = %s
-                    ORDER BY LectureID ASC
-                    """
-                    
-                    cursor.execute(lectures_query, (course_id,))
-                    lectures = cursor.fetchall()
-                    
-                    # Format skills if it's JSON
-                    skills = []
-                    if course['skills']:
-                        try:
-                            skills = json.loads(course['skills'])
-                        except:
-                            skills = []
-                    
-                    # Format the response
-                    return {
-                        'course': {
-                            'id': course['id'],
-                            'name': course['name'],
-                            'description': course['description'],
-                            'duration': course['duration'],
-                            'skills': skills,
-                            'difficulty': course['difficulty'],
-                            'instructor': course['instructor'],
-                            'instructor_id': course['instructor_id'],
-                            'enrolled': course['enrolled'],
-                            'rating': float(course['rating']) if course['rating'] else None,
-                            'is_enrolled': course['is_enrolled'],
-                            'user_rating': int(course['user_rating']) if course['user_rating'] else None
-                        },
-                        'lectures': [
-                            {
-                                'id': lecture['id'],
-                                'title': lecture['title'],
-                                'description': lecture['description']
-                            }
-                            for lecture in lectures
-                        ]
-                    }
-            finally:
-                conn.close()
-        
-        # Use caching with shorter TTL since it includes user-specific data
-        return await get_cached_data(
-            cache_key,
-            fetch_preview_data_from_db,
-            ttl=900,  # 15 minutes for user-specific data
-            use_compression=True
+        # Shared course document plus this learner's enrollment and rating
+        await record_course_view(course_id)
+        enrollments = await get_learner_enrollments(user_id, learner_enrollments_loader(user_id))
+        is_enrolled = course_id in enrollments
+        user_rating = enrollments.get(course_id)
+        course, etag = await load_conditional(
+            request, lambda etags: get_course_aggregate(course_id, etags), is_enrolled, user_rating
         )
+        if course is None:
+            return not_modified(etag)
+        
+        preview_course = {field: value for field, value in course.items() if field != 'lectures'}
+        preview_course['is_enrolled'] = is_enrolled
+        preview_course['user_rating'] = user_rating
+        set_cache_headers(response, etag)
+        return {
+            'course': preview_course,
+            'lectures': course['lectures']
+        }
         
     except HTTPException:
         raise
@@ -2327,7 +2381,7 @@ async def get_course_preview_data(course_id: int, request: Request, auth_token:
 
 # Debug endpoint for instructor to list their courses - no caching, direct DB access
 @router.get("/instructor/debug/my-courses")
-async def debug_my_courses(
+def debug_my_courses(
     request: Request,
     auth_token: str = Cookie(None)
 ):
@@ -2385,34 +2439,59 @@ async def debug_my_courses(
         if 'conn' in locals():
             conn.close()
 
-# Get enrolled learners for a specific course (instructor only)
-@router.get("/instructor/courses/{course_id}/enrollments")
-async def get_course_enrollments(
-    course_id: int,
-    request: Request,
-    auth_token: str = Cookie(None)
-):
+ENROLLMENTS_MAX_PAGE_SIZE = 500
+
+# Enrolled learners of one course, newest first; {keyset} narrows it to the rows after a cursor
+ENROLLMENTS_QUERY = """
+    SELECT
+        e.EnrollmentID,
+        l.LearnerID,
+        l.LearnerName,
+        l.Email,
+        e.EnrollmentDate,
+        COALESCE(e.Percentage, 0) as progress,
+        COALESCE(e.Rating, 0) as rating
+    FROM Enrollments e
+    JOIN Learners l ON e.LearnerID = l.LearnerID
+    WHERE e.CourseID = %s {keyset}
+    ORDER BY e.EnrollmentDate DESC, e.EnrollmentID DESC
+"""
+
+ENROLLMENT_EXPORT_COLUMNS = ["EnrollmentID", "LearnerID", "LearnerName", "Email", "EnrollmentDate", "progress", "rating"]
+
+def encode_enrollment_cursor(enrollment):
+    """Token for the page after this enrollment row, as <EnrollmentDate>_<EnrollmentID>"""
+    return f"{enrollment['EnrollmentDate'].isoformat()}_{enrollment['EnrollmentID']}"
+
+def decode_enrollment_cursor(cursor):
+    try:
+        date, enrollment_id = cursor.split("_", 1)
+        return datetime.strptime(date, "%Y-%m-%d").date(), int(enrollment_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def get_instructor_course(request, auth_token, course_id):
+    """Authenticate an instructor and return the course row if it is theirs (401/403/404 otherwise)"""
+    # Get token from header if not in cookie
+    if not auth_token:
+        auth_header = request.headers.get('Authorization')
+        if auth_header and auth_header.startswith('Bearer '):
+            auth_token = auth_header.split(' ')[1]
+        else:
+            raise HTTPException(status_code=401, detail="No authentication token provided")
+
+    # Verify token and get user data
+    user_data = decode_token(auth_token)
+    username = user_data['username']
+    role = user_data['role']
+    instructor_id = user_data.get('user_id')
+
+    # Verify user is an instructor
+    if role != "Instructor":
+        raise HTTPException(status_code=403, detail="Only instructors can access this endpoint")
+
+    conn = connect_db()
     try:
-        # Get token from header if not in cookie
-        if not auth_token:
-            auth_header = request.headers.get('Authorization')
-            if auth_header and auth_header.startswith('Bearer '):
-                auth_token = auth_header.split(' ')[1]
-            else:
-                raise HTTPException(status_code=401, detail="No authentication token provided")
-        
-        # Verify token and get user data
-        user_data = decode_token(auth_token)
-        username = user_data['username']
-        role = user_data['role']
-        instructor_id = user_data.get('user_id')
-        
-        # Verify user is an instructor
-        if role != "Instructor":
-            raise HTTPException(status_code=403, detail="Only instructors can access this endpoint")
-        
-        conn = connect_db()
-        
         with conn.cursor(pymysql.cursors.DictCursor) as cursor:
             # Get instructor ID if not in token
             if not instructor_id:
@@ -2421,65 +2500,101 @@ async def get_course_enrollments(
                     FROM Instructors 
                     WHERE AccountName = %s
                 """, (username,))
-                
+
                 instructor = cursor.fetchone()
                 if not instructor:
                     raise HTTPException(status_code=404, detail="Instructor not found")
-                
+
                 instructor_id = instructor['InstructorID']
-            
+
             # Verify the course belongs to this instructor
             cursor.execute("""
                 SELECT CourseID, CourseName
                 FROM Courses 
                 WHERE CourseID = %s AND InstructorID = %s
             """, (course_id, instructor_id))
-            
+
             course = cursor.fetchone()
             if not course:
                 raise HTTPException(status_code=404, detail="Course not found or you don't have permission to access it")
-            
-            # Get enrolled learners with their enrollment details
-            cursor.execute("""
-                SELECT 
-                    l.LearnerID,
-                    l.LearnerName,
-                    l.Email,
-                    e.EnrollmentDate,
-                    COALESCE(e.Percentage, 0) as progress,
-                    COALESCE(e.Rating, 0) as rating
-                FROM Enrollments e
-                JOIN Learners l ON e.LearnerID = l.LearnerID
-                WHERE e.CourseID = %s
-                ORDER BY e.EnrollmentDate DESC
+            return course
+    finally:
+        conn.close()
+
+# Get enrolled learners for a specific course (instructor only)
+@router.get("/instructor/courses/{course_id}/enrollments")
+def get_course_enrollments(
+    course_id: int,
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=ENROLLMENTS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    auth_token: str = Cookie(None)
+):
+    """
+    Enrollment summary and learners, newest first. Without ?limit= every learner is
+    returned; with it, one page plus next_cursor (also in X-Next-Cursor) for ?cursor=.
+    """
+    try:
+        course = get_instructor_course(request, auth_token, course_id)
+
+        keyset, params = "", [course_id]
+        if cursor:
+            enrollment_date, enrollment_id = decode_enrollment_cursor(cursor)
+            keyset = "AND (e.EnrollmentDate < %s OR (e.EnrollmentDate = %s AND e.EnrollmentID < %s))"
+            params.extend([enrollment_date, enrollment_date, enrollment_id])
+        query = ENROLLMENTS_QUERY.format(keyset=keyset)
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit + 1)
+
+        conn = connect_db()
+        
+        with conn.cursor(pymysql.cursors.DictCursor) as db_cursor:
+            # Totals come from the whole course, not just this page
+            db_cursor.execute("""
+                SELECT
+                    COUNT(*) as total,
+                    COALESCE(SUM(COALESCE(Percentage, 0) = 100), 0) as completed
+                FROM Enrollments
+                WHERE CourseID = %s
             """, (course_id,))
-            
-            enrollments = cursor.fetchall()
-            
-            # Calculate completion rate
-            total_enrollments = len(enrollments)
-            completed_enrollments = sum(1 for e in enrollments if e['progress'] == 100)
-            completion_rate = (completed_enrollments / total_enrollments * 100) if total_enrollments > 0 else 0
-            
-            # Format the data for the frontend
-            formatted_enrollments = []
-            for enrollment in enrollments:
-                formatted_enrollments.append({
-                    'learner_id': enrollment['LearnerID'],
-                    'learner_name': enrollment['LearnerName'],
-                    'email': enrollment['Email'],
-                    'enrollment_date': enrollment['EnrollmentDate'].strftime('%b %d, %Y') if enrollment['EnrollmentDate'] else 'N/A',
-                    'progress': enrollment['progress'],
-                    'rating': enrollment['rating']
-                })
-            
-            return {
-                'course_id': course_id,
-                'course_name': course['CourseName'],
-                'total_enrollments': total_enrollments,
-                'completion_rate': round(completion_rate, 1),
-                'enrollments': formatted_enrollments
-            }
+            totals = db_cursor.fetchone()
+
+            db_cursor.execute(query, params)
+            enrollments = db_cursor.fetchall()
+
+        next_cursor = None
+        if limit and len(enrollments) > limit:
+            enrollments = enrollments[:limit]
+            next_cursor = encode_enrollment_cursor(enrollments[-1])
+            response.headers["X-Next-Cursor"] = next_cursor
+
+        # Calculate completion rate
+        total_enrollments = int(totals['total'])
+        completed_enrollments = int(totals['completed'])
+        completion_rate = (completed_enrollments / total_enrollments * 100) if total_enrollments > 0 else 0
+
+        # Format the data for the frontend
+        formatted_enrollments = []
+        for enrollment in enrollments:
+            formatted_enrollments.append({
+                'learner_id': enrollment['LearnerID'],
+                'learner_name': enrollment['LearnerName'],
+                'email': enrollment['Email'],
+                'enrollment_date': enrollment['EnrollmentDate'].strftime('%b %d, %Y') if enrollment['EnrollmentDate'] else 'N/A',
+                'progress': enrollment['progress'],
+                'rating': enrollment['rating']
+            })
+
+        return {
+            'course_id': course_id,
+            'course_name': course['CourseName'],
+            'total_enrollments': total_enrollments,
+            'completion_rate': round(completion_rate, 1),
+            'enrollments': formatted_enrollments,
+            'next_cursor': next_cursor
+        }
             
     except HTTPException as he:
         raise he
@@ -2490,6 +2605,26 @@ async def get_course_enrollments(
         if 'conn' in locals():
             conn.close()
 
+# Export every enrolled learner of a course (instructor only)
+@router.get("/instructor/courses/{course_id}/enrollments/export")
+def export_course_enrollments(
+    course_id: int,
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    auth_token: str = Cookie(None)
+):
+    """All enrollments of a course as NDJSON or CSV, streamed from a server-side cursor"""
+    try:
+        get_instructor_course(request, auth_token, course_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error exporting course enrollments: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error exporting course enrollments: {str(e)}")
+
+    query = ENROLLMENTS_QUERY.format(keyset="")
+    return export_response(query, (course_id,), ENROLLMENT_EXPORT_COLUMNS, format, f"course-{course_id}-enrollments")
+
 # Rating submission model
 class RatingSubmission(BaseModel):
     rating: int = Field(..., ge=1, le=5, description="Rating value between 1 and 5")
@@ -2515,68 +2650,69 @@ async def submit_course_rating(
         try:
             user_data = decode_token(auth_token)
             learner_id = user_data.get('user_id')
-            
-            if not learner_id:
-                # Fallback for old tokens without user_id - do database lookup
-                conn = connect_db()
-                with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                    cursor.execute("""
-                        SELECT LearnerID 
-                        FROM Learners 
-                        WHERE AccountName = %s
-                    """, (user_data['username'],))
-                    learner = cursor.fetchone()
-                    if not learner:
-                        raise HTTPException(status_code=404, detail="Learner not found")
-                    learner_id = learner['LearnerID']
-            else:
-                # Use user_id from token
-                conn = connect_db()
         except Exception as e:
             print(f"Token/user verification error: {str(e)}")
             raise HTTPException(status_code=401, detail="Invalid authentication token or user not found")
 
-        # Check if the course exists and user is enrolled
-        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-            cursor.execute("""
-                SELECT e.EnrollmentID 
-                FROM Enrollments e
-                JOIN Courses c ON e.CourseID = c.CourseID
-                WHERE e.CourseID = %s AND e.LearnerID = %s
-            """, (course_id, learner_id))
-            enrollment = cursor.fetchone()
-            if not enrollment:
-                raise HTTPException(status_code=404, detail="Course not found or you are not enrolled")
-            
-            # Update the rating in the Enrollments table
+        def save_rating():
+            """Stores the rating; returns the learner ID and the course's instructor ID"""
+            conn = connect_db()
             try:
-                cursor.execute("""
-                    UPDATE Enrollments
-                    SET Rating = %s
-                    WHERE CourseID = %s AND LearnerID = %s
-                """, (rating_data.rating, course_id, learner_id))
-                
-                conn.commit()
-                
-                # Invalidate cache for course rating data
-                redis_client = get_redis_client()
-                pattern_course = f"courses:id:{course_id}:*"
-                pattern_preview = f"course:preview:{course_id}:*"
-                print(f"Invalidating cache patterns: {pattern_course}, {pattern_preview}")
-                invalidate_cache_pattern(pattern_course)
-                invalidate_cache_pattern(pattern_preview)
+                with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                    current_learner_id = learner_id
+                    if not current_learner_id:
+                        # Fallback for old tokens without user_id - do database lookup
+                        cursor.execute("""
+                            SELECT LearnerID 
+                            FROM Learners 
+                            WHERE AccountName = %s
+                        """, (user_data['username'],))
+                        learner = cursor.fetchone()
+                        if not learner:
+                            raise HTTPException(status_code=401, detail="Invalid authentication token or user not found")
+                        current_learner_id = learner['LearnerID']
+
+                    # Check if the course exists and user is enrolled
+                    cursor.execute("""
+                        SELECT e.EnrollmentID, c.InstructorID
+                        FROM Enrollments e
+                        JOIN Courses c ON e.CourseID = c.CourseID
+                        WHERE e.CourseID = %s AND e.LearnerID = %s
+                    """, (course_id, current_learner_id))
+                    enrollment = cursor.fetchone()
+                    if not enrollment:
+                        raise HTTPException(status_code=404, detail="Course not found or you are not enrolled")
+            
+                    # Update the rating in the Enrollments table
+                    try:
+                        cursor.execute("""
+                            UPDATE Enrollments
+                            SET Rating = %s
+                            WHERE CourseID = %s AND LearnerID = %s
+                        """, (rating_data.rating, course_id, current_learner_id))
                 
-                return {"message": "Rating submitted successfully", "rating": rating_data.rating}
-            except Exception as e:
-                conn.rollback()
-                print(f"Error updating rating: {str(e)}")
-                raise HTTPException(status_code=500, detail=f"Failed to submit rating: {str(e)}")
+                        conn.commit()
+                        return current_learner_id, enrollment['InstructorID']
+                    except Exception as e:
+                        conn.rollback()
+                        print(f"Error updating rating: {str(e)}")
+                        raise HTTPException(status_code=500, detail=f"Failed to submit rating: {str(e)}")
+            finally:
+                conn.close()
+
+        learner_id, instructor_id = await run_blocking(save_rating)
+
+        # Record the learner's rating, move the shared course views
+        # (average rating) to a new generation and drop the learner's and instructor's own data
+        await record_enrollment(learner_id, course_id, rating_data.rating)
+        await bump_generations([f"course:{course_id}"])
+        await invalidate_tags([f"learner:{learner_id}", f"instructor:{instructor_id}"])
+        schedule_warm("course", course_id)
+
+        return {"message": "Rating submitted successfully", "rating": rating_data.rating}
         
     except HTTPException as he:
         raise he
     except Exception as e:
         print(f"Error submitting rating: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error submitting rating: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error submitting rating: {str(e)}")
\ No newline at end of file
@@ -33,19 +33,19 @@ async def chat_endpoint(message: ChatMessage, request: Request, auth_token: str
             raise HTTPException(status_code=401, detail="Invalid authentication token")
         
         # Get chatbot response
-        chat_history = get_chat_history(username)
+        chat_history = await get_chat_history(username)
         
         # Only append to cache if use_cache is True (default True for general chat)
         if message.use_cache:
-            append_chat_message(username, message.message, is_user=True)
+            await append_chat_message(username, message.message, is_user=True)
         
         response = get_chat_response(username, message.message)
         
         # Only append response to cache if use_cache is True
         if message.use_cache:
-            append_chat_message(username, response, is_user=False)
+            await append_chat_message(username, response, is_user=False)
         
-        return {"answer": response, "history": get_chat_history(username) if message.use_cache else []}
+        return {"answer": response, "history": await get_chat_history(username) if message.use_cache else []}
 
     except Exception as e:
         print(f"Chat error: {str(e)}")
@@ -78,12 +78,12 @@ async def lecture_chat_endpoint(
             raise HTTPException(status_code=401, detail="Invalid authentication token")
         
         # Get chatbot response for specific lecture
-        chat_history = get_chat_history(username)
+        chat_history = await get_chat_history(username)
         
         # Only append to cache if use_cache is True
         if message.use_cache:
             print(f"Lecture chat: Caching enabled for user {username}, lecture {lecture_id}")
-            append_chat_message(username, message.message, is_user=True)
+            await append_chat_message(username, message.message, is_user=True)
         else:
             print(f"Lecture chat: Caching disabled for user {username}, lecture {lecture_id}")
         
@@ -91,9 +91,9 @@ async def lecture_chat_endpoint(
         
         # Only append response to cache if use_cache is True
         if message.use_cache:
-            append_chat_message(username, response, is_user=False)
+            await append_chat_message(username, response, is_user=False)
         
-        return {"answer": response, "history": get_chat_history(username) if message.use_cache else []}
+        return {"answer": response, "history": await get_chat_history(username) if message.use_cache else []}
 
     except HTTPException as he:
         raise he
@@ -123,7 +123,7 @@ async def clear_history_endpoint(request: Request, auth_token: str = Cookie(None
             raise HTTPException(status_code=401, detail="Invalid authentication token")
         
         # Clear Valkey cache
-        clear_user_chat_history(username)
+        await clear_user_chat_history(username)
         
         # Clear memory-based chat histories based on lectureId
         if lectureId is not None:
@@ -169,7 +169,7 @@ async def get_history_endpoint(
             raise HTTPException(status_code=401, detail="Invalid authentication token")
         
         # Get chat history from Valkey
-        chat_history = get_chat_history(username)
+        chat_history = await get_chat_history(username)
         
         # Return the chat history - make sure formatting is consistent
         return {"history": chat_history, "message": "History retrieved successfully"}
@@ -205,7 +205,7 @@ async def get_general_history_endpoint(
             raise HTTPException(status_code=401, detail="Invalid authentication token")
         
         # Get chat history from Valkey
-        chat_history = get_chat_history(username)
+        chat_history = await get_chat_history(username)
         
         # Return the chat history with a debugging message
         print(f"Returning chat history for {username}: {len(chat_history)} messages")
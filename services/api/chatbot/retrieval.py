@@ -4,7 +4,6 @@ import hashlib
 import pymysql
 import qdrant_client
 import asyncio
-import aiomysql
 from dotenv import load_dotenv
 from langchain.schema import Document
 from langchain.vectorstores import Qdrant
@@ -25,6 +24,7 @@ from .config import (
     MPLCONFIGDIR
 )
 from .model_init import embedding_model
+from services.config.mysql_config import get_db_connection, async_db_connection
 
 load_dotenv()
 
@@ -38,24 +38,12 @@ MYSQL_PORT = int(os.getenv("MYSQL_PORT", 3306))
 client = qdrant_client.QdrantClient(QDRANT_HOST, api_key=QDRANT_API_KEY)
 
 def connect_db():
-    return pymysql.connect(
-        host=MYSQL_HOST,
-        user=MYSQL_USER,
-        password=MYSQL_PASSWORD,
-        database=MYSQL_DB,
-        port=MYSQL_PORT,
-        cursorclass=pymysql.cursors.DictCursor,
-    )
+    """Lease a DictCursor connection from the shared MySQL pool"""
+    return get_db_connection(cursorclass=pymysql.cursors.DictCursor)
 
-async def connect_db_async():
-    return await aiomysql.connect(
-        host=MYSQL_HOST,
-        user=MYSQL_USER,
-        password=MYSQL_PASSWORD,
-        database=MYSQL_DB,
-        port=MYSQL_PORT,
-        cursorclass=aiomysql.DictCursor,
-    )
+def connect_db_async():
+    """Lease a DictCursor connection from the shared aiomysql pool (use with async with)"""
+    return async_db_connection()
 
 #---- Lectures processing
 
@@ -80,7 +68,7 @@ def load_sql_lectures():  # -> list[dict]
             return cursor.fetchall()
 
 async def load_sql_lectures_async() -> List[Dict]:
-    async with await connect_db_async() as conn:
+    async with connect_db_async() as conn:
         async with conn.cursor() as cursor:
             await cursor.execute("""
                 SELECT LectureID, Title, Description, Content
@@ -329,7 +317,7 @@ def load_sql(): #-> list[dict]
             return cursor.fetchall()
 
 async def load_sql_async() -> List[Dict]:
-    async with await connect_db_async() as conn:
+    async with connect_db_async() as conn:
         async with conn.cursor() as cursor:
             await cursor.execute("SELECT * FROM Courses")
             return await cursor.fetchall()
@@ -7,23 +7,29 @@ auth.py  –  Lightweight authentication micro-service
 • No Streamlit, cookies, or front-end logic
 """
 
-from fastapi import FastAPI, Request, Response, Cookie, HTTPException, Depends
+from fastapi import FastAPI, Request, Response, Cookie, HTTPException, Depends, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
 from jose import jwt, JWTError
 from pydantic import BaseModel
+from typing import Optional, Literal
 from dotenv import load_dotenv
 import os
 import time
 import requests
 import os
-import pymysql
 import bcrypt
 import sys
 import importlib.util
 from services.api.db.token_utils import create_token, decode_token
+from services.config.mysql_config import (
+    get_db_connection, get_db, get_mysql_pool_metrics, mysql_pool, close_async_db_pool, get_async_pool_metrics
+)
+from services.utils.executor import get_executor_metrics
+from services.utils.streaming import export_response
+from services.utils.query_stats import QueryStatsMiddleware, get_query_metrics
 from sqlalchemy.orm import Session
 from contextlib import asynccontextmanager
 
@@ -44,12 +50,53 @@ async def lifespan(app: FastAPI):
         print("Upload cleanup task started successfully")
     except Exception as e:
         print(f"Failed to start upload cleanup task: {e}")
+
+    # Backfill and repair the lecture video index from S3
+    try:
+        from services.api.upload_endpoints import start_video_reconciliation_task
+        start_video_reconciliation_task()
+        print("Video index reconciliation task started successfully")
+    except Exception as e:
+        print(f"Failed to start video index reconciliation task: {e}")
+
+    # Repair drift in the CourseStats table maintained by the Enrollments triggers
+    # (one worker per interval across the cluster)
+    try:
+        from services.utils.course_stats import start_course_stats_repair
+        start_course_stats_repair()
+        print("CourseStats repair task started successfully")
+    except Exception as e:
+        print(f"Failed to start CourseStats repair task: {e}")
+
+    # Repair drift in the daily dashboard rollups maintained by the Enrollments / LectureResults
+    # triggers (one worker per interval across the cluster)
+    try:
+        from services.utils.dashboard_rollups import start_rollup_rebuild
+        start_rollup_rebuild()
+        print("Dashboard rollup repair task started successfully")
+    except Exception as e:
+        print(f"Failed to start dashboard rollup repair task: {e}")
+
+    # Listen for cache invalidations from other workers so the L1 cache stays coherent
+    try:
+        from services.utils.api_cache import start_invalidation_listener
+        start_invalidation_listener()
+    except Exception as e:
+        print(f"Failed to start cache invalidation listener: {e}")
+
+    # Rebuild the catalog and the most-viewed courses before the first wave of users
+    try:
+        from services.utils.cache_warmer import start_cache_warmer
+        start_cache_warmer()
+    except Exception as e:
+        print(f"Failed to start cache warmer: {e}")
     
     yield
     
     # Shutdown
     print("Shutting down FastAPI application...")
-    # Any cleanup can be done here
+    mysql_pool.close_all()
+    await close_async_db_pool()
 
 # Create single FastAPI instance with lifespan
 app = FastAPI(lifespan=lifespan)
@@ -69,9 +116,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
-    expose_headers=["*"]
+    # Response headers the frontend may read: keyset pagination and conditional GETs
+    expose_headers=["X-Next-Cursor", "ETag"]
 )
 
+# Count queries and DB time per request (X-DB-Queries / Server-Timing, /api/metrics)
+app.add_middleware(QueryStatsMiddleware)
+
 # Import API endpoints
 try:
     from services.api.api_endpoints import router as api_router
@@ -133,6 +184,12 @@ app.include_router(chat_router, prefix="/api")
 app.include_router(upload_router, prefix="/api")
 
 
+# Password hash, user ID and full name for /login, per role
+LOGIN_QUERIES = {
+    "Learner": "SELECT Password, LearnerID, LearnerName FROM Learners WHERE AccountName=%s LIMIT 1",
+    "Instructor": "SELECT Password, InstructorID, InstructorName FROM Instructors WHERE AccountName=%s LIMIT 1"
+}
+
 class LoginPayload(BaseModel):
     username: str
     password: str
@@ -149,7 +206,7 @@ class PasswordChangePayload(BaseModel):
 # Token functions moved to token_utils.py
 
 @app.post("/login")
-async def login(response: Response, payload: LoginPayload):
+def login(response: Response, payload: LoginPayload):
     try:
         print(f"Login attempt: {payload.username}, role: {payload.role}")
         
@@ -169,10 +226,7 @@ async def login(response: Response, payload: LoginPayload):
         try:
             with conn.cursor() as cur:
                 # Get password, user ID, and full name for token creation
-                if payload.role == "Learner":
-                    query = f"SELECT Password, LearnerID, LearnerName FROM {table} WHERE AccountName=%s LIMIT 1"
-                else:  # Instructor
-                    query = f"SELECT Password, InstructorID, InstructorName FROM {table} WHERE AccountName=%s LIMIT 1"
+                query = LOGIN_QUERIES[payload.role]
                     
                 print(f"Executing query: {query} with username: {payload.username}")
                 
@@ -254,7 +308,7 @@ def protected_route(auth_token: str = Cookie(None)):
     return {"msg": "Access granted", "user": payload}
 
 @app.put("/api/user/password")
-async def change_password(payload: PasswordChangePayload, request: Request, auth_token: str = Cookie(None)):
+def change_password(payload: PasswordChangePayload, request: Request, auth_token: str = Cookie(None)):
     """Change user password endpoint."""
     # Get token from cookie or Authorization header
     token = auth_token
@@ -318,13 +372,8 @@ async def change_password(payload: PasswordChangePayload, request: Request, auth
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 def connect_db():
-    return pymysql.connect(
-        host=MYSQL_HOST,
-        user=MYSQL_USER,
-        password=MYSQL_PASSWORD,
-        database=MYSQL_DB,
-        port=MYSQL_PORT
-    )
+    """Lease a connection from the shared MySQL pool; close() returns it to the pool"""
+    return get_db_connection()
 
 def check_password(plain: str, hashed: str) -> bool:
     """Compare plaintext vs bcrypt hash stored in DB."""
@@ -451,30 +500,85 @@ async def logout():
     response.delete_cookie(key="session_id", path="/")
     return response
 
-@app.get("/api/users")
-async def get_users(role: str):
-    table_map = {
-        "Learner": "Learners",
-        "Instructor": "Instructors"
-    }
-    table = table_map.get(role)
-    if not table:
+# Columns returned for each role (never the password hash), ID first as the keyset
+USER_COLUMNS = {
+    "Learner": ("Learners", ["LearnerID", "LearnerName", "Email", "AccountName", "PhoneNumber", "CreatedAt", "UpdatedAt"]),
+    "Instructor": ("Instructors", ["InstructorID", "InstructorName", "Expertise", "Email", "AccountName", "CreatedAt", "UpdatedAt"])
+}
+USERS_PAGE_SIZE = int(os.getenv("USERS_PAGE_SIZE", 100))
+USERS_MAX_PAGE_SIZE = 1000
+
+# Accounts allowed to list and export users, as comma-separated Role:AccountName
+# (e.g. "Instructor:alice"); empty means nobody
+ADMIN_ACCOUNTS = {
+    account.strip() for account in os.getenv("ADMIN_ACCOUNTS", "").split(",") if account.strip()
+}
+
+def require_admin(request: Request, auth_token: str = Cookie(None)):
+    """Token payload of an admin account; 401 without a token, 403 for anyone else"""
+    # Get token from header if not in cookie
+    if not auth_token:
+        auth_header = request.headers.get('Authorization')
+        if auth_header and auth_header.startswith('Bearer '):
+            auth_token = auth_header.split(' ')[1]
+        else:
+            raise HTTPException(status_code=401, detail="No authentication token provided")
+
+    user_data = decode_token(auth_token)
+    if f"{user_data.get('role')}:{user_data.get('username')}" not in ADMIN_ACCOUNTS:
+        raise HTTPException(status_code=403, detail="Only administrators can access this endpoint")
+    return user_data
+
+def user_table(role):
+    if role not in USER_COLUMNS:
         raise HTTPException(status_code=400, detail="Invalid role")
-    
-    conn = connect_db()
+    return USER_COLUMNS[role]
+
+@app.get("/api/users")
+def get_users(
+    role: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=USERS_MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, ge=0),
+    admin = Depends(require_admin),
+    conn = Depends(get_db)
+):
+    """
+    Every user of a role ordered by ID, or one page of them when limit or cursor is
+    passed (limit defaults to USERS_PAGE_SIZE then). The ID to continue after is sent
+    in the X-Next-Cursor header (absent on the last page); pass it back as ?cursor=.
+    """
+    table, columns = user_table(role)
+    key = columns[0]
+    paginate = limit is not None or cursor is not None
+    limit = limit or USERS_PAGE_SIZE
+
     try:
         with conn.cursor() as cur:
-            cur.execute(f"SELECT * FROM {table}")
-            columns = [desc[0] for desc in cur.description]
+            if paginate:
+                cur.execute(
+                    f"SELECT {', '.join(columns)} FROM {table} WHERE {key} > %s ORDER BY {key} LIMIT %s",
+                    (cursor or 0, limit + 1)
+                )
+            else:
+                cur.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY {key}")
             users = [dict(zip(columns, row)) for row in cur.fetchall()]
+            if paginate and len(users) > limit:
+                users = users[:limit]
+                response.headers["X-Next-Cursor"] = str(users[-1][key])
             return users
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
+
+@app.get("/api/users/export")
+def export_users(role: str, format: Literal["ndjson", "csv"] = "ndjson", admin = Depends(require_admin)):
+    """Every user of a role as NDJSON or CSV, streamed from a server-side cursor"""
+    table, columns = user_table(role)
+    query = f"SELECT {', '.join(columns)} FROM {table} ORDER BY {columns[0]}"
+    return export_response(query, None, columns, format, table.lower())
 
 @app.get("/api/statistics/users/count")
-async def get_user_count(role: str):
+def get_user_count(role: str, conn = Depends(get_db)):
     table_map = {
         "Learner": "Learners",
         "Instructor": "Instructors"
@@ -483,7 +587,6 @@ async def get_user_count(role: str):
     if not table:
         raise HTTPException(status_code=400, detail="Invalid role")
     
-    conn = connect_db()
     try:
         with conn.cursor() as cur:
             cur.execute(f"SELECT COUNT(*) FROM {table}")
@@ -491,5 +594,15 @@ async def get_user_count(role: str):
             return {"count": count}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
\ No newline at end of file
+
+@app.get("/api/metrics")
+async def get_metrics(admin = Depends(require_admin)):
+    """Cache, MySQL pool, blocking thread pool and SQL statement metrics for this worker (admins only)"""
+    from services.utils.api_cache import get_cache_metrics
+    return {
+        "cache": get_cache_metrics(),
+        "mysql_pool": get_mysql_pool_metrics(),
+        "mysql_async_pool": get_async_pool_metrics(),
+        "blocking_executor": get_executor_metrics(),
+        "sql": get_query_metrics()
+    }
\ No newline at end of file
@@ -0,0 +1,238 @@
+"""
+Versioned schema migrations for databases created from an older db/Database.sql.
+
+Migrations add the secondary indexes of the hot access paths, the tables added since
+(LectureVideos, CourseStats, CourseDailyStats, LectureDailyStats) and the triggers that
+maintain them, then backfill the derived tables from Enrollments and LectureResults.
+Tables and triggers are created from their definitions in db/Database.sql and
+db/trigger.sql, so both stay the single source. Applied versions are recorded in
+SchemaMigrations, and anything already present (e.g. on a fresh install from the
+current Database.sql and trigger.sql) is skipped or recreated identically, so running
+the migrations twice is harmless:
+
+    python -m services.api.db.migrations            # apply pending migrations
+    python -m services.api.db.migrations --status   # list applied / pending
+
+MySQL has no CREATE OR REPLACE TRIGGER: a trigger is replaced by DROP + CREATE, and
+writes in between miss it. Run the trigger migration with the API stopped.
+"""
+import os
+import re
+import sys
+import pymysql.cursors
+from services.config.mysql_config import get_db_connection
+
+DB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))), "db")
+SCHEMA_FILE = os.path.join(DB_DIR, "Database.sql")
+TRIGGER_FILE = os.path.join(DB_DIR, "trigger.sql")
+
+# One-time fills of the derived tables; each recomputes from the source rows, so
+# rerunning it (or running it after the triggers already counted a write) is exact
+BACKFILL_COURSE_STATS = """
+INSERT INTO CourseStats (CourseID, EnrolledCount, RatingSum, RatingCount)
+SELECT c.CourseID, COUNT(e.EnrollmentID), COALESCE(SUM(e.Rating), 0), COUNT(e.Rating)
+FROM Courses c
+LEFT JOIN Enrollments e ON e.CourseID = c.CourseID
+GROUP BY c.CourseID
+ON DUPLICATE KEY UPDATE
+    EnrolledCount = VALUES(EnrolledCount),
+    RatingSum = VALUES(RatingSum),
+    RatingCount = VALUES(RatingCount)
+"""
+
+BACKFILL_COURSE_DAILY_STATS = """
+INSERT INTO CourseDailyStats (CourseID, Day, Enrollments, RatingSum, RatingCount, Completions, ProgressSum)
+SELECT CourseID, EnrollmentDate, COUNT(*), COALESCE(SUM(Rating), 0), COUNT(Rating),
+       SUM(COALESCE(Percentage, 0) = 100), COALESCE(SUM(Percentage), 0)
+FROM Enrollments
+GROUP BY CourseID, EnrollmentDate
+ON DUPLICATE KEY UPDATE
+    Enrollments = VALUES(Enrollments),
+    RatingSum = VALUES(RatingSum),
+    RatingCount = VALUES(RatingCount),
+    Completions = VALUES(Completions),
+    ProgressSum = VALUES(ProgressSum)
+"""
+
+BACKFILL_LECTURE_DAILY_STATS = """
+INSERT INTO LectureDailyStats (LectureID, Day, CourseID, Attempts, Passes, ScoreSum)
+SELECT LectureID, Date, CourseID, COUNT(*), SUM(State = 'passed'), COALESCE(SUM(Score), 0)
+FROM LectureResults
+WHERE Date IS NOT NULL
+GROUP BY LectureID, Date, CourseID
+ON DUPLICATE KEY UPDATE
+    Attempts = VALUES(Attempts),
+    Passes = VALUES(Passes),
+    ScoreSum = VALUES(ScoreSum)
+"""
+
+# (version, description, [steps]); a step is one of
+#   ("index", table, index name, columns)
+#   ("table", table)      created from db/Database.sql unless it exists
+#   ("trigger", trigger)  (re)created from db/trigger.sql
+#   ("backfill", sql)
+MIGRATIONS = [
+    (1, "Indexes behind the CourseStats, catalog and enrollment list queries", [
+        ("index", "Enrollments", "IX_Enrollments_Course_Rating", "CourseID, Rating"),
+        ("index", "Enrollments", "IX_Enrollments_Course_Date", "CourseID, EnrollmentDate"),
+        ("index", "Courses", "IX_Courses_Difficulty", "Difficulty"),
+    ]),
+    (2, "Covering indexes for dashboard, login and lecture access paths", [
+        # Instructor course lists and dashboards, newest first
+        ("index", "Courses", "IX_Courses_Instructor_Created", "InstructorID, CreatedAt"),
+        # Learner dashboard counts (enrolled / completed) from the index alone
+        ("index", "Enrollments", "IX_Enrollments_Learner_Percentage", "LearnerID, Percentage"),
+        # Completed counts and progress distribution per course
+        ("index", "Enrollments", "IX_Enrollments_Course_Percentage", "CourseID, Percentage"),
+        # Learner dashboard passed lectures over time, with the score for averages
+        ("index", "LectureResults", "IX_LectureResults_Learner_State_Date", "LearnerID, State, Date, Score"),
+        # Latest quiz result per learner and lecture
+        ("index", "LectureResults", "IX_LectureResults_Learner_Lecture_Date", "LearnerID, LectureID, Date"),
+        # Lecture-level analytics (attempts, passes, average score)
+        ("index", "LectureResults", "IX_LectureResults_Lecture_State", "LectureID, State, Score, LearnerID"),
+        # Course completion trends
+        ("index", "LectureResults", "IX_LectureResults_Course_Date", "CourseID, Date"),
+        # Lectures.CourseID needs nothing new: its foreign key index already ends in the
+        # implicit LectureID, and AccountName is UNIQUE on Learners and Instructors
+    ]),
+    (3, "LectureVideos, CourseStats and daily dashboard rollup tables", [
+        # Filled from S3 by the video index reconciliation job
+        ("table", "LectureVideos"),
+        ("table", "CourseStats"),
+        ("table", "CourseDailyStats"),
+        ("table", "LectureDailyStats"),
+    ]),
+    (4, "Triggers maintaining CourseStats and the daily rollups, and their backfill", [
+        ("trigger", "trg_after_insert_course"),
+        ("trigger", "trg_after_insert_enrollment"),
+        ("trigger", "trg_after_delete_enrollment"),
+        ("trigger", "trg_courses_after_update_rating"),
+        ("trigger", "trg_after_update_enrollment"),
+        ("trigger", "trg_after_insert_lecture_result"),
+        ("trigger", "trg_after_update_lecture_result"),
+        ("trigger", "trg_after_delete_lecture_result"),
+        # After the triggers, so no write lands between the fill and the first trigger
+        ("backfill", BACKFILL_COURSE_STATS),
+        ("backfill", BACKFILL_COURSE_DAILY_STATS),
+        ("backfill", BACKFILL_LECTURE_DAILY_STATS),
+    ]),
+]
+
+CREATE_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS SchemaMigrations (
+  Version     INT            PRIMARY KEY,
+  Description VARCHAR(255)   NOT NULL,
+  AppliedAt   TIMESTAMP      NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+def applied_versions(cursor):
+    cursor.execute(CREATE_MIGRATIONS_TABLE)
+    cursor.execute("SELECT Version FROM SchemaMigrations")
+    return {row['Version'] for row in cursor.fetchall()}
+
+def index_exists(cursor, table, index):
+    cursor.execute("""
+        SELECT 1
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        LIMIT 1
+    """, (table, index))
+    return cursor.fetchone() is not None
+
+def table_exists(cursor, table):
+    cursor.execute("""
+        SELECT 1
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        LIMIT 1
+    """, (table,))
+    return cursor.fetchone() is not None
+
+def read_definitions(path, pattern):
+    """{name: statement} for every statement of a .sql file matching pattern (name is group 1)"""
+    with open(path, encoding="utf-8") as f:
+        return {match.group(1): match.group(0) for match in re.finditer(pattern, f.read(), re.S)}
+
+def table_definitions():
+    return read_definitions(SCHEMA_FILE, r"CREATE TABLE (\w+) \(.*?\n\)(?=;)")
+
+def trigger_definitions():
+    # Trigger bodies end with END$$ under DELIMITER $$; the client-side delimiter is dropped
+    return {
+        name: statement[:-2]
+        for name, statement in read_definitions(TRIGGER_FILE, r"CREATE TRIGGER (\w+)\b.*?END\$\$").items()
+    }
+
+def apply_migration(cursor, version, description, steps):
+    """Apply the steps of one migration and record it"""
+    tables = triggers = None
+    for step in steps:
+        kind = step[0]
+        if kind == "index":
+            _, table, index, columns = step
+            if index_exists(cursor, table, index):
+                print(f"   {table}.{index} already exists")
+                continue
+            # Online DDL: reads and writes continue while the index is built
+            cursor.execute(f"ALTER TABLE {table} ADD INDEX {index} ({columns}), ALGORITHM=INPLACE, LOCK=NONE")
+            print(f"   Added {table}.{index} ({columns})")
+        elif kind == "table":
+            table = step[1]
+            if table_exists(cursor, table):
+                print(f"   {table} already exists")
+                continue
+            tables = tables or table_definitions()
+            cursor.execute(tables[table])
+            print(f"   Created {table}")
+        elif kind == "trigger":
+            trigger = step[1]
+            triggers = triggers or trigger_definitions()
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            cursor.execute(triggers[trigger])
+            print(f"   Created trigger {trigger}")
+        elif kind == "backfill":
+            cursor.execute(step[1])
+            print(f"   Backfilled {step[1].split()[2]}: {cursor.rowcount} rows written")
+    cursor.execute(
+        "INSERT INTO SchemaMigrations (Version, Description) VALUES (%s, %s)",
+        (version, description)
+    )
+
+def migrate():
+    """Apply every pending migration in version order; returns the versions applied"""
+    conn = get_db_connection(cursorclass=pymysql.cursors.DictCursor)
+    applied = []
+    try:
+        with conn.cursor() as cursor:
+            done = applied_versions(cursor)
+            for version, description, steps in MIGRATIONS:
+                if version in done:
+                    continue
+                print(f"🗄️  Migration {version}: {description}")
+                apply_migration(cursor, version, description, steps)
+                conn.commit()
+                applied.append(version)
+        if not applied:
+            print("🗄️  Schema is up to date")
+        return applied
+    finally:
+        conn.close()
+
+def status():
+    """(version, description, applied) for every known migration"""
+    conn = get_db_connection(cursorclass=pymysql.cursors.DictCursor)
+    try:
+        with conn.cursor() as cursor:
+            done = applied_versions(cursor)
+            conn.commit()
+        return [(version, description, version in done) for version, description, _ in MIGRATIONS]
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    if "--status" in sys.argv[1:]:
+        for version, description, applied in status():
+            print(f"{version:>3}  {'applied' if applied else 'pending'}  {description}")
+    else:
+        migrate()
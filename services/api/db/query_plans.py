@@ -0,0 +1,98 @@
+"""
+EXPLAIN check for the hot queries of api_endpoints.py and auth.py.
+
+Runs EXPLAIN on each query with parameters sampled from the database and reports
+every table read with a full scan (access type ALL). Exits non-zero if any plan
+does, so it can gate a deploy after `python -m services.api.db.migrations`:
+
+    python -m services.api.db.query_plans
+
+Plans depend on table statistics: run it against a database with realistic row
+counts, since MySQL rightly prefers a scan on tables of a few dozen rows.
+"""
+import sys
+import pymysql.cursors
+from services.config.mysql_config import get_db_connection
+
+# Sample parameter values, each read with one indexed lookup
+SAMPLES = {
+    "learner_id": "SELECT LearnerID FROM Enrollments ORDER BY EnrollmentID DESC LIMIT 1",
+    "course_id": "SELECT CourseID FROM Enrollments ORDER BY EnrollmentID DESC LIMIT 1",
+    "instructor_id": "SELECT InstructorID FROM Courses ORDER BY CourseID DESC LIMIT 1",
+    "lecture_id": "SELECT LectureID FROM Lectures ORDER BY LectureID DESC LIMIT 1",
+    "learner_account": "SELECT AccountName FROM Learners ORDER BY LearnerID DESC LIMIT 1",
+    "instructor_account": "SELECT AccountName FROM Instructors ORDER BY InstructorID DESC LIMIT 1",
+}
+
+def hot_queries():
+    """(name, sql, params) for every query checked; string params name a SAMPLES value"""
+    from services.api import api_endpoints as api
+    from services.api.db.auth import LOGIN_QUERIES
+
+    catalog = []
+    for sort in ("newest", "rating", "enrolled"):
+        sql, params = api.build_catalog_query(api.CatalogPage(sort=sort))
+        catalog.append((f"catalog ({sort})", sql, params))
+
+    return catalog + [
+        ("login (learner)", LOGIN_QUERIES["Learner"], ["learner_account"]),
+        ("login (instructor)", LOGIN_QUERIES["Instructor"], ["instructor_account"]),
+        ("course aggregate", api.COURSE_AGGREGATE_QUERY, ["course_id"]),
+        ("course aggregate lectures", api.COURSE_AGGREGATE_LECTURES_QUERY, ["course_id"]),
+        ("course lectures", api.COURSE_LECTURES_QUERY, ["course_id"]),
+        ("passed lectures", api.PASSED_LECTURES_QUERY, ["learner_id", "course_id"]),
+        ("enrolled courses", api.ENROLLED_COURSES_QUERY, ["learner_id"]),
+        ("instructor courses", api.INSTRUCTOR_COURSES_QUERY, ["instructor_id"]),
+        ("learner dashboard enrolled", api.LEARNER_ENROLLED_COUNT_QUERY, ["learner_id"]),
+        ("learner dashboard completed", api.LEARNER_COMPLETED_COUNT_QUERY, ["learner_id"]),
+        ("learner dashboard passed", api.LEARNER_PASSED_COUNT_QUERY, ["learner_id"]),
+        ("learner dashboard passed lectures", api.LEARNER_PASSED_HISTORY_QUERY, ["learner_id"]),
+        ("learner dashboard courses", api.LEARNER_DASHBOARD_COURSES_QUERY, ["learner_id"]),
+        ("instructor dashboard courses", api.INSTRUCTOR_DASHBOARD_COURSES_QUERY, ["instructor_id"]),
+        ("instructor dashboard students", api.INSTRUCTOR_STUDENTS_QUERY, ["instructor_id"]),
+        ("instructor dashboard growth", api.INSTRUCTOR_STUDENT_GROWTH_QUERY, ["instructor_id"]),
+        ("instructor dashboard trends", api.INSTRUCTOR_TRENDS_QUERY, ["instructor_id"]),
+        ("course trends", api.COURSE_TRENDS_QUERY, ["course_id"]),
+        ("course completion trends", api.COURSE_COMPLETION_TRENDS_QUERY, ["course_id"]),
+        ("lecture analytics", api.LECTURE_ANALYTICS_QUERY, ["course_id"]),
+        ("course progress distribution", api.COURSE_PROGRESS_QUERY, ["course_id"]),
+        ("course enrollments", api.ENROLLMENTS_QUERY.format(keyset=""), ["course_id"]),
+        ("latest quiz result", api.LATEST_QUIZ_RESULT_QUERY, ["learner_id", "lecture_id"]),
+    ]
+
+def full_scans(plan):
+    """Tables read with access type ALL in an EXPLAIN result (derived tables like <derived2> aside)"""
+    return [
+        row['table'] for row in plan
+        if row.get('type') == 'ALL' and row.get('table') and not row['table'].startswith("<")
+    ]
+
+def check_query_plans():
+    """EXPLAIN every hot query; returns {name: [tables scanned]} for the ones that scan"""
+    conn = get_db_connection(cursorclass=pymysql.cursors.DictCursor)
+    failures = {}
+    try:
+        with conn.cursor() as cursor:
+            samples = {}
+            for name, sql in SAMPLES.items():
+                cursor.execute(sql)
+                row = cursor.fetchone()
+                samples[name] = next(iter(row.values())) if row else None
+
+            for name, sql, params in hot_queries():
+                missing = [param for param in params if isinstance(param, str) and samples[param] is None]
+                if missing:
+                    print(f"⚠️  {name}: skipped, no sample for {', '.join(missing)}")
+                    continue
+                args = [samples[param] if isinstance(param, str) else param for param in params]
+                cursor.execute("EXPLAIN " + sql, args)
+                scans = full_scans(cursor.fetchall())
+                if scans:
+                    failures[name] = scans
+                print(f"{'❌' if scans else '✅'} {name}{': full scan of ' + ', '.join(scans) if scans else ''}")
+        return failures
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    sys.exit(1 if check_query_plans() else 0)
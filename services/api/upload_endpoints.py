@@ -3,6 +3,7 @@ from fastapi.responses import JSONResponse
 import boto3
 import json
 import os
+import re
 import time
 import logging
 import asyncio
@@ -12,7 +13,9 @@ from datetime import datetime, timedelta
 from botocore.exceptions import ClientError
 from services.api.api_endpoints import connect_db
 from services.api.db.token_utils import decode_token
-from services.utils.api_cache import invalidate_cache_pattern
+from services.utils.api_cache import bump_generations
+from services.utils.cache_warmer import schedule_warm
+from services.utils.executor import run_blocking
 
 # Configure logging for upload operations
 logging.basicConfig(level=logging.INFO)
@@ -223,25 +226,13 @@ def get_user_info_from_token(request: Request, auth_token: Optional[str] = None)
 def get_lecture_video_key(course_id: int, lecture_id: int):
     return f"videos/cid{course_id}/lid{lecture_id}/vid_lecture.mp4"
 
-@router.post("/upload/init-upload")
-async def init_upload(
-    request: Request,
-    course_id: int = Form(...),
-    lecture_id: int = Form(...),
-    file_size: int = Form(...),
-    file_type: str = Form(...),
-    parts: int = Form(...),
-    auth_token: Optional[str] = None
-):
-    # Get user info from token
-    user_info = get_user_info_from_token(request, auth_token)
-    instructor_id = user_info['user_id']
-    
-    # Verify this instructor owns this course and lecture exists (with retry for newly created lectures)
-    max_retries = 3
-    retry_delay = 0.5  # 500ms delay between retries
-    
-    for attempt in range(max_retries):
+async def verify_upload_target(course_id, lecture_id, instructor_id, max_retries=3, retry_delay=0.5):
+    """
+    Check the instructor owns the course and the lecture belongs to it.
+    Retries briefly because the frontend uploads right after creating a lecture;
+    the pooled connection is returned between attempts instead of being held while sleeping.
+    """
+    def lecture_exists():
         conn = connect_db()
         try:
             with conn.cursor() as cursor:
@@ -252,32 +243,132 @@ async def init_upload(
                 if not cursor.fetchone():
                     raise HTTPException(status_code=403, detail="Not authorized to modify this course")
                 
-                # Verify lecture belongs to this course (with retry for newly created lectures)
                 cursor.execute(
                     "SELECT LectureID FROM Lectures WHERE LectureID = %s AND CourseID = %s",
                     (lecture_id, course_id)
                 )
-                lecture_result = cursor.fetchone()
-                
-                if lecture_result:
-                    # Lecture found, break out of retry loop
-                    break
-                elif attempt < max_retries - 1:
-                    # Lecture not found, but we have more retries
-                    logger.info(f"Lecture {lecture_id} not found on attempt {attempt + 1}, retrying in {retry_delay}s...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 1.5  # Exponential backoff
-                else:
-                    # Final attempt failed
-                    raise HTTPException(status_code=404, detail="Lecture not found or doesn't belong to this course")
+                return cursor.fetchone() is not None
         finally:
             conn.close()
+
+    for attempt in range(max_retries):
+        if await run_blocking(lecture_exists):
+            return
         
-        # If we reached here and haven't broken out, we need to retry
         if attempt < max_retries - 1:
-            continue
-        else:
-            break
+            logger.info(f"Lecture {lecture_id} not found on attempt {attempt + 1}, retrying in {retry_delay}s...")
+            await asyncio.sleep(retry_delay)
+            retry_delay *= 1.5  # Exponential backoff
+    
+    raise HTTPException(status_code=404, detail="Lecture not found or doesn't belong to this course")
+
+# Lecture video index (LectureVideos table), so lecture reads never probe S3
+VIDEO_KEY_PATTERN = re.compile(r"^videos/cid(\d+)/lid(\d+)/vid_lecture\.mp4$")
+VIDEO_INDEX_RECONCILE_INTERVAL = int(os.getenv('VIDEO_INDEX_RECONCILE_INTERVAL', 6 * 3600))
+
+UPSERT_LECTURE_VIDEO_QUERY = """
+INSERT INTO LectureVideos (LectureID, CourseID, S3Key, SizeBytes, ContentType, ETag)
+VALUES (%s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+    CourseID = VALUES(CourseID),
+    S3Key = VALUES(S3Key),
+    SizeBytes = VALUES(SizeBytes),
+    ContentType = COALESCE(VALUES(ContentType), ContentType),
+    ETag = VALUES(ETag)
+"""
+
+def record_lecture_video(course_id, lecture_id, key, size_bytes, content_type=None, etag=None):
+    """Add or replace a lecture's entry in the video index after an upload"""
+    conn = connect_db()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(UPSERT_LECTURE_VIDEO_QUERY, (lecture_id, course_id, key, size_bytes, content_type, etag))
+        conn.commit()
+    finally:
+        conn.close()
+
+def list_lecture_videos():
+    """List lecture videos in S3 as {lecture_id: {course_id, key, size, etag}}"""
+    videos = {}
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix="videos/"):
+        for obj in page.get('Contents', []):
+            match = VIDEO_KEY_PATTERN.match(obj['Key'])
+            if not match:
+                continue
+            videos[int(match.group(2))] = {
+                'course_id': int(match.group(1)),
+                'key': obj['Key'],
+                'size': obj.get('Size'),
+                'etag': obj.get('ETag')
+            }
+    return videos
+
+def apply_video_listing(videos):
+    """
+    Bring LectureVideos in line with an S3 listing and return the LectureIDs whose entry changed.
+    Entries written during the last hour are left alone: an upload may have finished after the listing was taken.
+    """
+    conn = connect_db()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT LectureID, S3Key, SizeBytes, ETag, UpdatedAt >= NOW() - INTERVAL 1 HOUR
+                FROM LectureVideos
+            """)
+            indexed = {row[0]: row for row in cursor.fetchall()}
+            cursor.execute("SELECT LectureID, CourseID FROM Lectures")
+            lectures = dict(cursor.fetchall())
+
+            changed = []
+            for lecture_id, video in videos.items():
+                # Skip objects left behind by deleted lectures or moved between courses
+                if lectures.get(lecture_id) != video['course_id']:
+                    continue
+                row = indexed.get(lecture_id)
+                if row and (row[4] or row[1:4] == (video['key'], video['size'], video['etag'])):
+                    continue
+                cursor.execute(
+                    UPSERT_LECTURE_VIDEO_QUERY,
+                    (lecture_id, video['course_id'], video['key'], video['size'], None, video['etag'])
+                )
+                changed.append(lecture_id)
+
+            for lecture_id, row in indexed.items():
+                if lecture_id not in videos and not row[4]:
+                    cursor.execute("DELETE FROM LectureVideos WHERE LectureID = %s", (lecture_id,))
+                    changed.append(lecture_id)
+        conn.commit()
+        return changed
+    finally:
+        conn.close()
+
+async def reconcile_video_index():
+    """Backfill and repair the video index from an S3 listing"""
+    started = time.monotonic()
+    videos = await run_blocking(list_lecture_videos)
+    changed = await run_blocking(apply_video_listing, videos)
+    if changed:
+        await bump_generations([f"lecture:{lecture_id}" for lecture_id in changed])
+    logger.info(f"Video index reconciled: {len(videos)} videos in S3, {len(changed)} entries changed in {time.monotonic() - started:.2f}s")
+    return {'videos': len(videos), 'changed': changed}
+
+@router.post("/upload/init-upload")
+async def init_upload(
+    request: Request,
+    course_id: int = Form(...),
+    lecture_id: int = Form(...),
+    file_size: int = Form(...),
+    file_type: str = Form(...),
+    parts: int = Form(...),
+    auth_token: Optional[str] = None
+):
+    # Get user info from token
+    user_info = get_user_info_from_token(request, auth_token)
+    instructor_id = user_info['user_id']
+    
+    # Verify this instructor owns this course and lecture exists (with retry for newly created lectures)
+    await verify_upload_target(course_id, lecture_id, instructor_id)
     
     # Generate S3 key for the video
     key = get_lecture_video_key(course_id, lecture_id)
@@ -502,9 +593,15 @@ async def complete_upload(
         if upload_id in active_uploads:
             del active_uploads[upload_id]
         
-        # Invalidate cache for this course
-        invalidate_cache_pattern(f"lectures:id:{lecture_id}:*")
-        invalidate_cache_pattern(f"courses:id:{course_id}:*")
+        await run_blocking(
+            record_lecture_video,
+            course_id, lecture_id, upload_info['key'], upload_info['file_size'],
+            upload_info.get('file_type'), response.get('ETag')
+        )
+        
+        # Invalidate cache for this lecture (the video URL only appears on the lecture page)
+        await bump_generations([f"lecture:{lecture_id}"])
+        schedule_warm("lecture", lecture_id)
         
         logger.info(f"Upload {upload_id} completed successfully for course {course_id}, lecture {lecture_id}")
         
@@ -716,8 +813,19 @@ async def background_cleanup():
         # Wait for 1 hour before next cleanup
         await asyncio.sleep(3600)
 
+# Periodically reconcile the video index with S3
+async def background_video_reconciliation():
+    """Reconcile the video index on startup and then every VIDEO_INDEX_RECONCILE_INTERVAL seconds"""
+    while True:
+        try:
+            await reconcile_video_index()
+        except Exception as e:
+            logger.error(f"Error reconciling video index: {str(e)}")
+        await asyncio.sleep(VIDEO_INDEX_RECONCILE_INTERVAL)
+
 # Background cleanup task storage
 cleanup_task = None
+video_reconcile_task = None
 
 # Function to start background cleanup task
 def start_cleanup_task():
@@ -728,6 +836,14 @@ def start_cleanup_task():
         logger.info("Background cleanup task started")
     return cleanup_task
 
+def start_video_reconciliation_task():
+    """Start the background video index reconciliation task"""
+    global video_reconcile_task
+    if video_reconcile_task is None or video_reconcile_task.done():
+        video_reconcile_task = asyncio.create_task(background_video_reconciliation())
+        logger.info("Video index reconciliation task started")
+    return video_reconcile_task
+
 @router.post("/courses/{course_id}/lectures/{lecture_id}/upload-video")
 async def upload_video_standard(
     request: Request,
@@ -741,46 +857,7 @@ async def upload_video_standard(
     instructor_id = user_info['user_id']
     
     # Verify this instructor owns this course and lecture exists (with retry for newly created lectures)
-    max_retries = 3
-    retry_delay = 0.5  # 500ms delay between retries
-    
-    for attempt in range(max_retries):
-        conn = connect_db()
-        try:
-            with conn.cursor() as cursor:
-                cursor.execute(
-                    "SELECT CourseID FROM Courses WHERE CourseID = %s AND InstructorID = %s",
-                    (course_id, instructor_id)
-                )
-                if not cursor.fetchone():
-                    raise HTTPException(status_code=403, detail="Not authorized to modify this course")
-                
-                # Verify lecture belongs to this course (with retry for newly created lectures)
-                cursor.execute(
-                    "SELECT LectureID FROM Lectures WHERE LectureID = %s AND CourseID = %s",
-                    (lecture_id, course_id)
-                )
-                lecture_result = cursor.fetchone()
-                
-                if lecture_result:
-                    # Lecture found, break out of retry loop
-                    break
-                elif attempt < max_retries - 1:
-                    # Lecture not found, but we have more retries
-                    logger.info(f"Lecture {lecture_id} not found on attempt {attempt + 1}, retrying in {retry_delay}s...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 1.5  # Exponential backoff
-                else:
-                    # Final attempt failed
-                    raise HTTPException(status_code=404, detail="Lecture not found or doesn't belong to this course")
-        finally:
-            conn.close()
-        
-        # If we reached here and haven't broken out, we need to retry
-        if attempt < max_retries - 1:
-            continue
-        else:
-            break
+    await verify_upload_target(course_id, lecture_id, instructor_id)
 
     try:
         # File validation
@@ -815,9 +892,12 @@ async def upload_video_standard(
         # Generate the video URL
         video_url = f"https://{BUCKET_NAME}.s3-{REGION}.amazonaws.com/{key}"
         
-        # Invalidate cache for this lecture and course
-        invalidate_cache_pattern(f"lectures:id:{lecture_id}:*")
-        invalidate_cache_pattern(f"courses:id:{course_id}:*")
+        # upload_fileobj does not return the ETag; the reconciliation job fills it in
+        await run_blocking(record_lecture_video, course_id, lecture_id, key, file_size, video.content_type)
+        
+        # Invalidate cache for this lecture (the video URL only appears on the lecture page)
+        await bump_generations([f"lecture:{lecture_id}"])
+        schedule_warm("lecture", lecture_id)
         
         logger.info(f"Standard upload completed successfully for course {course_id}, lecture {lecture_id}")
         
@@ -851,52 +931,8 @@ async def init_proxy_upload(
     user_info = get_user_info_from_token(request, auth_token)
     instructor_id = user_info['user_id']
     
-    # Validate course and lecture ownership (similar to existing init_upload)
-    max_retries = 3
-    retry_delay = 1.0  # Start with 1 second
-    
-    for attempt in range(max_retries):
-        try:
-            conn = connect_db()
-            cursor = conn.cursor()
-            
-            # Check if lecture exists and belongs to instructor
-            cursor.execute("""
-                SELECT l.LectureID, c.InstructorID 
-                FROM Lectures l 
-                JOIN Courses c ON l.CourseID = c.CourseID 
-                WHERE l.LectureID = %s AND l.CourseID = %s
-            """, (lecture_id, course_id))
-            
-            result = cursor.fetchone()
-            if result and result[1] == instructor_id:
-                break
-            else:
-                if attempt == max_retries - 1:
-                    conn.close()
-                    raise HTTPException(status_code=404, detail="Lecture not found or doesn't belong to this course")
-                else:
-                    conn.close()
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 1.5
-                    continue
-                    
-        except Exception as e:
-            if attempt < max_retries - 1:
-                if conn:
-                    conn.close()
-                await asyncio.sleep(retry_delay)
-                retry_delay *= 1.5
-                continue
-            else:
-                if conn:
-                    conn.close()
-                raise HTTPException(status_code=404, detail="Lecture not found or doesn't belong to this course")
-        finally:
-            if conn:
-                conn.close()
-        
-        break
+    # Validate course and lecture ownership
+    await verify_upload_target(course_id, lecture_id, instructor_id, retry_delay=1.0)
     
     # Generate S3 key for the video
     key = get_lecture_video_key(course_id, lecture_id)
@@ -1099,9 +1135,15 @@ async def complete_proxy_upload(
         if upload_id in active_uploads:
             del active_uploads[upload_id]
         
-        # Invalidate cache for this course
-        invalidate_cache_pattern(f"lectures:id:{lecture_id}:*")
-        invalidate_cache_pattern(f"courses:id:{course_id}:*")
+        await run_blocking(
+            record_lecture_video,
+            course_id, lecture_id, upload_info['key'], upload_info['file_size'],
+            upload_info.get('file_type'), response.get('ETag')
+        )
+        
+        # Invalidate cache for this lecture (the video URL only appears on the lecture page)
+        await bump_generations([f"lecture:{lecture_id}"])
+        schedule_warm("lecture", lecture_id)
         
         logger.info(f"Backend-proxied upload {upload_id} completed successfully for course {course_id}, lecture {lecture_id}")
         
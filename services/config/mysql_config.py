@@ -0,0 +1,502 @@
+import pymysql
+import pymysql.cursors
+from pymysql.constants import SERVER_STATUS
+import aiomysql
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from services.utils.query_stats import record_query, log_slow_query, explainable, SLOW_QUERY_EXPLAIN
+
+load_dotenv()
+
+# MySQL Configuration
+MYSQL_USER = os.getenv("MYSQL_USER")
+MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
+MYSQL_HOST = os.getenv("MYSQL_HOST", "localhost")
+MYSQL_DB = os.getenv("MYSQL_DB")
+MYSQL_PORT = int(os.getenv("MYSQL_PORT", "3306"))
+MYSQL_CONNECT_TIMEOUT = int(os.getenv("MYSQL_CONNECT_TIMEOUT", 10))
+
+# Pool settings
+MYSQL_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", 10))  # Connections open at most, idle or leased
+MYSQL_POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", 10))  # Seconds to wait for a free connection
+MYSQL_POOL_RECYCLE = float(os.getenv("MYSQL_POOL_RECYCLE", 1800))  # Replace connections older than this
+MYSQL_POOL_PRE_PING = float(os.getenv("MYSQL_POOL_PRE_PING", 30))  # Ping connections idle longer than this
+MYSQL_ASYNC_POOL_SIZE = int(os.getenv("MYSQL_ASYNC_POOL_SIZE", 10))  # aiomysql connections per worker
+MYSQL_REQUEST_CONCURRENCY = int(os.getenv("MYSQL_REQUEST_CONCURRENCY", 3))  # Async connections one request may hold at once
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes free within MYSQL_POOL_TIMEOUT"""
+
+class InstrumentedCursor:
+    """
+    pymysql cursor proxy that times execute()/executemany() into query_stats.
+    Slow reads are logged with their EXPLAIN plan, run on the same connection.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cursor.close()
+
+    def execute(self, query, args=None):
+        started = time.monotonic()
+        try:
+            return self._cursor.execute(query, args)
+        finally:
+            self._record(query, args, time.monotonic() - started)
+
+    def executemany(self, query, args):
+        started = time.monotonic()
+        try:
+            return self._cursor.executemany(query, args)
+        finally:
+            self._record(query, None, time.monotonic() - started)
+
+    def _record(self, query, args, seconds):
+        # Unbuffered cursors only know their row count once the result is read
+        unbuffered = isinstance(self._cursor, pymysql.cursors.SSCursor)
+        rows = None if unbuffered else self._cursor.rowcount
+        if record_query(query, seconds, rows):
+            plan = None
+            if SLOW_QUERY_EXPLAIN and explainable(query) and not unbuffered:
+                plan = self._explain(query, args)
+            log_slow_query(query, seconds, rows, plan)
+
+    def _explain(self, query, args):
+        try:
+            with self._cursor.connection.cursor(pymysql.cursors.DictCursor) as cursor:
+                cursor.execute("EXPLAIN " + query, args)
+                return cursor.fetchall()
+        except Exception as e:
+            return [{"error": str(e)}]
+
+class PooledConnection:
+    """
+    A leased pymysql connection. Behaves like the connection itself, but close()
+    (or leaving a with block) hands it back to the pool instead of disconnecting.
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._conn, name, value)
+
+    def cursor(self, cursor=None):
+        return InstrumentedCursor(self._conn.cursor(cursor))
+
+    def close(self):
+        # Handlers close in several places, so releasing twice is a no-op
+        if not self._released:
+            self._released = True
+            self._pool.release(self._conn)
+
+    def discard(self):
+        """Disconnect instead of returning to the pool, e.g. with an unbuffered result left half read"""
+        if not self._released:
+            self._released = True
+            self._pool.release(self._conn, reusable=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class MySQLPool:
+    """
+    Thread-safe pool of pymysql connections.
+
+    At most `size` connections exist at once; callers wait up to `timeout` seconds
+    for one to be returned. Connections older than `recycle` seconds are replaced,
+    and ones idle longer than `pre_ping` seconds are pinged (and reconnected) first.
+    Open transactions are rolled back on release so the next lease starts clean.
+    """
+
+    def __init__(self, size=10, timeout=10.0, recycle=1800.0, pre_ping=30.0, **connect_kwargs):
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.connect_kwargs = connect_kwargs
+        self._idle = deque()  # (conn, created_at, released_at)
+        self._created_at = {}  # id(conn) -> monotonic time the connection was opened
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+        # Metrics
+        self.acquisitions = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.connections_created = 0
+        self.connections_recycled = 0
+        self.ping_failures = 0
+        self.peak_in_use = 0
+
+    def _open(self):
+        conn = pymysql.connect(connect_timeout=MYSQL_CONNECT_TIMEOUT, **self.connect_kwargs)
+        self._created_at[id(conn)] = time.monotonic()
+        self.connections_created += 1
+        return conn
+
+    def _discard(self, conn):
+        self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _checkout(self):
+        """Reserve a slot; returns an idle (conn, created_at, released_at) or None to open a new one"""
+        started = time.monotonic()
+        with self._cond:
+            while not self._idle and self._in_use >= self.size:
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeoutError(f"No MySQL connection free after {self.timeout}s ({self.size} in use)")
+                self._cond.wait(remaining)
+            waited = time.monotonic() - started
+            self.acquisitions += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            self._in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self._in_use)
+            return self._idle.pop() if self._idle else None
+
+    def _return_slot(self):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def connection(self, cursorclass=pymysql.cursors.Cursor):
+        """Lease a connection; close() on the returned object gives it back"""
+        entry = self._checkout()
+        try:
+            conn = self._prepare(entry)
+        except Exception:
+            self._return_slot()
+            raise
+        conn.cursorclass = cursorclass
+        return PooledConnection(self, conn)
+
+    def _prepare(self, entry):
+        """Turn an idle entry into a usable connection, recycling or pinging it as needed"""
+        if entry is None:
+            return self._open()
+
+        conn, created_at, released_at = entry
+        now = time.monotonic()
+        if self.recycle and now - created_at >= self.recycle:
+            self.connections_recycled += 1
+            self._discard(conn)
+            return self._open()
+        if self.pre_ping and now - released_at >= self.pre_ping:
+            try:
+                conn.ping(reconnect=False)
+            except Exception as e:
+                self.ping_failures += 1
+                print(f"⚠️  Pooled MySQL connection failed pre-ping, reconnecting: {e}")
+                self._discard(conn)
+                return self._open()
+        return conn
+
+    def release(self, conn, reusable=True):
+        """Return a leased connection; broken connections are dropped instead of reused"""
+        if reusable:
+            try:
+                if conn.open and conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                    conn.rollback()
+                reusable = conn.open
+            except Exception:
+                reusable = False
+
+        with self._cond:
+            self._in_use -= 1
+            if reusable:
+                self._idle.append((conn, self._created_at.get(id(conn), time.monotonic()), time.monotonic()))
+            self._cond.notify()
+        if not reusable:
+            self._discard(conn)
+
+    def close_all(self):
+        """Disconnect idle connections (called on shutdown; leased ones return to the pool as usual)"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._cond:
+            in_use = self._in_use
+            idle = len(self._idle)
+        return {
+            "size": self.size,
+            "in_use": in_use,
+            "idle": idle,
+            "utilization": f"{(in_use / self.size) * 100:.2f}%" if self.size else "0.00%",
+            "peak_in_use": self.peak_in_use,
+            "acquisitions": self.acquisitions,
+            "avg_wait_ms": (self.wait_seconds / self.acquisitions) * 1000 if self.acquisitions else 0,
+            "max_wait_ms": self.max_wait_seconds * 1000,
+            "timeouts": self.timeouts,
+            "connections_created": self.connections_created,
+            "connections_recycled": self.connections_recycled,
+            "ping_failures": self.ping_failures,
+            "timeout_seconds": self.timeout,
+            "recycle_seconds": self.recycle
+        }
+
+# One pool per process, shared by every router
+mysql_pool = MySQLPool(
+    size=MYSQL_POOL_SIZE,
+    timeout=MYSQL_POOL_TIMEOUT,
+    recycle=MYSQL_POOL_RECYCLE,
+    pre_ping=MYSQL_POOL_PRE_PING,
+    host=MYSQL_HOST,
+    user=MYSQL_USER,
+    password=MYSQL_PASSWORD,
+    database=MYSQL_DB,
+    port=MYSQL_PORT
+)
+print(f"🗄️  MySQL pool for {MYSQL_DB} on {MYSQL_HOST}:{MYSQL_PORT} (size {MYSQL_POOL_SIZE})")
+
+def get_db_connection(cursorclass=pymysql.cursors.Cursor):
+    """Lease a pooled connection; call close() (or use a with block) to return it"""
+    return mysql_pool.connection(cursorclass)
+
+def get_db():
+    """
+    FastAPI dependency that leases one connection for the whole request:
+
+        @router.get("/things")
+        async def get_things(conn = Depends(get_db)): ...
+    """
+    conn = get_db_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+def get_mysql_pool_metrics():
+    """Pool size, utilization and wait time statistics"""
+    return mysql_pool.stats()
+
+# Asyncio pool (aiomysql) for async endpoints. It is created on first use so it
+# binds to the running event loop, and runs in autocommit mode so reads never
+# see a stale snapshot from an earlier statement on the same connection.
+_async_pool = None
+_async_pool_lock = asyncio.Lock()
+async_acquisitions = 0
+async_wait_seconds = 0.0
+async_max_wait_seconds = 0.0
+async_timeouts = 0
+
+async def get_async_db_pool():
+    """Returns the shared aiomysql pool, creating it on first use"""
+    global _async_pool
+    if _async_pool is None:
+        async with _async_pool_lock:
+            if _async_pool is None:
+                _async_pool = await aiomysql.create_pool(
+                    host=MYSQL_HOST,
+                    user=MYSQL_USER,
+                    password=MYSQL_PASSWORD,
+                    db=MYSQL_DB,
+                    port=MYSQL_PORT,
+                    minsize=1,
+                    maxsize=MYSQL_ASYNC_POOL_SIZE,
+                    pool_recycle=MYSQL_POOL_RECYCLE,
+                    connect_timeout=MYSQL_CONNECT_TIMEOUT,
+                    autocommit=True,
+                    cursorclass=aiomysql.DictCursor
+                )
+                print(f"🗄️  Async MySQL pool for {MYSQL_DB} on {MYSQL_HOST}:{MYSQL_PORT} (size {MYSQL_ASYNC_POOL_SIZE})")
+    return _async_pool
+
+class AsyncInstrumentedCursor:
+    """aiomysql counterpart of InstrumentedCursor"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    async def execute(self, query, args=None):
+        started = time.monotonic()
+        try:
+            return await self._cursor.execute(query, args)
+        finally:
+            await self._record(query, args, time.monotonic() - started)
+
+    async def executemany(self, query, args):
+        started = time.monotonic()
+        try:
+            return await self._cursor.executemany(query, args)
+        finally:
+            await self._record(query, None, time.monotonic() - started)
+
+    async def _record(self, query, args, seconds):
+        rows = self._cursor.rowcount
+        if record_query(query, seconds, rows):
+            plan = None
+            if SLOW_QUERY_EXPLAIN and explainable(query):
+                plan = await self._explain(query, args)
+            log_slow_query(query, seconds, rows, plan)
+
+    async def _explain(self, query, args):
+        try:
+            async with self._cursor.connection.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute("EXPLAIN " + query, args)
+                return await cursor.fetchall()
+        except Exception as e:
+            return [{"error": str(e)}]
+
+class _AsyncCursorContext:
+    """What AsyncInstrumentedConnection.cursor() returns: usable with async with or await"""
+
+    def __init__(self, pending):
+        self._pending = pending
+        self._cursor = None
+
+    async def _open(self):
+        return AsyncInstrumentedCursor(await self._pending)
+
+    def __await__(self):
+        return self._open().__await__()
+
+    async def __aenter__(self):
+        self._cursor = await self._open()
+        return self._cursor
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._cursor.close()
+
+class AsyncInstrumentedConnection:
+    """Leased aiomysql connection whose cursors are instrumented"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args):
+        return _AsyncCursorContext(self._conn.cursor(*args))
+
+async def _acquire_async(pool):
+    return await pool.acquire()
+
+def _release_when_acquired(pool):
+    """Done-callback for an abandoned acquire: hand the connection back if it got one"""
+    def release(task):
+        if not task.cancelled() and task.exception() is None:
+            pool.release(task.result())
+    return release
+
+@asynccontextmanager
+async def async_db_connection():
+    """
+    Lease an aiomysql connection (DictCursor, autocommit):
+
+        async with async_db_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(...)
+    """
+    global async_acquisitions, async_wait_seconds, async_max_wait_seconds, async_timeouts
+    pool = await get_async_db_pool()
+    started = time.monotonic()
+    # aiomysql's acquire has no timeout of its own. wait_for would cancel it, and an
+    # acquire that completes as the timeout fires would then leak its connection, so
+    # the acquire is shielded and an abandoned one releases whatever it gets
+    acquire = asyncio.ensure_future(_acquire_async(pool))
+    try:
+        conn = await asyncio.wait_for(asyncio.shield(acquire), MYSQL_POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        acquire.add_done_callback(_release_when_acquired(pool))
+        async_timeouts += 1
+        raise PoolTimeoutError(f"No async MySQL connection free after {MYSQL_POOL_TIMEOUT}s")
+    except asyncio.CancelledError:
+        acquire.add_done_callback(_release_when_acquired(pool))
+        raise
+    waited = time.monotonic() - started
+    async_acquisitions += 1
+    async_wait_seconds += waited
+    async_max_wait_seconds = max(async_max_wait_seconds, waited)
+    try:
+        yield AsyncInstrumentedConnection(conn)
+    finally:
+        pool.release(conn)
+
+async def fetch_all(query, args=None):
+    """Run a read query on the async pool and return every row as a dict"""
+    async with async_db_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, args)
+            return await cursor.fetchall()
+
+async def fetch_one(query, args=None):
+    """Run a read query on the async pool and return the first row as a dict, or None"""
+    async with async_db_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, args)
+            return await cursor.fetchone()
+
+async def gather_queries(*queries, limit=MYSQL_REQUEST_CONCURRENCY):
+    """
+    asyncio.gather for fetch_all / fetch_one calls of one request, running at most
+    limit of them at once so a single request cannot drain the async pool
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(query):
+        async with semaphore:
+            return await query
+
+    return await asyncio.gather(*(run(query) for query in queries))
+
+async def close_async_db_pool():
+    """Close the aiomysql pool (called from the FastAPI lifespan on shutdown)"""
+    global _async_pool
+    if _async_pool is not None:
+        _async_pool.close()
+        await _async_pool.wait_closed()
+        _async_pool = None
+
+def get_async_pool_metrics():
+    """aiomysql pool size and wait time statistics"""
+    pool = _async_pool
+    return {
+        "size": pool.size if pool else 0,
+        "free": pool.freesize if pool else 0,
+        "max_size": MYSQL_ASYNC_POOL_SIZE,
+        "acquisitions": async_acquisitions,
+        "avg_wait_ms": (async_wait_seconds / async_acquisitions) * 1000 if async_acquisitions else 0,
+        "max_wait_ms": async_max_wait_seconds * 1000,
+        "timeouts": async_timeouts
+    }
@@ -1,5 +1,9 @@
 import valkey
+import valkey.asyncio
+import valkey.exceptions
 import os
+import time
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,53 +15,204 @@ VALKEY_USER = os.getenv('VALKEY_USER', os.getenv('REDIS_USER', 'default'))
 VALKEY_PASSWORD = os.getenv('VALKEY_PASSWORD', os.getenv('REDIS_PASSWORD', None))
 VALKEY_DB = int(os.getenv('VALKEY_DB', os.getenv('REDIS_DB', 0)))
 VALKEY_TTL = int(os.getenv('VALKEY_TTL', os.getenv('REDIS_TTL', 0)))
-# Try to create Valkey client with fallback options
+VALKEY_MAX_CONNECTIONS = int(os.getenv('VALKEY_MAX_CONNECTIONS', 50))
+
+# Timeouts in seconds, so a hung Valkey fails a request quickly instead of blocking it
+VALKEY_CONNECT_TIMEOUT = float(os.getenv('VALKEY_CONNECT_TIMEOUT', 2))
+VALKEY_SOCKET_TIMEOUT = float(os.getenv('VALKEY_SOCKET_TIMEOUT', 2))
+
+# Background health checks and circuit breaker
+VALKEY_HEALTH_CHECK_INTERVAL = float(os.getenv('VALKEY_HEALTH_CHECK_INTERVAL', 5))
+VALKEY_BREAKER_FAILURE_THRESHOLD = int(os.getenv('VALKEY_BREAKER_FAILURE_THRESHOLD', 5))
+VALKEY_BREAKER_RESET_TIMEOUT = float(os.getenv('VALKEY_BREAKER_RESET_TIMEOUT', 10))
+
+class CircuitBreaker:
+    """
+    Tracks Valkey health so callers can skip the cache instead of waiting on timeouts.
+
+    closed     Valkey is healthy; requests go through.
+    open       Too many consecutive failures; requests fail fast until reset_timeout passes.
+    half_open  The health checker is probing; requests still fail fast until a probe succeeds.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self.opened_at = None
+        self.last_transition_at = None
+        self.transitions = {}  # "closed->open" -> count
+        self._lock = threading.Lock()
+
+    def _transition(self, new_state):
+        # Caller holds the lock
+        if new_state == self.state:
+            return
+        name = f"{self.state}->{new_state}"
+        self.transitions[name] = self.transitions.get(name, 0) + 1
+        self.last_transition_at = time.time()
+        print(f"🔌 Valkey circuit breaker {name}")
+        self.state = new_state
+        if new_state == self.OPEN:
+            self.opened_at = time.monotonic()
+
+    def allow_request(self):
+        return self.state == self.CLOSED
+
+    def should_probe(self):
+        """Whether the health checker should try Valkey now"""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._transition(self.HALF_OPEN)
+            return self.state != self.OPEN
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self._transition(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.total_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self._transition(self.OPEN)
+
+    def force_open(self):
+        with self._lock:
+            self._transition(self.OPEN)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "total_failures": self.total_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout": self.reset_timeout,
+                "last_transition_at": self.last_transition_at,
+                "transitions": dict(self.transitions)
+            }
+
+# Clients are created once and never replaced: the pools reconnect on their own,
+# and the circuit breaker decides whether callers should use them
 valkey_client = None
-connection_available = False
+async_valkey_client = None
+async_valkey_bytes_client = None
+breaker = CircuitBreaker(
+    failure_threshold=VALKEY_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=VALKEY_BREAKER_RESET_TIMEOUT
+)
+health_checks = 0
+health_check_failures = 0
+last_health_check_ms = None
+_health_thread = None
+
+def _connection_kwargs(decode_responses):
+    kwargs = {
+        "host": VALKEY_HOST,
+        "port": VALKEY_PORT,
+        "db": VALKEY_DB,
+        "decode_responses": decode_responses,
+        "socket_connect_timeout": VALKEY_CONNECT_TIMEOUT,
+        "socket_timeout": VALKEY_SOCKET_TIMEOUT,
+        # PING pooled connections that sat idle this long before reusing them
+        "health_check_interval": VALKEY_HEALTH_CHECK_INTERVAL,
+        "max_connections": VALKEY_MAX_CONNECTIONS
+    }
+    # Use SSL if password is provided (production)
+    if VALKEY_PASSWORD:
+        kwargs.update({
+            "username": VALKEY_USER,
+            "password": VALKEY_PASSWORD,
+            "ssl": True,
+            "ssl_cert_reqs": "required"
+        })
+    return kwargs
 
 def create_valkey_client():
-    """Create Valkey client with fallback connection options"""
-    global valkey_client, connection_available
-    
+    """Create the synchronous Valkey client and probe it once"""
+    global valkey_client
+
+    if VALKEY_PASSWORD:
+        print(f"🔐 Attempting SSL connection to Valkey at {VALKEY_HOST}:{VALKEY_PORT}")
+    else:
+        print(f"🔓 Attempting local connection to Valkey at {VALKEY_HOST}:{VALKEY_PORT}")
+
+    try:
+        valkey_client = valkey.Valkey(cache_ttl=VALKEY_TTL, **_connection_kwargs(decode_responses=True))
+    except Exception as e:
+        print(f"⚠️  Valkey client creation failed: {e}")
+        valkey_client = None
+        return
+
     try:
-        # Try with SSL if password is provided (production)
-        if VALKEY_PASSWORD:
-            print(f"🔐 Attempting SSL connection to Valkey at {VALKEY_HOST}:{VALKEY_PORT}")
-            valkey_client = valkey.Valkey(
-                host=VALKEY_HOST,
-                port=VALKEY_PORT,
-                username=VALKEY_USER,
-                password=VALKEY_PASSWORD,
-                db=VALKEY_DB,
-                decode_responses=True,
-                ssl=True,
-                ssl_cert_reqs="required",
-                cache_ttl=VALKEY_TTL
-            )
-        else:
-            # Try without SSL for local development
-            print(f"🔓 Attempting local connection to Valkey at {VALKEY_HOST}:{VALKEY_PORT}")
-            valkey_client = valkey.Valkey(
-                host=VALKEY_HOST,
-                port=VALKEY_PORT,
-                db=VALKEY_DB,
-                decode_responses=True,
-                cache_ttl=VALKEY_TTL
-            )
-        
-        # Test the connection for both SSL and non-SSL
         valkey_client.ping()
-        connection_available = True
+        breaker.record_success()
         print("✅ Successfully connected to Valkey")
-        
     except Exception as e:
+        # Keep the client; the health checker reconnects once Valkey is reachable
+        breaker.force_open()
         print(f"⚠️  Valkey connection failed: {e}")
-        print("🔄 Falling back to non-cached operations")
-        connection_available = False
-        valkey_client = None
+        print("🔄 Falling back to non-cached operations until Valkey recovers")
+
+def create_async_valkey_client():
+    """
+    Create the asyncio Valkey clients used by async request handlers.
+    All modules share these clients and their connection pools: one returns str
+    values, the other returns raw bytes for binary cache values.
+    Connections are opened lazily on the running event loop, so availability
+    is decided by the circuit breaker.
+    """
+    global async_valkey_client, async_valkey_bytes_client
+
+    try:
+        async_valkey_client = valkey.asyncio.Valkey(**_connection_kwargs(decode_responses=True))
+        async_valkey_bytes_client = valkey.asyncio.Valkey(**_connection_kwargs(decode_responses=False))
+        print("✅ Created asyncio Valkey clients")
+    except Exception as e:
+        print(f"⚠️  Asyncio Valkey client creation failed: {e}")
+        async_valkey_client = None
+        async_valkey_bytes_client = None
+
+def _health_check_loop():
+    """Ping Valkey periodically; open the breaker on failures and close it on recovery"""
+    global health_checks, health_check_failures, last_health_check_ms
 
-# Initialize the client
+    while True:
+        time.sleep(VALKEY_HEALTH_CHECK_INTERVAL)
+        if not valkey_client or not breaker.should_probe():
+            continue
+
+        health_checks += 1
+        started = time.monotonic()
+        try:
+            valkey_client.ping()
+            last_health_check_ms = (time.monotonic() - started) * 1000
+            breaker.record_success()
+        except Exception as e:
+            health_check_failures += 1
+            print(f"⚠️  Valkey health check failed: {e}")
+            breaker.record_failure()
+
+def start_health_checks():
+    """Start the background health check thread (idempotent)"""
+    global _health_thread
+    if _health_thread is not None and _health_thread.is_alive():
+        return
+    _health_thread = threading.Thread(target=_health_check_loop, name="valkey-health-check", daemon=True)
+    _health_thread.start()
+
+# Initialize the clients
 create_valkey_client()
+create_async_valkey_client()
+start_health_checks()
 
 # Maintain backward compatibility - alias for existing code
 redis_client = valkey_client
@@ -70,22 +225,49 @@ def get_valkey_client():
     """Returns the Valkey client instance"""
     return valkey_client
 
+def get_async_valkey_client():
+    """Returns the shared asyncio Valkey client (use from async code paths)"""
+    return async_valkey_client
+
+def get_async_valkey_bytes_client():
+    """Returns the shared asyncio Valkey client that leaves values as bytes (decode_responses=False)"""
+    return async_valkey_bytes_client
+
 def is_connection_available():
-    """Check if Valkey connection is available"""
-    return connection_available
+    """Check if Valkey is healthy enough to use (the circuit breaker is closed)"""
+    return breaker.allow_request()
+
+def report_failure(error):
+    """
+    Record a failed Valkey call from application code.
+    Only connection problems and timeouts count towards opening the breaker;
+    errors such as a wrong key type say nothing about Valkey's health.
+    """
+    if isinstance(error, (valkey.exceptions.ConnectionError, valkey.exceptions.TimeoutError)):
+        breaker.record_failure()
+
+def get_valkey_metrics():
+    """Circuit breaker state, transitions and health check counters"""
+    return {
+        "breaker": breaker.stats(),
+        "health_checks": health_checks,
+        "health_check_failures": health_check_failures,
+        "last_health_check_ms": last_health_check_ms,
+        "connect_timeout": VALKEY_CONNECT_TIMEOUT,
+        "socket_timeout": VALKEY_SOCKET_TIMEOUT
+    }
 
 # Test Valkey connection
 def test_connection():
-    global connection_available
     if not valkey_client:
         return False
-        
+
     try:
         valkey_client.ping()
-        connection_available = True
+        breaker.record_success()
         print("Successfully connected to Valkey")
         return True
     except Exception as e:
-        connection_available = False
+        breaker.record_failure()
         print(f"Failed to connect to Valkey: {e}")
         return False
@@ -1,139 +1,680 @@
 # Cache utility functions for API endpoints
+import os
 import json
-import zlib
-import base64
-import binascii
 import time
-from services.config.valkey_config import get_redis_client, is_connection_available
+import uuid
+import asyncio
+import math
+import random
+from collections import namedtuple
+from fastapi import HTTPException
+from services.config.valkey_config import (
+    get_redis_client, get_async_valkey_bytes_client, is_connection_available,
+    report_failure, get_valkey_metrics
+)
+from services.utils import cache_codec
+from services.utils.cache_warmer import get_warmer_metrics, reset_warmer_metrics
+from services.utils.executor import call_fetch
+from services.utils.l1_cache import L1Cache
 
+# Bytes-mode async client for request handlers, so binary cache values are never
+# str-decoded; the sync client only serves the pub/sub listener thread and the
+# *_sync invalidation helpers used from worker threads
 redis_client = get_redis_client()
+async_redis_client = get_async_valkey_bytes_client()
 
 # Cache metrics
 cache_hits = 0
+l1_hits = 0
 cache_misses = 0
 start_time = time.time()
 cached_data_size = 0
 compressed_data_size = 0
+coalesced_requests = 0
+lock_waits = 0
+lock_wait_timeouts = 0
+stale_hits = 0
+background_refreshes = 0
+refresh_errors = 0
+negative_hits = 0
+negative_stores = 0
+not_modified_hits = 0
 
 # Compression threshold in bytes (10KB)
 COMPRESSION_THRESHOLD = 10 * 1024
 
-async def get_cached_data(key, db_fetch_func, ttl=3600, use_compression=False):
+# Single-flight settings
+SINGLE_FLIGHT_LOCK_TTL_MS = 10000  # Upper bound on how long one worker may hold a rebuild lock
+SINGLE_FLIGHT_WAIT_TIMEOUT = 5.0  # How long other workers wait for the rebuild before fetching themselves
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+# Only the holder of the lock token may release it
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# In-process L1 cache settings
+L1_CACHE_ENABLED = os.getenv('L1_CACHE_ENABLED', 'true').lower() == 'true'
+L1_CACHE_MAX_ENTRIES = int(os.getenv('L1_CACHE_MAX_ENTRIES', 2000))
+L1_CACHE_MAX_BYTES = int(os.getenv('L1_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+# Tag sets: tag:{tag} holds the cache keys written under that tag
+TAG_KEY_PREFIX = "tag:"
+INVALIDATION_BATCH_SIZE = 500
+
+# Generation counters: gen:{entity} is folded into cache keys and INCR'd to invalidate
+GENERATION_KEY_PREFIX = "gen:"
+
+# Pub/sub channel used to drop L1 entries in every worker
+INVALIDATION_CHANNEL = "cache:invalidations"
+
+l1_cache = L1Cache(max_entries=L1_CACHE_MAX_ENTRIES, max_bytes=L1_CACHE_MAX_BYTES)
+_invalidation_listener = None
+
+# In-flight rebuilds in this process: {key: asyncio.Future}
+_inflight = {}
+
+# Background refreshes in this process: {key: asyncio.Task}
+_refreshing = {}
+
+# Marker for "nothing usable in cache"
+_MISSING = object()
+
+# A cached value with the content hash of its serialized form, usable as an HTTP ETag.
+# not_modified is True (and data None) when the caller's If-None-Match already matched
+# and the value was never decoded.
+CachedValue = namedtuple("CachedValue", ["data", "etag", "not_modified"], defaults=[False])
+
+def _etag_of(data):
+    """Content hash for values that did not come with one (legacy entries, cache disabled)"""
+    return cache_codec.content_hash(cache_codec.serialize(data, cache_codec.serializer_for(data)))
+
+class _CacheRequest:
+    """Everything needed to read, rebuild and store one cache key"""
+
+    def __init__(self, key, db_fetch_func, ttl, use_compression, l1_ttl, refresh_policy, soft_ttl, xfetch_beta,
+                 tags, negative_ttl):
+        self.key = key
+        self.db_fetch_func = db_fetch_func
+        self.ttl = ttl
+        self.use_compression = use_compression
+        self.l1_ttl = l1_ttl
+        self.refresh_policy = refresh_policy
+        self.soft_ttl = soft_ttl
+        self.xfetch_beta = xfetch_beta
+        self.tags = tags
+        self.negative_ttl = negative_ttl
+
+    def resolve_tags(self, data):
+        """Tags may be a list or a callable that derives them from the fetched data"""
+        if callable(self.tags):
+            return list(self.tags(data) or [])
+        return list(self.tags or [])
+
+async def _store_in_cache(request, data, delta):
+    """Serialize data and write it to Valkey, compressing large values if requested"""
+    global cached_data_size, compressed_data_size
+    key = request.key
+
+    # Serialize the data (bytes values, such as prebuilt response bodies, are stored as is)
+    serializer = cache_codec.serializer_for(data)
+    serialized_data = cache_codec.serialize(data, serializer)
+
+    # Track original size
+    original_size = len(serialized_data)
+    cached_data_size += original_size
+
+    # Decide whether to compress based on size and flag
+    codec = cache_codec.CODEC_NONE
+    if request.use_compression and original_size > COMPRESSION_THRESHOLD:
+        codec = cache_codec.DEFAULT_CODEC
+
+    # The header records the write time and rebuild cost used by the refresh policies
+    redis_value = cache_codec.encode(serialized_data, codec=codec, serializer=serializer, delta=delta)
+
+    if codec != cache_codec.CODEC_NONE:
+        # Track compressed size
+        compressed_size = len(redis_value)
+        compressed_data_size += compressed_size
+
+        # Calculate compression ratio
+        ratio = (compressed_size / original_size) * 100
+        print(f"Compressed {key}: {original_size} -> {compressed_size} bytes ({ratio:.2f}%)")
+
+    etag = cache_codec.content_hash(serialized_data)
+    tags = request.resolve_tags(data)
+    if not tags:
+        await async_redis_client.setex(key, request.ttl, redis_value)
+        return original_size, etag
+
+    # Write the value and its tag memberships in one round trip
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        pipe.setex(key, request.ttl, redis_value)
+        for tag in tags:
+            tag_key = _tag_key(tag)
+            pipe.sadd(tag_key, key)
+            # Tag sets live at least as long as their longest-lived member
+            pipe.expire(tag_key, request.ttl, nx=True)
+            pipe.expire(tag_key, request.ttl, gt=True)
+        await pipe.execute()
+    return original_size, etag
+
+def _is_not_found(error):
+    return getattr(error, "status_code", None) == 404
+
+def _not_found_error(payload):
+    return HTTPException(status_code=404, detail=payload.get("detail") or "Not found")
+
+async def _store_negative(request, error):
+    """Remember a 404 for negative_ttl seconds so repeated lookups skip the database"""
+    global negative_stores
+    try:
+        body = cache_codec.serialize({"detail": getattr(error, "detail", None)})
+        value = cache_codec.encode(body, flags=cache_codec.FLAG_NEGATIVE)
+        await async_redis_client.setex(request.key, request.negative_ttl, value)
+        negative_stores += 1
+        print(f"Cache NEGATIVE STORE: {request.key} for {request.negative_ttl}s")
+    except Exception as e:
+        report_failure(e)
+        print(f"Cache WRITE ERROR for {request.key}: {e}")
+
+async def _fetch_and_store(request):
+    """Run the database fetch and write its result to the cache; returns a CachedValue"""
+    started = time.monotonic()
+    try:
+        data = await call_fetch(request.db_fetch_func)
+    except Exception as e:
+        if request.negative_ttl and _is_not_found(e):
+            await _store_negative(request, e)
+        raise
+    delta = time.monotonic() - started
+    try:
+        size, etag = await _store_in_cache(request, data, delta)
+    except Exception as e:
+        report_failure(e)
+        print(f"Cache WRITE ERROR for {request.key}: {e}")
+        return CachedValue(data, _etag_of(data))
+    entry = CachedValue(data, etag)
+    if request.l1_ttl:
+        l1_cache.set(request.key, entry, request.l1_ttl, size)
+    return entry
+
+async def _acquire_lock(lock_key):
+    """Try to take the short rebuild lock for a key; returns the token or None"""
+    token = uuid.uuid4().hex
+    acquired = await async_redis_client.set(lock_key, token, nx=True, px=SINGLE_FLIGHT_LOCK_TTL_MS)
+    return token if acquired else None
+
+async def _release_lock(lock_key, token):
+    try:
+        await async_redis_client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+    except Exception as e:
+        print(f"Cache lock release ERROR for {lock_key}: {e}")
+
+async def _wait_for_rebuild(request, lock_key):
+    """
+    Poll Valkey until another worker has rebuilt the key.
+    Returns _MISSING if the lock disappears without a value or the wait times out.
     """
-    Get data from Valkey cache or database with optional compression
-    
+    deadline = time.monotonic() + SINGLE_FLIGHT_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+        cached_data, lock_holder = await async_redis_client.mget(request.key, lock_key)
+        if cached_data:
+            try:
+                data, meta = cache_codec.decode(cached_data)
+            except cache_codec.CacheDecodeError:
+                return _MISSING
+            if meta and meta["negative"]:
+                raise _not_found_error(data)
+            entry = CachedValue(data, (meta and meta["etag"]) or _etag_of(data))
+            if request.l1_ttl:
+                l1_cache.set(request.key, entry, request.l1_ttl, len(cached_data))
+            return entry
+        if not lock_holder:
+            # The rebuilding worker gave up (error or 404) without writing a value
+            return _MISSING
+    return _MISSING
+
+async def _rebuild_with_lock(request):
+    """Rebuild a key while holding a short Valkey lock so only one worker hits the database"""
+    global lock_waits, lock_wait_timeouts
+
+    lock_key = f"lock:{request.key}"
+    try:
+        token = await _acquire_lock(lock_key)
+    except Exception as e:
+        report_failure(e)
+        print(f"Cache lock ERROR for {lock_key}: {e}")
+        return await _fetch_and_store(request)
+
+    if token is None:
+        lock_waits += 1
+        print(f"Cache WAIT: {request.key} is being rebuilt by another worker")
+        entry = await _wait_for_rebuild(request, lock_key)
+        if entry is not _MISSING:
+            return entry
+        lock_wait_timeouts += 1
+        print(f"Cache WAIT TIMEOUT: {request.key} - fetching from database")
+        return await _fetch_and_store(request)
+
+    try:
+        return await _fetch_and_store(request)
+    finally:
+        await _release_lock(lock_key, token)
+
+async def _single_flight(request):
+    """Coalesce concurrent misses for the same key into a single rebuild"""
+    global coalesced_requests
+
+    inflight = _inflight.get(request.key)
+    if inflight is not None:
+        coalesced_requests += 1
+        print(f"Cache COALESCED: {request.key}")
+        # Shield so a cancelled waiter does not cancel the shared rebuild
+        return await asyncio.shield(inflight)
+
+    future = asyncio.get_running_loop().create_future()
+    # Mark the exception as retrieved when nobody else is waiting on it
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    _inflight[request.key] = future
+    try:
+        entry = await _rebuild_with_lock(request)
+        future.set_result(entry)
+        return entry
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        _inflight.pop(request.key, None)
+
+def _needs_refresh(request, meta):
+    """Decide whether a cached value should be refreshed in the background"""
+    if not request.refresh_policy or meta is None:
+        return False
+
+    now = time.time()
+    if request.refresh_policy == "xfetch":
+        # XFetch: refresh early with a probability that grows as expiry approaches
+        # and with how long the value takes to rebuild (delta)
+        expiry = meta["written_at"] + request.ttl
+        early = meta.get("delta", 0) * request.xfetch_beta * -math.log(1.0 - random.random())
+        return now + early >= expiry
+
+    return now - meta["written_at"] >= request.soft_ttl
+
+async def _background_refresh(request):
+    """Rebuild a stale key without making the caller wait; one worker cluster-wide does the work"""
+    global background_refreshes, refresh_errors
+
+    lock_key = f"lock:{request.key}"
+    try:
+        token = await _acquire_lock(lock_key)
+        if token is None:
+            # Another worker is already rebuilding this key
+            return
+        try:
+            await _fetch_and_store(request)
+            background_refreshes += 1
+            print(f"Cache REFRESHED: {request.key}")
+        finally:
+            await _release_lock(lock_key, token)
+    except Exception as e:
+        refresh_errors += 1
+        print(f"Cache REFRESH ERROR for {request.key}: {e}")
+    finally:
+        _refreshing.pop(request.key, None)
+
+def _schedule_refresh(request):
+    """Start at most one background refresh per key in this process"""
+    if request.key in _refreshing:
+        return
+    # Keep a reference so the task is not garbage collected mid-flight
+    _refreshing[request.key] = asyncio.get_running_loop().create_task(_background_refresh(request))
+
+def _handle_invalidation_message(message):
+    """Apply an invalidation published by any worker to this process's L1 cache"""
+    try:
+        payload = json.loads(message['data'])
+    except (TypeError, ValueError) as e:
+        print(f"Cache invalidation message ERROR: {e}")
+        return
+    if payload.get('keys'):
+        l1_cache.delete(*payload['keys'])
+    if payload.get('pattern'):
+        l1_cache.delete_pattern(payload['pattern'])
+
+def start_invalidation_listener():
+    """Subscribe to the invalidation channel in a background thread (once per process)"""
+    global _invalidation_listener
+
+    if _invalidation_listener is not None and _invalidation_listener.is_alive():
+        return
+    if not L1_CACHE_ENABLED or not is_connection_available() or not redis_client:
+        return
+
+    try:
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{INVALIDATION_CHANNEL: _handle_invalidation_message})
+        _invalidation_listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+        print(f"Subscribed to cache invalidations on {INVALIDATION_CHANNEL}")
+    except Exception as e:
+        print(f"Cache invalidation listener ERROR: {e}")
+
+def _drop_local(keys=None, pattern=None):
+    """Drop entries from this process's L1 cache"""
+    if keys:
+        l1_cache.delete(*keys)
+    if pattern:
+        l1_cache.delete_pattern(pattern)
+
+async def _publish_invalidation(keys=None, pattern=None):
+    """Drop entries from the local L1 cache and tell the other workers to do the same"""
+    _drop_local(keys, pattern)
+
+    if not L1_CACHE_ENABLED or not is_connection_available() or not async_redis_client:
+        return
+    try:
+        await async_redis_client.publish(INVALIDATION_CHANNEL, json.dumps({"keys": keys or [], "pattern": pattern}))
+    except Exception as e:
+        print(f"Cache invalidation publish ERROR: {e}")
+
+def _publish_invalidation_sync(keys=None, pattern=None):
+    """Blocking variant of _publish_invalidation for worker threads"""
+    _drop_local(keys, pattern)
+
+    if not L1_CACHE_ENABLED or not is_connection_available() or not redis_client:
+        return
+    try:
+        redis_client.publish(INVALIDATION_CHANNEL, json.dumps({"keys": keys or [], "pattern": pattern}))
+    except Exception as e:
+        print(f"Cache invalidation publish ERROR: {e}")
+
+async def get_cached_data(key, db_fetch_func, ttl=3600, use_compression=False, single_flight=True,
+                          l1_ttl=None, soft_ttl=None, refresh_policy=None, xfetch_beta=1.0, tags=None,
+                          negative_ttl=None):
+    """
+    Get data from the in-process L1 cache, Valkey, or the database with optional compression
+
     Args:
         key: Valkey key
-        db_fetch_func: Function to fetch data from database
-        ttl: Time-to-live in seconds
+        db_fetch_func: Function to fetch data from database; an async function, or a
+            blocking one, which is run on the bounded thread pool (see executor.run_blocking)
+        ttl: Time-to-live in seconds (the hard TTL when a refresh policy is used)
         use_compression: Whether to use compression for large objects
+        single_flight: Whether concurrent misses for the key share one database fetch,
+            both within this process and across workers (via a short Valkey lock)
+        l1_ttl: Seconds to keep the decoded value in the in-process L1 cache
+            (None keeps the key out of L1). Capped at ttl.
+        soft_ttl: Age in seconds after which a cached value is served stale while one
+            background refresh runs. Setting it implies refresh_policy='swr'.
+        refresh_policy: None, 'swr' (stale-while-revalidate after soft_ttl) or
+            'xfetch' (probabilistic early refresh before ttl, weighted by rebuild time)
+        xfetch_beta: XFetch aggressiveness; values above 1.0 refresh earlier
+        tags: Tags to record the key under for invalidate_tags, e.g. ["course:12"],
+            or a callable that returns them from the fetched data
+        negative_ttl: Seconds to remember a 404 raised by db_fetch_func (None disables).
+            Cached 404s are raised again as HTTPException without touching the database.
+    """
+    entry = await get_cached_entry(key, db_fetch_func, ttl=ttl, use_compression=use_compression,
+                                   single_flight=single_flight, l1_ttl=l1_ttl, soft_ttl=soft_ttl,
+                                   refresh_policy=refresh_policy, xfetch_beta=xfetch_beta, tags=tags,
+                                   negative_ttl=negative_ttl)
+    return entry.data
+
+async def get_cached_entry(key, db_fetch_func, ttl=3600, use_compression=False, single_flight=True,
+                           l1_ttl=None, soft_ttl=None, refresh_policy=None, xfetch_beta=1.0, tags=None,
+                           negative_ttl=None, if_none_match=None):
+    """
+    Like get_cached_data, but returns a CachedValue carrying the content hash (ETag) of the value.
+
+    Args:
+        if_none_match: ETags the client already holds. When the Valkey entry's hash is one of
+            them, the value is not decoded and CachedValue(None, etag, not_modified=True) is returned.
+        Other arguments are the same as get_cached_data.
     """
-    global cache_hits, cache_misses, cached_data_size, compressed_data_size
-    
+    global cache_hits, l1_hits, cache_misses, stale_hits, negative_hits, not_modified_hits
+
+    if soft_ttl and not refresh_policy:
+        refresh_policy = "swr"
+    if refresh_policy not in (None, "swr", "xfetch"):
+        raise ValueError(f"Unknown refresh policy: {refresh_policy}")
+    if refresh_policy == "swr" and not (soft_ttl and soft_ttl < ttl):
+        raise ValueError("soft_ttl must be set and lower than ttl for the 'swr' policy")
+
+    if l1_ttl and L1_CACHE_ENABLED:
+        l1_ttl = min(l1_ttl, soft_ttl or ttl)
+        start_invalidation_listener()
+        entry = l1_cache.get(key, _MISSING)
+        if entry is not _MISSING:
+            cache_hits += 1
+            l1_hits += 1
+            print(f"Cache L1 HIT: {key}")
+            return entry
+    else:
+        l1_ttl = None
+
+    request = _CacheRequest(key, db_fetch_func, ttl, use_compression, l1_ttl,
+                            refresh_policy, soft_ttl, xfetch_beta, tags, negative_ttl)
+
     # If Valkey is not available, fetch directly from database
-    if not is_connection_available() or not redis_client:
+    if not is_connection_available() or not async_redis_client:
         print(f"Cache DISABLED: {key} - fetching from database")
         cache_misses += 1
-        return await db_fetch_func()
-    
+        data = await call_fetch(db_fetch_func)
+        return CachedValue(data, _etag_of(data))
+
     try:
         # Check if data is in cache
-        cached_data = redis_client.get(key)
-        if cached_data:
-            # Increment hit counter
-            cache_hits += 1
-            print(f"Cache HIT: {key}")
-            
-            try:
-                # Check if data is compressed (starts with special prefix)
-                # Handle both string and bytes (due to decode_responses setting)
-                if ((isinstance(cached_data, bytes) and cached_data.startswith(b'COMPRESSED:')) or
-                    (isinstance(cached_data, str) and cached_data.startswith('COMPRESSED:'))):
-                    # Remove prefix and decompress
-                    if isinstance(cached_data, str):
-                        compressed_data = base64.b64decode(cached_data[11:])
-                    else:
-                        compressed_data = base64.b64decode(cached_data[11:])
-                    decompressed_data = zlib.decompress(compressed_data)
-                    return json.loads(decompressed_data.decode('utf-8'))
-                else:
-                    # Regular non-compressed data
-                    return json.loads(cached_data)
-            except (json.JSONDecodeError, zlib.error, binascii.Error) as e:
-                print(f"Cache ERROR for {key}: {e}")
-                print("Falling back to database")
-                # Delete corrupted cache entry
-                redis_client.delete(key)
-                cache_misses += 1
-                return await db_fetch_func()
-        
-        # Increment miss counter
-        cache_misses += 1
-        print(f"Cache MISS: {key}")
-        
-        # Fetch data from database
-        data = await db_fetch_func()
-        
-        # Serialize the data
-        serialized_data = json.dumps(data)
-        serialized_bytes = serialized_data.encode('utf-8')
-        
-        # Track original size
-        original_size = len(serialized_bytes)
-        cached_data_size += original_size
-        
-        # Decide whether to compress based on size and flag
-        if use_compression and original_size > COMPRESSION_THRESHOLD:
-            # Compress data
-            compressed_data = zlib.compress(serialized_bytes)
-            encoded_data = base64.b64encode(compressed_data)
-            
-            # Store with a prefix to indicate compression
-            redis_value = b'COMPRESSED:' + encoded_data
-            
-            # Track compressed size
-            compressed_size = len(redis_value)
-            compressed_data_size += compressed_size
-            
-            # Calculate compression ratio
-            ratio = (compressed_size / original_size) * 100
-            print(f"Compressed {key}: {original_size} -> {compressed_size} bytes ({ratio:.2f}%)")
-            
-            # Store compressed data in Valkey
-            redis_client.setex(key, ttl, redis_value)
-        else:
-            # Store regular data
-            redis_client.setex(key, ttl, serialized_data)
-        
-        return data
-    
+        cached_data = await async_redis_client.get(key)
     except Exception as e:
+        report_failure(e)
         print(f"Cache ERROR for {key}: {e}")
         print("Falling back to database")
         cache_misses += 1
-        return await db_fetch_func()
+        data = await call_fetch(db_fetch_func)
+        return CachedValue(data, _etag_of(data))
+
+    if cached_data:
+        try:
+            if if_none_match:
+                # Answer a conditional request from the header alone
+                meta = cache_codec.peek(cached_data)
+                if meta and not meta["negative"] and meta["etag"] in if_none_match:
+                    cache_hits += 1
+                    not_modified_hits += 1
+                    print(f"Cache NOT MODIFIED: {key}")
+                    if _needs_refresh(request, meta):
+                        stale_hits += 1
+                        _schedule_refresh(request)
+                    return CachedValue(None, meta["etag"], True)
+
+            data, meta = cache_codec.decode(cached_data)
+            # Increment hit counter
+            cache_hits += 1
+            if meta and meta["negative"]:
+                negative_hits += 1
+                print(f"Cache NEGATIVE HIT: {key}")
+                raise _not_found_error(data)
+            entry = CachedValue(data, (meta and meta["etag"]) or _etag_of(data))
+            if _needs_refresh(request, meta):
+                stale_hits += 1
+                print(f"Cache STALE HIT: {key} - refreshing in background")
+                _schedule_refresh(request)
+            else:
+                print(f"Cache HIT: {key}")
+                if l1_ttl:
+                    l1_cache.set(key, entry, l1_ttl, len(cached_data))
+            return entry
+        except cache_codec.CacheDecodeError as e:
+            print(f"Cache ERROR for {key}: {e}")
+            print("Rebuilding corrupted cache entry")
+            # Delete corrupted cache entry
+            try:
+                await async_redis_client.delete(key)
+            except Exception:
+                pass
+
+    # Increment miss counter
+    cache_misses += 1
+    print(f"Cache MISS: {key}")
 
-def invalidate_cache(keys):
+    if single_flight:
+        return await _single_flight(request)
+    return await _fetch_and_store(request)
+
+def _tag_key(tag):
+    return f"{TAG_KEY_PREFIX}{tag}"
+
+async def _unlink_in_batches(keys):
+    """UNLINK keys in pipelined batches so large tags never block Valkey"""
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        for i in range(0, len(keys), INVALIDATION_BATCH_SIZE):
+            pipe.unlink(*keys[i:i + INVALIDATION_BATCH_SIZE])
+        await pipe.execute()
+
+async def invalidate_tags(tags):
+    """
+    Delete every cache key recorded under the given tags, e.g. ["course:12", "learner:7"]
+    Only the tagged keys are touched, so the cost does not grow with the keyspace.
+    """
+    tags = list(tags or [])
+    if not tags:
+        return
+
+    if not is_connection_available() or not async_redis_client:
+        print("Cache DISABLED: Cannot invalidate cache tags")
+        return
+
+    try:
+        # Read and drop each tag set atomically so keys added afterwards start a fresh set
+        async with async_redis_client.pipeline(transaction=True) as pipe:
+            for tag in tags:
+                pipe.smembers(_tag_key(tag))
+            pipe.unlink(*[_tag_key(tag) for tag in tags])
+            results = await pipe.execute()
+
+        keys = set()
+        for members in results[:-1]:
+            keys.update(member.decode('utf-8') if isinstance(member, bytes) else member for member in members)
+        keys = sorted(keys)
+
+        print(f"Invalidating tags {tags}: {len(keys)} keys")
+        if keys:
+            await _publish_invalidation(keys=keys)
+            await _unlink_in_batches(keys)
+    except Exception as e:
+        report_failure(e)
+        print(f"Cache tag invalidation ERROR: {e}")
+
+async def get_generations(*entities):
+    """
+    Fetch the generation counters for entities such as "course:12" in one MGET.
+    Returns {entity: int}; missing counters (and an unavailable Valkey) read as 0.
+    """
+    generations = {entity: 0 for entity in entities}
+    if not entities or not is_connection_available() or not async_redis_client:
+        return generations
+
+    try:
+        values = await async_redis_client.mget([f"{GENERATION_KEY_PREFIX}{entity}" for entity in entities])
+        for entity, value in zip(entities, values):
+            if value is not None:
+                generations[entity] = int(value)
+    except Exception as e:
+        report_failure(e)
+        print(f"Cache generation read ERROR: {e}")
+    return generations
+
+async def bump_generations(entities):
+    """
+    Invalidate every key built from these entities' generations with one INCR each.
+    Entries under the old generation are never read again and age out by TTL.
+    """
+    entities = list(entities or [])
+    if not entities:
+        return
+
+    if not is_connection_available() or not async_redis_client:
+        print("Cache DISABLED: Cannot bump cache generations")
+        return
+
+    try:
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            for entity in entities:
+                pipe.incr(f"{GENERATION_KEY_PREFIX}{entity}")
+            await pipe.execute()
+        print(f"Bumped cache generations: {entities}")
+    except Exception as e:
+        report_failure(e)
+        print(f"Cache generation bump ERROR: {e}")
+
+async def invalidate_cache(keys):
     """Delete multiple cache keys"""
-    if not is_connection_available() or not redis_client:
+    if keys:
+        await _publish_invalidation(keys=list(keys))
+
+    if not is_connection_available() or not async_redis_client:
         print("Cache DISABLED: Cannot invalidate cache keys")
         return
-    
+
     try:
         if keys:
-            redis_client.delete(*keys)
+            await async_redis_client.delete(*keys)
     except Exception as e:
         print(f"Cache invalidation ERROR: {e}")
 
-def invalidate_cache_pattern(pattern):
+async def invalidate_cache_pattern(pattern):
     """
     Delete all cache keys matching a pattern
     For example: 'user:profile:*' to delete all user profiles
     """
+    await _publish_invalidation(pattern=pattern)
+
+    if not is_connection_available() or not async_redis_client:
+        print("Cache DISABLED: Cannot invalidate cache pattern")
+        return
+
+    try:
+        cursor = 0
+        while True:
+            cursor, keys = await async_redis_client.scan(cursor, match=pattern, count=100)
+            if keys:
+                await async_redis_client.delete(*keys)
+            if cursor == 0:
+                break
+    except Exception as e:
+        print(f"Cache pattern invalidation ERROR: {e}")
+
+def invalidate_cache_sync(keys):
+    """Blocking variant of invalidate_cache for code running in worker threads"""
+    if keys:
+        _publish_invalidation_sync(keys=list(keys))
+
+    if not is_connection_available() or not redis_client:
+        print("Cache DISABLED: Cannot invalidate cache keys")
+        return
+
+    try:
+        if keys:
+            redis_client.delete(*keys)
+    except Exception as e:
+        print(f"Cache invalidation ERROR: {e}")
+
+def invalidate_cache_pattern_sync(pattern):
+    """Blocking variant of invalidate_cache_pattern for code running in worker threads"""
+    _publish_invalidation_sync(pattern=pattern)
+
     if not is_connection_available() or not redis_client:
         print("Cache DISABLED: Cannot invalidate cache pattern")
         return
-    
+
     try:
         cursor = 0
         while True:
@@ -147,36 +688,88 @@ def invalidate_cache_pattern(pattern):
 
 def get_cache_metrics():
     """Get cache hit/miss metrics and efficiency statistics"""
-    global cache_hits, cache_misses, start_time, cached_data_size, compressed_data_size
-    
+    global cache_hits, l1_hits, cache_misses, start_time, cached_data_size, compressed_data_size
+
     total_requests = cache_hits + cache_misses
+    l2_hits = cache_hits - l1_hits
     hit_ratio = 0
+    l1_hit_ratio = 0
     if total_requests > 0:
         hit_ratio = (cache_hits / total_requests) * 100
-    
+        l1_hit_ratio = (l1_hits / total_requests) * 100
+
+    # L2 ratio is measured over the lookups that actually reached Valkey
+    l2_requests = total_requests - l1_hits
+    l2_hit_ratio = 0
+    if l2_requests > 0:
+        l2_hit_ratio = (l2_hits / l2_requests) * 100
+
     uptime = time.time() - start_time
-    
+
     compression_savings = 0
     if cached_data_size > 0 and compressed_data_size > 0:
         compression_savings = 100 - ((compressed_data_size / cached_data_size) * 100)
-    
+
     return {
         "hits": cache_hits,
         "misses": cache_misses,
         "total_requests": total_requests,
         "hit_ratio": f"{hit_ratio:.2f}%",
+        "l1": {
+            "enabled": L1_CACHE_ENABLED,
+            "hits": l1_hits,
+            "hit_ratio": f"{l1_hit_ratio:.2f}%",
+            **l1_cache.stats()
+        },
+        "l2": {
+            "hits": l2_hits,
+            "requests": l2_requests,
+            "hit_ratio": f"{l2_hit_ratio:.2f}%"
+        },
         "uptime_seconds": uptime,
         "cached_data_size_kb": cached_data_size / 1024,
         "compressed_data_size_kb": compressed_data_size / 1024,
-        "compression_savings": f"{compression_savings:.2f}%"
+        "compression_savings": f"{compression_savings:.2f}%",
+        "single_flight": {
+            "coalesced_requests": coalesced_requests,
+            "lock_waits": lock_waits,
+            "lock_wait_timeouts": lock_wait_timeouts,
+            "inflight_keys": len(_inflight)
+        },
+        "refresh": {
+            "stale_hits": stale_hits,
+            "background_refreshes": background_refreshes,
+            "refresh_errors": refresh_errors,
+            "refreshing_keys": len(_refreshing)
+        },
+        "negative": {
+            "hits": negative_hits,
+            "stores": negative_stores
+        },
+        "not_modified_hits": not_modified_hits,
+        "warmer": get_warmer_metrics(),
+        "valkey": get_valkey_metrics()
     }
 
 def reset_cache_metrics():
     """Reset all cache metrics counters"""
-    global cache_hits, cache_misses, start_time, cached_data_size, compressed_data_size
+    global cache_hits, l1_hits, cache_misses, start_time, cached_data_size, compressed_data_size
+    global coalesced_requests, lock_waits, lock_wait_timeouts
+    global stale_hits, background_refreshes, refresh_errors, negative_hits, negative_stores, not_modified_hits
     cache_hits = 0
+    l1_hits = 0
     cache_misses = 0
     start_time = time.time()
     cached_data_size = 0
     compressed_data_size = 0
+    coalesced_requests = 0
+    lock_waits = 0
+    lock_wait_timeouts = 0
+    stale_hits = 0
+    background_refreshes = 0
+    refresh_errors = 0
+    negative_hits = 0
+    negative_stores = 0
+    not_modified_hits = 0
+    reset_warmer_metrics()
     return {"message": "Cache metrics reset"}
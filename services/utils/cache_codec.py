@@ -0,0 +1,231 @@
+# Binary value format for API cache entries
+import os
+import json
+import zlib
+import time
+import base64
+import struct
+import hashlib
+
+# Optional faster serializers and codecs; fall back to json/zlib when not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+# Envelope layout (network byte order, 26 byte header followed by the body):
+#
+#     magic       2s  b'TC'
+#     version     B   FORMAT_VERSION
+#     codec       B   CODEC_* id used to compress the body
+#     serializer  B   SERIALIZER_* id used to encode the data
+#     flags       B   FLAG_* bits
+#     written_at  d   unix time the entry was written
+#     delta       f   seconds the database fetch took (used by XFetch)
+#     digest      8s  BLAKE2b digest of the serialized body (used as the HTTP ETag)
+#
+# Version 1 entries have the same layout without the digest.
+MAGIC = b'TC'
+FORMAT_VERSION = 2
+HEADER = struct.Struct("!2sBBBBdf8s")
+HEADER_V1 = struct.Struct("!2sBBBBdf")
+DIGEST_SIZE = 8
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODEC_LZ4 = 3
+
+# The entry records a "not found" result instead of data (negative caching)
+FLAG_NEGATIVE = 0x01
+
+SERIALIZER_JSON = 0
+SERIALIZER_ORJSON = 1
+SERIALIZER_MSGPACK = 2
+# Data that is already bytes (e.g. a final HTTP response body) is stored as is
+SERIALIZER_RAW = 3
+
+CODEC_NAMES = {"none": CODEC_NONE, "zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD, "lz4": CODEC_LZ4}
+SERIALIZER_NAMES = {"json": SERIALIZER_JSON, "orjson": SERIALIZER_ORJSON, "msgpack": SERIALIZER_MSGPACK}
+
+# Prefix of the previous base64(zlib(json)) format, still read during migration
+LEGACY_COMPRESSED_PREFIX = b'COMPRESSED:'
+# Key marking the JSON metadata wrapper used before the binary header existed
+LEGACY_META_MARKER = "__cache_meta__"
+
+class CacheDecodeError(ValueError):
+    """Raised when a cached value cannot be decoded"""
+
+def _codec_available(codec):
+    if codec == CODEC_ZSTD:
+        return zstandard is not None
+    if codec == CODEC_LZ4:
+        return lz4 is not None
+    return codec in (CODEC_NONE, CODEC_ZLIB)
+
+def _serializer_available(serializer):
+    if serializer == SERIALIZER_ORJSON:
+        return orjson is not None
+    if serializer == SERIALIZER_MSGPACK:
+        return msgpack is not None
+    return serializer == SERIALIZER_JSON
+
+def _configured_codec():
+    name = os.getenv('CACHE_CODEC', 'zlib').lower()
+    codec = CODEC_NAMES.get(name)
+    if codec is None or not _codec_available(codec):
+        print(f"⚠️  Cache codec '{name}' is not available, using zlib")
+        return CODEC_ZLIB
+    return codec
+
+def _configured_serializer():
+    default = 'orjson' if orjson is not None else 'json'
+    name = os.getenv('CACHE_SERIALIZER', default).lower()
+    serializer = SERIALIZER_NAMES.get(name)
+    if serializer is None or not _serializer_available(serializer):
+        print(f"⚠️  Cache serializer '{name}' is not available, using json")
+        return SERIALIZER_JSON
+    return serializer
+
+# Codec used for compressed writes and serializer used for all writes
+DEFAULT_CODEC = _configured_codec()
+DEFAULT_SERIALIZER = _configured_serializer()
+
+if zstandard is not None:
+    _zstd_compressor = zstandard.ZstdCompressor(level=3)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+
+def content_hash(serialized):
+    """Hex digest identifying a serialized body; equal bodies always hash equal"""
+    return hashlib.blake2b(serialized, digest_size=DIGEST_SIZE).hexdigest()
+
+def serializer_for(data):
+    """SERIALIZER_RAW for bytes values, the configured serializer for everything else"""
+    if isinstance(data, (bytes, bytearray)):
+        return SERIALIZER_RAW
+    return DEFAULT_SERIALIZER
+
+def serialize(data, serializer=DEFAULT_SERIALIZER):
+    if serializer == SERIALIZER_RAW:
+        return bytes(data)
+    if serializer == SERIALIZER_ORJSON:
+        # Match json.dumps, which turns int dict keys into strings
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    if serializer == SERIALIZER_MSGPACK:
+        return msgpack.packb(data, use_bin_type=True)
+    return json.dumps(data).encode('utf-8')
+
+def deserialize(body, serializer):
+    """Deserialize a bytes-like body; orjson and msgpack read the memoryview without copying"""
+    if serializer == SERIALIZER_ORJSON:
+        return orjson.loads(body)
+    if serializer == SERIALIZER_MSGPACK:
+        return msgpack.unpackb(body, raw=False)
+    if serializer == SERIALIZER_JSON:
+        return json.loads(bytes(body))
+    if serializer == SERIALIZER_RAW:
+        return bytes(body)
+    raise CacheDecodeError(f"Unknown serializer id {serializer}")
+
+def compress(body, codec):
+    if codec == CODEC_ZLIB:
+        return zlib.compress(body)
+    if codec == CODEC_ZSTD:
+        return _zstd_compressor.compress(body)
+    if codec == CODEC_LZ4:
+        return lz4.frame.compress(body)
+    return body
+
+def decompress(body, codec):
+    if codec == CODEC_NONE:
+        return body
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(body)
+    if codec == CODEC_ZSTD and zstandard is not None:
+        return _zstd_decompressor.decompress(body)
+    if codec == CODEC_LZ4 and lz4 is not None:
+        return lz4.frame.decompress(body)
+    raise CacheDecodeError(f"Codec id {codec} is not available in this process")
+
+def encode(serialized, codec=CODEC_NONE, serializer=DEFAULT_SERIALIZER, delta=0.0, written_at=None, flags=0):
+    """Build an envelope around an already serialized body, compressing it with codec"""
+    if written_at is None:
+        written_at = time.time()
+    digest = hashlib.blake2b(serialized, digest_size=DIGEST_SIZE).digest()
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, codec, serializer, flags, written_at, delta, digest)
+    return header + compress(serialized, codec)
+
+def _read_header(view):
+    """Unpack an envelope header; returns (codec, serializer, meta, body offset) or None for legacy entries"""
+    if len(view) < HEADER_V1.size or view[:2] != MAGIC:
+        return None
+    version = view[2]
+    if version == FORMAT_VERSION and len(view) >= HEADER.size:
+        magic, version, codec, serializer, flags, written_at, delta, digest = HEADER.unpack_from(view)
+        etag, offset = digest.hex(), HEADER.size
+    elif version == 1:
+        magic, version, codec, serializer, flags, written_at, delta = HEADER_V1.unpack_from(view)
+        etag, offset = None, HEADER_V1.size
+    else:
+        raise CacheDecodeError(f"Unsupported cache format version {version}")
+    meta = {"written_at": written_at, "delta": delta, "negative": bool(flags & FLAG_NEGATIVE), "etag": etag}
+    return codec, serializer, meta, offset
+
+def peek(raw):
+    """
+    Read only the envelope header, without decompressing or deserializing the body.
+    Returns the same meta as decode, or None for legacy entries.
+    """
+    try:
+        header = _read_header(memoryview(raw))
+    except CacheDecodeError:
+        raise
+    except Exception as e:
+        raise CacheDecodeError(str(e)) from e
+    return header[2] if header else None
+
+def decode(raw):
+    """
+    Decode a value read from a bytes-mode connection.
+    Returns (data, meta) where meta is {"written_at", "delta", "negative", "etag"} or None for legacy
+    entries; etag is None for entries written before the digest was added.
+    """
+    try:
+        view = memoryview(raw)
+        header = _read_header(view)
+        if header:
+            codec, serializer, meta, offset = header
+            body = decompress(view[offset:], codec)
+            return deserialize(body, serializer), meta
+        return _decode_legacy(bytes(raw))
+    except CacheDecodeError:
+        raise
+    except Exception as e:
+        # Each serializer and codec library raises its own error types
+        raise CacheDecodeError(str(e)) from e
+
+def _decode_legacy(raw):
+    """Read entries written before the binary envelope: COMPRESSED:base64(zlib(json)) or plain JSON"""
+    if raw.startswith(LEGACY_COMPRESSED_PREFIX):
+        payload = json.loads(zlib.decompress(base64.b64decode(raw[len(LEGACY_COMPRESSED_PREFIX):])))
+    else:
+        payload = json.loads(raw)
+
+    if isinstance(payload, dict) and LEGACY_META_MARKER in payload:
+        return payload["data"], {"written_at": payload["written_at"], "delta": payload.get("delta", 0), "negative": False, "etag": None}
+    return payload, None
@@ -1,9 +1,9 @@
 import json
 from functools import wraps
-from services.config.valkey_config import get_redis_client, is_connection_available
+from services.config.valkey_config import get_async_valkey_client, is_connection_available, report_failure
 import time
 
-redis_client = get_redis_client()
+redis_client = get_async_valkey_client()
 
 def cache_data(key_prefix, expire_time=3600):
     """
@@ -26,7 +26,7 @@ def cache_data(key_prefix, expire_time=3600):
                 cache_key = f"{key_prefix}:{str(args)}:{str(kwargs)}"
                 
                 # Try to get the cached result
-                cached_result = redis_client.get(cache_key)
+                cached_result = await redis_client.get(cache_key)
                 if cached_result:
                     print(f"Cache HIT: {cache_key}")
                     return json.loads(cached_result)
@@ -36,7 +36,7 @@ def cache_data(key_prefix, expire_time=3600):
                 result = await func(*args, **kwargs)
                 
                 # Cache the result
-                redis_client.setex(
+                await redis_client.setex(
                     cache_key,
                     expire_time,
                     json.dumps(result)
@@ -44,13 +44,14 @@ def cache_data(key_prefix, expire_time=3600):
                 
                 return result
             except Exception as e:
+                report_failure(e)
                 print(f"Cache ERROR for {key_prefix}: {e}")
                 print("Falling back to direct function execution")
                 return await func(*args, **kwargs)
         return wrapper
     return decorator
 
-def clear_cache(pattern="*"):
+async def clear_cache(pattern="*"):
     """
     Clear cache entries matching the given pattern
     """
@@ -61,9 +62,9 @@ def clear_cache(pattern="*"):
     try:
         cursor = 0
         while True:
-            cursor, keys = redis_client.scan(cursor, match=pattern)
+            cursor, keys = await redis_client.scan(cursor, match=pattern)
             if keys:
-                redis_client.delete(*keys)
+                await redis_client.delete(*keys)
             if cursor == 0:
                 break
         print(f"Cache cleared for pattern: {pattern}")
@@ -85,7 +86,7 @@ def cache_with_fallback(func):
         cache_key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
         try:
             # Try to get from cache
-            cached_result = redis_client.get(cache_key)
+            cached_result = await redis_client.get(cache_key)
             if cached_result:
                 print(f"Cache HIT: {cache_key}")
                 return json.loads(cached_result)
@@ -95,7 +96,7 @@ def cache_with_fallback(func):
             result = await func(*args, **kwargs)
             
             # Cache the result
-            redis_client.setex(
+            await redis_client.setex(
                 cache_key,
                 3600,  # 1 hour default
                 json.dumps(result)
@@ -103,6 +104,7 @@ def cache_with_fallback(func):
             return result
         except Exception as e:
             # If Valkey fails, execute function directly
+            report_failure(e)
             print(f"Cache error for {func.__name__}: {str(e)}, executing function directly")
             return await func(*args, **kwargs)
     return wrapper
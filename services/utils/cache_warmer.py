@@ -0,0 +1,137 @@
+# Cache warming and predictive prefetch for the hottest API cache keys
+import os
+import time
+import asyncio
+from services.config.valkey_config import get_async_valkey_client, is_connection_available
+
+async_redis_client = get_async_valkey_client()
+
+# Warmer settings
+WARM_CONCURRENCY = int(os.getenv('CACHE_WARM_CONCURRENCY', 4))  # Rebuilds allowed to hit MySQL at once
+WARM_TOP_COURSES = int(os.getenv('CACHE_WARM_TOP_COURSES', 20))  # Most-viewed courses warmed on startup
+WARM_ON_STARTUP = os.getenv('CACHE_WARM_ON_STARTUP', 'true').lower() == 'true'
+
+# Sorted set of CourseID -> view count, used to pick the courses worth warming
+COURSE_VIEWS_KEY = "stats:course_views"
+
+# Warm functions registered by the API layer: {name: async callable(*args)}
+_warmers = {}
+
+# Background warm tasks in this process: {(name, args): asyncio.Task}
+_pending = {}
+
+_semaphore = asyncio.Semaphore(WARM_CONCURRENCY)
+_startup_task = None
+
+# Warmer metrics
+keys_warmed = 0
+warm_errors = 0
+warm_seconds = 0.0
+prefetches = 0
+skipped_duplicates = 0
+last_startup_warm = None
+
+def register_warmer(name, func):
+    """
+    Register an async function that loads one kind of cache entry, e.g.
+    register_warmer("course", get_course_aggregate). Calling it must populate the cache.
+    """
+    _warmers[name] = func
+
+async def record_course_view(course_id):
+    """Count a course view so the startup warmer knows which courses are hot"""
+    if not is_connection_available() or not async_redis_client:
+        return
+    try:
+        await async_redis_client.zincrby(COURSE_VIEWS_KEY, 1, course_id)
+    except Exception as e:
+        print(f"Course view tracking ERROR for course {course_id}: {e}")
+
+async def top_viewed_courses(limit=WARM_TOP_COURSES):
+    """CourseIDs with the most recorded views, most viewed first"""
+    if limit <= 0 or not is_connection_available() or not async_redis_client:
+        return []
+    try:
+        return [int(course_id) for course_id in await async_redis_client.zrevrange(COURSE_VIEWS_KEY, 0, limit - 1)]
+    except Exception as e:
+        print(f"Course view ranking ERROR: {e}")
+        return []
+
+async def warm(name, *args):
+    """Load one cache entry through its registered warmer, within the concurrency budget"""
+    global keys_warmed, warm_errors, warm_seconds
+
+    func = _warmers.get(name)
+    if func is None:
+        print(f"Cache WARM skipped: no warmer registered for {name}")
+        return
+
+    async with _semaphore:
+        started = time.monotonic()
+        try:
+            await func(*args)
+            keys_warmed += 1
+        except Exception as e:
+            # A 404 for a deleted course or lecture is not worth more than a log line
+            warm_errors += 1
+            print(f"Cache WARM ERROR for {name}{args}: {e}")
+        finally:
+            warm_seconds += time.monotonic() - started
+
+def schedule_warm(name, *args, prefetch=False):
+    """Warm an entry in the background without making the caller wait"""
+    global prefetches, skipped_duplicates
+
+    job = (name, args)
+    if job in _pending:
+        skipped_duplicates += 1
+        return
+    if prefetch:
+        prefetches += 1
+
+    task = asyncio.get_running_loop().create_task(warm(name, *args))
+    # Keep a reference so the task is not garbage collected mid-flight
+    _pending[job] = task
+    task.add_done_callback(lambda _: _pending.pop(job, None))
+
+async def warm_startup():
+    """Rebuild the catalog and the most-viewed course previews"""
+    global last_startup_warm
+
+    started = time.monotonic()
+    await warm("catalog")
+    course_ids = await top_viewed_courses()
+    await asyncio.gather(*(warm("course", course_id) for course_id in course_ids))
+    last_startup_warm = time.time()
+    print(f"Cache warm-up finished: catalog and {len(course_ids)} courses in {time.monotonic() - started:.2f}s")
+
+def start_cache_warmer():
+    """Start the startup warm-up in the background (called from the FastAPI lifespan)"""
+    global _startup_task
+    if not WARM_ON_STARTUP:
+        return None
+    if _startup_task is None or _startup_task.done():
+        _startup_task = asyncio.create_task(warm_startup())
+    return _startup_task
+
+def get_warmer_metrics():
+    """Get cache warmer counters"""
+    return {
+        "keys_warmed": keys_warmed,
+        "warm_errors": warm_errors,
+        "warm_seconds": warm_seconds,
+        "prefetches": prefetches,
+        "skipped_duplicates": skipped_duplicates,
+        "pending": len(_pending),
+        "concurrency": WARM_CONCURRENCY,
+        "last_startup_warm": last_startup_warm
+    }
+
+def reset_warmer_metrics():
+    """Reset cache warmer counters"""
+    global keys_warmed, warm_errors, warm_seconds, prefetches, skipped_duplicates
+    keys_warmed = 0
+    warm_errors = 0
+    warm_seconds = 0.0
+    prefetches = 0
+    skipped_duplicates = 0
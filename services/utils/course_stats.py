@@ -0,0 +1,111 @@
+# Repair job for the CourseStats table (per-course enrollment and rating totals)
+import os
+import time
+import asyncio
+import pymysql.cursors
+from services.config.mysql_config import get_db_connection
+from services.utils.api_cache import bump_generations, invalidate_tags
+from services.utils.executor import run_blocking
+from services.utils.scheduled_jobs import run_periodically
+
+# The Enrollments triggers keep CourseStats current; the repair only catches drift
+# (rows written with triggers disabled, manual fixes, courses created before the table)
+# and runs in one worker per interval across the cluster
+COURSE_STATS_REPAIR_INTERVAL = int(os.getenv('COURSE_STATS_REPAIR_INTERVAL', 24 * 3600))
+
+# Stats recomputed from Enrollments next to the stored values, one row per course
+DRIFT_QUERY = """
+SELECT
+    c.CourseID,
+    c.InstructorID,
+    COUNT(e.EnrollmentID) AS EnrolledCount,
+    COALESCE(SUM(e.Rating), 0) AS RatingSum,
+    COUNT(e.Rating) AS RatingCount,
+    s.EnrolledCount AS StoredEnrolledCount,
+    s.RatingSum AS StoredRatingSum,
+    s.RatingCount AS StoredRatingCount
+FROM Courses c
+LEFT JOIN Enrollments e ON e.CourseID = c.CourseID
+LEFT JOIN CourseStats s ON s.CourseID = c.CourseID
+GROUP BY c.CourseID, c.InstructorID, s.EnrolledCount, s.RatingSum, s.RatingCount
+"""
+
+# Recomputes inside the write itself, so enrollments made since DRIFT_QUERY are not lost
+REPAIR_QUERY = """
+INSERT INTO CourseStats (CourseID, EnrolledCount, RatingSum, RatingCount)
+SELECT c.CourseID, COUNT(e.EnrollmentID), COALESCE(SUM(e.Rating), 0), COUNT(e.Rating)
+FROM Courses c
+LEFT JOIN Enrollments e ON e.CourseID = c.CourseID
+WHERE c.CourseID IN ({ids})
+GROUP BY c.CourseID
+ON DUPLICATE KEY UPDATE
+    EnrolledCount = VALUES(EnrolledCount),
+    RatingSum = VALUES(RatingSum),
+    RatingCount = VALUES(RatingCount)
+"""
+
+SYNC_AVERAGE_RATING_QUERY = """
+UPDATE Courses c
+JOIN CourseStats s ON s.CourseID = c.CourseID
+SET c.AverageRating = IF(s.RatingCount > 0, ROUND(s.RatingSum / s.RatingCount, 2), 0)
+WHERE c.CourseID IN ({ids})
+"""
+
+# Result of the last repair run by this worker
+last_repair = None
+
+def find_drifted_courses(cursor):
+    """Courses whose stored stats differ from Enrollments, as {CourseID: InstructorID}"""
+    cursor.execute(DRIFT_QUERY)
+    drifted = {}
+    for row in cursor.fetchall():
+        stored = (row['StoredEnrolledCount'], row['StoredRatingSum'], row['StoredRatingCount'])
+        actual = (row['EnrolledCount'], row['RatingSum'], row['RatingCount'])
+        if stored != actual:
+            drifted[row['CourseID']] = row['InstructorID']
+    return drifted
+
+def repair_course_stats():
+    """Recompute CourseStats from Enrollments; returns {CourseID: InstructorID} for the rows fixed"""
+    conn = get_db_connection(cursorclass=pymysql.cursors.DictCursor)
+    try:
+        with conn.cursor() as cursor:
+            drifted = find_drifted_courses(cursor)
+            if drifted:
+                ids = list(drifted)
+                placeholders = ", ".join(["%s"] * len(ids))
+                cursor.execute(REPAIR_QUERY.format(ids=placeholders), ids)
+                cursor.execute(SYNC_AVERAGE_RATING_QUERY.format(ids=placeholders), ids)
+            conn.commit()
+            return drifted
+    finally:
+        conn.close()
+
+async def reconcile_course_stats():
+    """Repair CourseStats and drop cached views of the courses that were off"""
+    global last_repair
+    started = time.monotonic()
+    drifted = await run_blocking(repair_course_stats)
+    if drifted:
+        await bump_generations([f"course:{course_id}" for course_id in drifted])
+        await invalidate_tags(["catalog"] + [f"instructor:{instructor_id}" for instructor_id in set(drifted.values())])
+    last_repair = {
+        "at": time.time(),
+        "seconds": time.monotonic() - started,
+        "repaired": sorted(drifted)
+    }
+    print(f"CourseStats repaired: {len(drifted)} courses fixed in {last_repair['seconds']:.2f}s")
+    return last_repair
+
+async def background_course_stats_repair():
+    """Repair CourseStats once per COURSE_STATS_REPAIR_INTERVAL across all workers"""
+    await run_periodically("course-stats", COURSE_STATS_REPAIR_INTERVAL, reconcile_course_stats)
+
+_repair_task = None
+
+def start_course_stats_repair():
+    """Start the background CourseStats repair task (called from the FastAPI lifespan)"""
+    global _repair_task
+    if _repair_task is None or _repair_task.done():
+        _repair_task = asyncio.create_task(background_course_stats_repair())
+    return _repair_task
@@ -0,0 +1,174 @@
+# Repair job for the CourseDailyStats / LectureDailyStats rollups behind the instructor dashboard
+import os
+import time
+import asyncio
+import pymysql.cursors
+from services.config.mysql_config import get_db_connection
+from services.utils.api_cache import invalidate_tags
+from services.utils.executor import run_blocking
+from services.utils.scheduled_jobs import run_periodically
+
+# The Enrollments and LectureResults triggers keep the rollups current; the repair
+# catches drift (writes with triggers disabled, manual fixes, rows from before the tables)
+# and runs in one worker per interval across the cluster
+ROLLUP_REBUILD_INTERVAL = int(os.getenv('ROLLUP_REBUILD_INTERVAL', 24 * 3600))
+# Courses rebuilt per transaction, so row locks are held briefly
+ROLLUP_REBUILD_BATCH = int(os.getenv('ROLLUP_REBUILD_BATCH', 100))
+
+# Cache tag on every cached instructor dashboard
+DASHBOARD_TAG = "instructor-dashboard"
+
+REBUILD_COURSE_DAILY = [
+    "DELETE FROM CourseDailyStats WHERE CourseID IN ({ids})",
+    """
+    INSERT INTO CourseDailyStats (CourseID, Day, Enrollments, RatingSum, RatingCount, Completions, ProgressSum)
+    SELECT
+        CourseID,
+        EnrollmentDate,
+        COUNT(*),
+        COALESCE(SUM(Rating), 0),
+        COUNT(Rating),
+        SUM(COALESCE(Percentage, 0) = 100),
+        COALESCE(SUM(Percentage), 0)
+    FROM Enrollments
+    WHERE CourseID IN ({ids})
+    GROUP BY CourseID, EnrollmentDate
+    """
+]
+
+# Only submitted results count; the rows created at enrollment have no Date yet
+REBUILD_LECTURE_DAILY = [
+    "DELETE FROM LectureDailyStats WHERE CourseID IN ({ids})",
+    """
+    INSERT INTO LectureDailyStats (LectureID, Day, CourseID, Attempts, Passes, ScoreSum)
+    SELECT
+        LectureID,
+        Date,
+        CourseID,
+        COUNT(*),
+        SUM(State = 'passed'),
+        COALESCE(SUM(Score), 0)
+    FROM LectureResults
+    WHERE CourseID IN ({ids}) AND Date IS NOT NULL
+    GROUP BY LectureID, Date, CourseID
+    """
+]
+
+# Per-course rollup totals next to the totals recomputed from Enrollments and
+# LectureResults; one row per course whose rollups are off
+DRIFT_QUERY = """
+SELECT c.CourseID, c.InstructorID
+FROM Courses c
+LEFT JOIN (
+    SELECT CourseID, COUNT(*) AS Enrollments, COALESCE(SUM(Rating), 0) AS RatingSum, COUNT(Rating) AS RatingCount,
+           SUM(COALESCE(Percentage, 0) = 100) AS Completions, COALESCE(SUM(Percentage), 0) AS ProgressSum
+    FROM Enrollments
+    GROUP BY CourseID
+) e ON e.CourseID = c.CourseID
+LEFT JOIN (
+    SELECT CourseID, SUM(Enrollments) AS Enrollments, SUM(RatingSum) AS RatingSum, SUM(RatingCount) AS RatingCount,
+           SUM(Completions) AS Completions, SUM(ProgressSum) AS ProgressSum
+    FROM CourseDailyStats
+    GROUP BY CourseID
+) d ON d.CourseID = c.CourseID
+LEFT JOIN (
+    SELECT CourseID, COUNT(*) AS Attempts, SUM(State = 'passed') AS Passes, COALESCE(SUM(Score), 0) AS ScoreSum
+    FROM LectureResults
+    WHERE Date IS NOT NULL
+    GROUP BY CourseID
+) r ON r.CourseID = c.CourseID
+LEFT JOIN (
+    SELECT CourseID, SUM(Attempts) AS Attempts, SUM(Passes) AS Passes, SUM(ScoreSum) AS ScoreSum
+    FROM LectureDailyStats
+    GROUP BY CourseID
+) l ON l.CourseID = c.CourseID
+WHERE COALESCE(e.Enrollments, 0) <> COALESCE(d.Enrollments, 0)
+   OR COALESCE(e.RatingSum, 0) <> COALESCE(d.RatingSum, 0)
+   OR COALESCE(e.RatingCount, 0) <> COALESCE(d.RatingCount, 0)
+   OR COALESCE(e.Completions, 0) <> COALESCE(d.Completions, 0)
+   OR COALESCE(e.ProgressSum, 0) <> COALESCE(d.ProgressSum, 0)
+   OR COALESCE(r.Attempts, 0) <> COALESCE(l.Attempts, 0)
+   OR COALESCE(r.Passes, 0) <> COALESCE(l.Passes, 0)
+   OR COALESCE(r.ScoreSum, 0) <> COALESCE(l.ScoreSum, 0)
+"""
+
+# Result of the last repair run by this worker
+last_rebuild = None
+
+def rebuild_rollups(course_ids=None):
+    """Recompute the daily rollups from Enrollments and LectureResults; returns the number of courses"""
+    conn = get_db_connection(cursorclass=pymysql.cursors.DictCursor)
+    try:
+        with conn.cursor() as cursor:
+            if course_ids is None:
+                cursor.execute("SELECT CourseID FROM Courses ORDER BY CourseID")
+                course_ids = [row['CourseID'] for row in cursor.fetchall()]
+                conn.commit()
+            for start in range(0, len(course_ids), ROLLUP_REBUILD_BATCH):
+                batch = course_ids[start:start + ROLLUP_REBUILD_BATCH]
+                placeholders = ", ".join(["%s"] * len(batch))
+                for query in REBUILD_COURSE_DAILY + REBUILD_LECTURE_DAILY:
+                    cursor.execute(query.format(ids=placeholders), batch)
+                conn.commit()
+        return len(course_ids)
+    finally:
+        conn.close()
+
+def find_drifted_courses():
+    """Courses whose rollup totals differ from the source rows, as {CourseID: InstructorID}"""
+    conn = get_db_connection(cursorclass=pymysql.cursors.DictCursor)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(DRIFT_QUERY)
+            drifted = {row['CourseID']: row['InstructorID'] for row in cursor.fetchall()}
+            conn.commit()
+            return drifted
+    finally:
+        conn.close()
+
+def repair_rollups():
+    """Rebuild the rollups of the drifted courses only; returns {CourseID: InstructorID} for them"""
+    drifted = find_drifted_courses()
+    if drifted:
+        rebuild_rollups(sorted(drifted))
+    return drifted
+
+async def reconcile_rollups():
+    """Repair drifted rollups and drop the cached dashboards of their instructors"""
+    global last_rebuild
+    started = time.monotonic()
+    drifted = await run_blocking(repair_rollups)
+    if drifted:
+        await invalidate_tags([f"instructor:{instructor_id}" for instructor_id in set(drifted.values())])
+    last_rebuild = {
+        "at": time.time(),
+        "seconds": time.monotonic() - started,
+        "repaired": sorted(drifted)
+    }
+    print(f"Dashboard rollups repaired: {len(drifted)} courses fixed in {last_rebuild['seconds']:.2f}s")
+    return last_rebuild
+
+async def rebuild_all_rollups():
+    """Full rebuild of every course's rollups, dropping every cached instructor dashboard"""
+    courses = await run_blocking(rebuild_rollups)
+    await invalidate_tags([DASHBOARD_TAG])
+    print(f"Dashboard rollups rebuilt: {courses} courses")
+    return courses
+
+async def background_rollup_rebuild():
+    """Repair drifted rollups once per ROLLUP_REBUILD_INTERVAL across all workers"""
+    await run_periodically("dashboard-rollups", ROLLUP_REBUILD_INTERVAL, reconcile_rollups)
+
+_rebuild_task = None
+
+def start_rollup_rebuild():
+    """Start the background rollup repair task (called from the FastAPI lifespan)"""
+    global _rebuild_task
+    if _rebuild_task is None or _rebuild_task.done():
+        _rebuild_task = asyncio.create_task(background_rollup_rebuild())
+    return _rebuild_task
+
+if __name__ == "__main__":
+    # Explicit full rebuild, e.g. after a bulk import with triggers disabled:
+    #   python -m services.utils.dashboard_rollups
+    asyncio.run(rebuild_all_rollups())
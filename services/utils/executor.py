@@ -0,0 +1,71 @@
+# Bounded thread pool for blocking work (pymysql, boto3) called from async code
+import os
+import time
+import asyncio
+import functools
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads available for blocking calls; more than the MySQL pool size only adds waiting threads
+BLOCKING_POOL_SIZE = int(os.getenv('BLOCKING_POOL_SIZE', os.getenv('MYSQL_POOL_SIZE', 10)))
+
+_executor = ThreadPoolExecutor(max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="blocking")
+
+# Executor metrics; the worker threads update them under _metrics_lock
+_metrics_lock = threading.Lock()
+submitted = 0
+completed = 0
+active = 0
+peak_active = 0
+queue_wait_seconds = 0.0
+max_queue_wait_seconds = 0.0
+
+def _run(ctx, queued_at, func, args, kwargs):
+    global completed, active, peak_active, queue_wait_seconds, max_queue_wait_seconds
+    waited = time.monotonic() - queued_at
+    with _metrics_lock:
+        queue_wait_seconds += waited
+        max_queue_wait_seconds = max(max_queue_wait_seconds, waited)
+        active += 1
+        peak_active = max(peak_active, active)
+    try:
+        # Run inside the caller's context so contextvars (e.g. request state) carry over
+        return ctx.run(func, *args, **kwargs)
+    finally:
+        with _metrics_lock:
+            active -= 1
+            completed += 1
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking function on the bounded thread pool without stalling the event loop"""
+    global submitted
+    with _metrics_lock:
+        submitted += 1
+    ctx = contextvars.copy_context()
+    call = functools.partial(_run, ctx, time.monotonic(), func, args, kwargs)
+    return await asyncio.get_running_loop().run_in_executor(_executor, call)
+
+async def call_fetch(func):
+    """Await an async fetch function, or offload a blocking one to the thread pool"""
+    if asyncio.iscoroutinefunction(func):
+        return await func()
+    result = await run_blocking(func)
+    # Lambdas wrapping an async function return a coroutine, which still has to be awaited here
+    if asyncio.iscoroutine(result):
+        return await result
+    return result
+
+def get_executor_metrics():
+    """Blocking thread pool utilization and queue wait statistics"""
+    with _metrics_lock:
+        return {
+            "size": BLOCKING_POOL_SIZE,
+            "active": active,
+            "peak_active": peak_active,
+            "submitted": submitted,
+            "completed": completed,
+            "queued": submitted - completed - active,
+            "avg_queue_wait_ms": (queue_wait_seconds / completed) * 1000 if completed else 0,
+            "max_queue_wait_ms": max_queue_wait_seconds * 1000
+        }
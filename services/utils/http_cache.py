@@ -0,0 +1,71 @@
+# HTTP conditional GET support (ETag / If-None-Match) for cached read endpoints
+import hashlib
+from fastapi import Response
+
+# Responses depend on the caller's token, so only the browser may keep them,
+# and it has to revalidate with If-None-Match before reusing one
+CACHE_CONTROL = "private, no-cache"
+
+def request_etags(request):
+    """ETags listed in If-None-Match, without quotes or W/ prefixes"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return set()
+    etags = set()
+    for etag in header.split(","):
+        etag = etag.strip()
+        if etag.startswith("W/"):
+            etag = etag[2:]
+        etags.add(etag.strip('"'))
+    return etags
+
+def compose_etag(shared_etag, *overlay):
+    """
+    ETag for a shared cached document plus the per-user values overlaid on it,
+    e.g. compose_etag(course_etag, is_enrolled). Looks like "<shared>-<overlay digest>".
+    """
+    if not overlay:
+        return shared_etag
+    digest = hashlib.blake2b(repr(overlay).encode("utf-8"), digest_size=8).hexdigest()
+    return f"{shared_etag}-{digest}"
+
+def shared_etags(etags):
+    """The shared-document part of composed ETags, for get_cached_entry(if_none_match=...)"""
+    return {etag.split("-", 1)[0] for etag in etags}
+
+def etag_matches(etag, etags):
+    return "*" in etags or etag in etags
+
+def cache_headers(etag, weak=False):
+    """ETag and Cache-Control headers; weak ETags suit bodies served in more than one content coding"""
+    return {"ETag": f'W/"{etag}"' if weak else f'"{etag}"', "Cache-Control": CACHE_CONTROL}
+
+def set_cache_headers(response, etag):
+    """Add ETag and Cache-Control to the response FastAPI builds from the endpoint's return value"""
+    response.headers.update(cache_headers(etag))
+
+def not_modified(etag, weak=False):
+    """304 response; returned directly, so response_model validation and serialization are skipped"""
+    return Response(status_code=304, headers=cache_headers(etag, weak))
+
+async def load_conditional(request, load, *overlay):
+    """
+    Load a shared cached document for a conditional GET.
+
+    Args:
+        request: The incoming request (If-None-Match is read from it)
+        load: Async function taking if_none_match and returning a CachedValue
+        overlay: Per-user values the endpoint adds to the shared document
+
+    Returns (data, etag); data is None when the client's copy is still current.
+    """
+    client_etags = request_etags(request)
+    entry = await load(shared_etags(client_etags))
+    etag = compose_etag(entry.etag, *overlay)
+    if etag_matches(etag, client_etags):
+        return None, etag
+    if entry.not_modified:
+        # The shared document is unchanged but the overlay is not, so decode it after all
+        entry = await load(None)
+        etag = compose_etag(entry.etag, *overlay)
+    return entry.data, etag
@@ -0,0 +1,78 @@
+# In-process LRU cache that sits in front of Valkey
+import time
+import fnmatch
+import threading
+from collections import OrderedDict
+
+class L1Cache:
+    """
+    Bounded LRU cache of already-decoded Python objects.
+
+    Entries are limited both by count and by an approximate byte size (the size of
+    the serialized value they were decoded from), and each entry carries its own TTL.
+    Values are shared between callers, so they must be treated as read-only.
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at, size = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl, size):
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + ttl, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+
+    def delete_pattern(self, pattern):
+        """Delete keys matching a glob-style pattern (same syntax as Valkey SCAN MATCH)"""
+        with self._lock:
+            for key in [k for k in self._entries if fnmatch.fnmatchcase(k, pattern)]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_kb": self._bytes / 1024,
+                "max_entries": self.max_entries,
+                "max_size_kb": self.max_bytes / 1024,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,202 @@
+# Small per-learner progress structures that overlay shared cached documents
+from services.config.valkey_config import get_async_valkey_client, is_connection_available
+from services.utils.executor import call_fetch
+
+async_redis_client = get_async_valkey_client()
+
+# Passed lectures per learner and course, as a Valkey set of lecture IDs
+PASSED_LECTURES_TTL = 24 * 3600
+
+# Enrollments per learner, as a Valkey hash of CourseID -> rating ("" when unrated)
+ENROLLMENTS_TTL = 24 * 3600
+
+# Marks a set or hash as loaded from the database, so "passed nothing yet" or
+# "no enrollments yet" is not a miss. LectureIDs and CourseIDs are never 0.
+LOADED_MARKER = "0"
+
+# Every write bumps a version counter next to the set. A load reads the version
+# before it queries the database and stores its snapshot only if no write bumped it
+# meanwhile, so a result committed during the load is never overwritten by the
+# stale snapshot. The write updates the set only if it is loaded; a partial set
+# would hide lectures passed earlier until it expired.
+UPDATE_IF_LOADED_SCRIPT = """
+redis.call('incr', KEYS[2])
+redis.call('expire', KEYS[2], ARGV[3])
+if redis.call('exists', KEYS[1]) == 0 then
+    return 0
+end
+if ARGV[2] == '1' then
+    redis.call('sadd', KEYS[1], ARGV[1])
+else
+    redis.call('srem', KEYS[1], ARGV[1])
+end
+redis.call('expire', KEYS[1], ARGV[3])
+return 1
+"""
+
+# Load side of the version fence: ARGV[1] is the version read before the database
+# query ("" if none), ARGV[2] the TTL, the rest the members
+STORE_SET_IF_UNCHANGED_SCRIPT = """
+if (redis.call('get', KEYS[2]) or '') ~= ARGV[1] then
+    return 0
+end
+redis.call('sadd', KEYS[1], unpack(ARGV, 3))
+redis.call('expire', KEYS[1], ARGV[2])
+return 1
+"""
+
+# Hash counterparts of UPDATE_IF_LOADED_SCRIPT and STORE_SET_IF_UNCHANGED_SCRIPT,
+# with the same version fence; ARGV[3..] of the store are field, value pairs
+HSET_IF_LOADED_SCRIPT = """
+redis.call('incr', KEYS[2])
+redis.call('expire', KEYS[2], ARGV[3])
+if redis.call('exists', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('hset', KEYS[1], ARGV[1], ARGV[2])
+redis.call('expire', KEYS[1], ARGV[3])
+return 1
+"""
+
+STORE_HASH_IF_UNCHANGED_SCRIPT = """
+if (redis.call('get', KEYS[2]) or '') ~= ARGV[1] then
+    return 0
+end
+redis.call('hset', KEYS[1], unpack(ARGV, 3))
+redis.call('expire', KEYS[1], ARGV[2])
+return 1
+"""
+
+def _passed_key(learner_id, course_id):
+    return f"learner:passed:{learner_id}:course:{course_id}"
+
+def _version_key(key):
+    return f"{key}:version"
+
+async def get_passed_lectures(learner_id, course_id, db_fetch_func):
+    """
+    Get the set of lecture IDs a learner has passed in a course.
+
+    Args:
+        learner_id: LearnerID (None for anonymous users, who have passed nothing)
+        course_id: CourseID
+        db_fetch_func: Function returning the passed LectureIDs from the database (async or blocking)
+    """
+    if learner_id is None:
+        return set()
+
+    if not is_connection_available() or not async_redis_client:
+        return set(await call_fetch(db_fetch_func))
+
+    key = _passed_key(learner_id, course_id)
+    version_key = _version_key(key)
+    try:
+        async with async_redis_client.pipeline(transaction=True) as pipe:
+            pipe.smembers(key)
+            pipe.get(version_key)
+            members, version = await pipe.execute()
+        if members:
+            return {int(member) for member in members if member != LOADED_MARKER}
+    except Exception as e:
+        print(f"Learner progress cache ERROR for {key}: {e}")
+        return set(await call_fetch(db_fetch_func))
+
+    passed = set(await call_fetch(db_fetch_func))
+    try:
+        await async_redis_client.eval(
+            STORE_SET_IF_UNCHANGED_SCRIPT, 2, key, version_key,
+            version or "", PASSED_LECTURES_TTL, LOADED_MARKER, *passed
+        )
+    except Exception as e:
+        print(f"Learner progress cache WRITE ERROR for {key}: {e}")
+    return passed
+
+async def record_lecture_result(learner_id, course_id, lecture_id, passed):
+    """Apply a quiz result (after its commit) to the learner's cached passed-lecture set"""
+    if not is_connection_available() or not async_redis_client:
+        return
+
+    key = _passed_key(learner_id, course_id)
+    try:
+        await async_redis_client.eval(
+            UPDATE_IF_LOADED_SCRIPT, 2, key, _version_key(key), lecture_id, "1" if passed else "0", PASSED_LECTURES_TTL
+        )
+    except Exception as e:
+        print(f"Learner progress cache UPDATE ERROR for {key}: {e}")
+        # Fall back to dropping the set so the next read rebuilds it
+        try:
+            await async_redis_client.delete(key)
+        except Exception:
+            pass
+
+def _enrollments_key(learner_id):
+    return f"learner:enrollments:{learner_id}"
+
+def _encode_rating(rating):
+    # Unrated enrollments store 0 (sp_EnrollLearner) or NULL; both read back as None
+    return str(int(rating)) if rating else ""
+
+async def get_learner_enrollments(learner_id, db_fetch_func):
+    """
+    Get a learner's enrollments as {course_id: rating or None}.
+
+    Args:
+        learner_id: LearnerID (None for anonymous users, who have no enrollments)
+        db_fetch_func: Function returning (CourseID, Rating) pairs from the database (async or blocking)
+    """
+    if learner_id is None:
+        return {}
+
+    if not is_connection_available() or not async_redis_client:
+        return {course_id: int(rating) if rating else None for course_id, rating in await call_fetch(db_fetch_func)}
+
+    key = _enrollments_key(learner_id)
+    version_key = _version_key(key)
+    try:
+        async with async_redis_client.pipeline(transaction=True) as pipe:
+            pipe.hgetall(key)
+            pipe.get(version_key)
+            fields, version = await pipe.execute()
+        if fields:
+            return {
+                int(course_id): int(rating) if rating else None
+                for course_id, rating in fields.items() if course_id != LOADED_MARKER
+            }
+    except Exception as e:
+        print(f"Learner enrollments cache ERROR for {key}: {e}")
+        return {course_id: int(rating) if rating else None for course_id, rating in await call_fetch(db_fetch_func)}
+
+    rows = await call_fetch(db_fetch_func)
+    enrollments = {course_id: int(rating) if rating else None for course_id, rating in rows}
+    try:
+        pairs = [LOADED_MARKER, ""]
+        for course_id, rating in enrollments.items():
+            pairs += [str(course_id), _encode_rating(rating)]
+        await async_redis_client.eval(
+            STORE_HASH_IF_UNCHANGED_SCRIPT, 2, key, version_key, version or "", ENROLLMENTS_TTL, *pairs
+        )
+    except Exception as e:
+        print(f"Learner enrollments cache WRITE ERROR for {key}: {e}")
+    return enrollments
+
+async def record_enrollment(learner_id, course_id, rating=None):
+    """Apply a new enrollment or rating (after its commit) to the learner's cached enrollments hash"""
+    if not is_connection_available() or not async_redis_client:
+        return
+
+    key = _enrollments_key(learner_id)
+    try:
+        await async_redis_client.eval(
+            HSET_IF_LOADED_SCRIPT, 2, key, _version_key(key), course_id, _encode_rating(rating), ENROLLMENTS_TTL
+        )
+    except Exception as e:
+        print(f"Learner enrollments cache UPDATE ERROR for {key}: {e}")
+        # Fall back to dropping the hash so the next read rebuilds it
+        try:
+            await async_redis_client.delete(key)
+        except Exception:
+            pass
+
+def apply_passed_overlay(lectures, passed):
+    """Copy a shared lecture list with this learner's pass status filled in"""
+    return [{**lecture, "passed": lecture["id"] in passed} for lecture in lectures]
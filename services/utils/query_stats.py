@@ -0,0 +1,174 @@
+# SQL instrumentation: per-statement timing, per-request query counts and a slow-query log
+import os
+import re
+import time
+import threading
+import contextvars
+from collections import deque
+
+# Statements slower than this are logged with their EXPLAIN plan
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'true').lower() == 'true'
+# Distinct fingerprints kept in memory; the rest are counted under "other"
+MAX_FINGERPRINTS = int(os.getenv('QUERY_STATS_MAX_FINGERPRINTS', 500))
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+class RequestQueryStats:
+    """Queries run while serving one request (shared by the threads working on it)"""
+
+    __slots__ = ("count", "seconds", "slow")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slow = 0
+
+_request_stats = contextvars.ContextVar("request_query_stats", default=None)
+
+_lock = threading.Lock()
+_fingerprints = {}  # fingerprint -> {"count", "seconds", "max_seconds", "rows"}
+_endpoints = {}  # "GET /api/path" -> {"requests", "queries", "db_seconds", "seconds", ...}
+slow_queries = deque(maxlen=int(os.getenv('SLOW_QUERY_LOG_SIZE', 50)))
+
+def fingerprint(sql):
+    """Statement with literals and placeholders replaced by ?, e.g. SELECT * FROM t WHERE id = ?"""
+    sql = _STRING.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+def explainable(sql):
+    """Only reads are EXPLAINed after the fact"""
+    words = sql.split(None, 1)
+    return bool(words) and words[0].upper() in ("SELECT", "WITH")
+
+def begin_request():
+    """Start counting queries for the current request; returns the token for end_request"""
+    return _request_stats.set(RequestQueryStats())
+
+def current_request_stats():
+    return _request_stats.get()
+
+def end_request(token, endpoint, seconds):
+    """Stop counting and fold the request into the per-endpoint aggregates"""
+    stats = _request_stats.get()
+    _request_stats.reset(token)
+    with _lock:
+        entry = _endpoints.setdefault(endpoint, {
+            "requests": 0, "queries": 0, "db_seconds": 0.0, "seconds": 0.0,
+            "max_queries": 0, "max_db_seconds": 0.0, "slow_queries": 0
+        })
+        entry["requests"] += 1
+        entry["queries"] += stats.count
+        entry["db_seconds"] += stats.seconds
+        entry["seconds"] += seconds
+        entry["max_queries"] = max(entry["max_queries"], stats.count)
+        entry["max_db_seconds"] = max(entry["max_db_seconds"], stats.seconds)
+        entry["slow_queries"] += stats.slow
+    return stats
+
+def record_query(sql, seconds, rows):
+    """Account one executed statement; returns True if it crossed SLOW_QUERY_MS"""
+    key = fingerprint(sql)
+    slow = seconds * 1000 >= SLOW_QUERY_MS
+    stats = _request_stats.get()
+    with _lock:
+        # A request can run queries on several threads at once
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += seconds
+            stats.slow += slow
+        entry = _fingerprints.get(key)
+        if entry is None:
+            if len(_fingerprints) >= MAX_FINGERPRINTS:
+                key = "other"
+            entry = _fingerprints.setdefault(key, {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0})
+        entry["count"] += 1
+        entry["seconds"] += seconds
+        entry["max_seconds"] = max(entry["max_seconds"], seconds)
+        entry["rows"] += max(rows or 0, 0)
+    return slow
+
+def log_slow_query(sql, seconds, rows, plan=None):
+    """Print a slow statement (and its EXPLAIN rows) and keep it for /api/metrics"""
+    key = fingerprint(sql)
+    slow_queries.append({
+        "at": time.time(),
+        "ms": seconds * 1000,
+        "rows": rows,
+        "fingerprint": key,
+        "plan": plan
+    })
+    print(f"🐢 Slow query ({seconds * 1000:.0f}ms, {rows} rows): {key}")
+    for step in plan or []:
+        print(f"   EXPLAIN {step}")
+
+def _summarize(entry, count_key):
+    count = entry[count_key]
+    summary = dict(entry)
+    for name, label in (("seconds", "total_ms"), ("db_seconds", "db_ms"), ("max_seconds", "max_ms"), ("max_db_seconds", "max_db_ms")):
+        if name in summary:
+            summary[label] = summary.pop(name) * 1000
+    if count:
+        summary["avg_ms"] = entry.get("seconds", 0) / count * 1000
+    return summary
+
+def get_query_metrics(limit=25):
+    """Top statements by total time, per-endpoint query counts and recent slow queries"""
+    with _lock:
+        fingerprints = sorted(_fingerprints.items(), key=lambda item: item[1]["seconds"], reverse=True)[:limit]
+        endpoints = sorted(_endpoints.items(), key=lambda item: item[1]["db_seconds"], reverse=True)
+        statements = [dict(_summarize(entry, "count"), fingerprint=key) for key, entry in fingerprints]
+        per_endpoint = {}
+        for endpoint, entry in endpoints:
+            summary = _summarize(entry, "requests")
+            summary["avg_queries"] = entry["queries"] / entry["requests"] if entry["requests"] else 0
+            summary["avg_db_ms"] = entry["db_seconds"] / entry["requests"] * 1000 if entry["requests"] else 0
+            per_endpoint[endpoint] = summary
+    return {
+        "slow_query_ms": SLOW_QUERY_MS,
+        "statements": statements,
+        "endpoints": per_endpoint,
+        "slow_queries": list(slow_queries)
+    }
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware that counts the queries each request runs. Adds X-DB-Queries and
+    a Server-Timing "db" entry to the response, and records per-endpoint totals once
+    the body is sent (so streamed responses include the queries made while streaming).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = begin_request()
+        stats = current_request_stats()
+        started = time.monotonic()
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(stats.count).encode()))
+                headers.append((b"server-timing", f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"'.encode()))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            # Label by route template so /courses/1 and /courses/2 share one entry
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            end_request(token, f"{scope.get('method', '')} {path}", time.monotonic() - started)
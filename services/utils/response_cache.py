@@ -0,0 +1,66 @@
+# Cached endpoint responses kept as final, gzip-compressed JSON bytes
+import os
+import gzip
+from fastapi import Response
+from pydantic import TypeAdapter
+from services.utils.api_cache import get_cached_entry
+from services.utils.executor import call_fetch
+from services.utils.http_cache import cache_headers
+
+# Compression level for stored response bodies (built once per cache write, not per request)
+RESPONSE_GZIP_LEVEL = int(os.getenv('RESPONSE_GZIP_LEVEL', 6))
+
+# TypeAdapters are costly to build, so keep one per response model
+_adapters = {}
+
+def _adapter(response_model):
+    adapter = _adapters.get(response_model)
+    if adapter is None:
+        adapter = _adapters[response_model] = TypeAdapter(response_model)
+    return adapter
+
+def render_body(data, response_model):
+    """Validate data against response_model once and return the response as gzip-compressed JSON"""
+    adapter = _adapter(response_model)
+    body = adapter.dump_json(adapter.validate_python(data))
+    # mtime=0 keeps the bytes, and so the ETag, identical for identical content
+    return gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+
+def render_page(items, next_cursor, response_model):
+    """render_body for one page of results, prefixed with the next page's cursor and a newline"""
+    return (next_cursor or "").encode("ascii") + b"\n" + render_body(items, response_model)
+
+def split_page(value):
+    """Split a render_page value into (next_cursor or None, body)"""
+    cursor, _, body = value.partition(b"\n")
+    return cursor.decode("ascii") or None, body
+
+async def get_cached_page(key, db_fetch_func, response_model, **cache_options):
+    """
+    Like get_cached_entry for paginated endpoints: db_fetch_func returns (items, next_cursor)
+    and the cached value is the rendered page (see render_page / split_page), so cache hits
+    skip deserialization, response_model validation and JSON encoding.
+    Extra keyword arguments are passed to get_cached_entry; use_compression is not needed.
+    """
+    async def fetch_page():
+        items, next_cursor = await call_fetch(db_fetch_func)
+        return render_page(items, next_cursor, response_model)
+    return await get_cached_entry(key, fetch_page, **cache_options)
+
+def accepts_gzip(request):
+    """Whether Accept-Encoding allows gzip (a q=0 entry refuses it)"""
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+def body_response(request, body, etag):
+    """Send a body from render_body, decompressing it only for clients that do not accept gzip"""
+    # One ETag covers both content codings, so it has to be weak
+    headers = {**cache_headers(etag, weak=True), "Vary": "Accept-Encoding"}
+    if accepts_gzip(request):
+        headers["Content-Encoding"] = "gzip"
+    else:
+        body = gzip.decompress(body)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,57 @@
+# Cluster-wide scheduling for the periodic repair jobs: every API worker runs the loop,
+# but each job runs in one worker at a time and once per interval across all of them
+import os
+import time
+import uuid
+import asyncio
+from services.config.valkey_config import get_async_valkey_client, is_connection_available
+from services.utils.api_cache import RELEASE_LOCK_SCRIPT
+
+async_redis_client = get_async_valkey_client()
+
+# How often each worker checks whether a job is due (a Valkey GET, not the job itself)
+JOB_CHECK_INTERVAL = int(os.getenv('JOB_CHECK_INTERVAL', 600))
+# Upper bound on one run, so a worker that dies mid-run does not hold the job for good
+JOB_LOCK_TTL = int(os.getenv('JOB_LOCK_TTL', 3600))
+
+def job_keys(name):
+    """(lock key, last-run key) of a job"""
+    return f"job:{name}:lock", f"job:{name}:last_run"
+
+async def run_if_due(name, interval, job):
+    """
+    Run the async job unless another worker is running it or ran it in the last
+    interval seconds. Returns the job's result, or None if it was skipped. Without
+    Valkey the workers cannot agree on who runs it, so it is skipped.
+    """
+    if not is_connection_available() or not async_redis_client:
+        print(f"Job {name} skipped: Valkey is unavailable to coordinate workers")
+        return None
+
+    lock_key, last_run_key = job_keys(name)
+    token = uuid.uuid4().hex
+    if not await async_redis_client.set(lock_key, token, nx=True, ex=JOB_LOCK_TTL):
+        return None
+    try:
+        last_run = await async_redis_client.get(last_run_key)
+        if last_run is not None and time.time() - float(last_run) < interval:
+            return None
+        try:
+            return await job()
+        finally:
+            # Failed runs count too, so a failing job is not retried every check
+            await async_redis_client.set(last_run_key, time.time())
+    finally:
+        try:
+            await async_redis_client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+        except Exception as e:
+            print(f"Job lock release ERROR for {name}: {e}")
+
+async def run_periodically(name, interval, job):
+    """Check every JOB_CHECK_INTERVAL seconds (at most every interval) and run the job when due"""
+    while True:
+        try:
+            await run_if_due(name, interval, job)
+        except Exception as e:
+            print(f"Error running job {name}: {str(e)}")
+        await asyncio.sleep(min(JOB_CHECK_INTERVAL, interval))
@@ -0,0 +1,73 @@
+# Streaming NDJSON / CSV exports read through an unbuffered (server-side) MySQL cursor
+import io
+import os
+import csv
+import json
+import pymysql.cursors
+from fastapi.responses import StreamingResponse
+from services.config.mysql_config import get_db_connection
+
+# Rows pulled from the server per round trip; memory stays bounded by one batch
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 500))
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8"
+}
+
+def stream_query(query, args=None, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Yield rows as dicts from an SSDictCursor, batch_size at a time. The connection
+    is leased on the first row and given back once the result is read; if the
+    consumer stops early (client disconnected) it is dropped instead, since the
+    rest of the unbuffered result would otherwise have to be read off the wire.
+    """
+    conn = get_db_connection(cursorclass=pymysql.cursors.SSDictCursor)
+    finished = False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(query, args)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+            finished = True
+    finally:
+        if finished:
+            conn.close()
+        else:
+            conn.discard()
+
+def ndjson_lines(rows):
+    """One JSON document per row; dates and decimals are written as strings"""
+    for row in rows:
+        yield (json.dumps(row, default=str) + "\n").encode("utf-8")
+
+def csv_lines(rows, columns, batch_size=EXPORT_BATCH_SIZE):
+    """Header line, then the rows in chunks of batch_size lines"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % batch_size == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+def export_response(query, args, columns, format, filename):
+    """
+    StreamingResponse for a query exported as NDJSON or CSV. Starlette iterates the
+    (blocking) generator on its thread pool, so the event loop never waits on MySQL.
+    """
+    rows = stream_query(query, args)
+    body = csv_lines(rows, columns) if format == "csv" else ndjson_lines(rows)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'}
+    )